@@ -2,6 +2,8 @@
 ASGI config for digital project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Besides the Django application, it serves streaming DSR imports,
+see `dsrs.asgi.DSRStreamingImportMiddleware`.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
@@ -13,4 +15,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "digital.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Apps have to be loaded before importing anything that uses models.
+from dsrs.asgi import DSRStreamingImportMiddleware  # noqa: E402
+
+application = DSRStreamingImportMiddleware(django_application)
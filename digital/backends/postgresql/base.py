@@ -0,0 +1,86 @@
+from functools import partial
+from typing import Optional
+
+from django.db import connections
+from django.db.backends.postgresql import base, creation
+
+from digital.backends.postgresql.pool import ConnectionPool, close_pools, get_pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Pooled connections to the test database would prevent dropping it,
+        # those of its test mirrors included.
+        close_pools(self.connection.alias)
+        for alias in connections:
+            if connections[alias].settings_dict["TEST"].get("MIRROR") == (
+                self.connection.alias
+            ):
+                connections[alias].close()
+                close_pools(alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend adding:
+
+    - Health checks of persistent connections before their first use
+      in a request, enabled with `CONN_HEALTH_CHECKS` like in Django 4.1.
+    - A pool of connections shared by the threads of a process, enabled
+      with a "pool" dict of `pool.ConnectionPool` arguments in `OPTIONS`.
+      Closing a connection returns it to the pool.
+    """
+
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        self.pool: Optional[ConnectionPool] = None
+
+    def get_connection_params(self) -> dict:
+        conn_params = super().get_connection_params()
+        conn_params.pop("pool", None)
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        self.health_check_done = True
+        if (pool_options := self.settings_dict["OPTIONS"].get("pool")) is None:
+            return super().get_new_connection(conn_params)
+
+        self.pool = get_pool(
+            self.alias,
+            conn_params,
+            connect=partial(super().get_new_connection, conn_params),
+            **pool_options,
+        )
+        connection = self.pool.get()
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            # Connections closed within an atomic block stay referenced
+            # until the block exits, they can't be shared.
+            self.pool.put(self.connection, discard=self.in_atomic_block)
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Check persistent connections again before their next use.
+        self.health_check_done = False
+
+    def ensure_connection(self):
+        if (
+            self.connection is not None
+            and not self.health_check_done
+            and self.settings_dict.get("CONN_HEALTH_CHECKS", False)
+        ):
+            self.health_check_done = True
+            if not self.in_atomic_block and not self.is_usable():
+                self.close()
+        super().ensure_connection()
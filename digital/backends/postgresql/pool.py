@@ -0,0 +1,230 @@
+"""
+Pools of database connections shared by the threads of a process,
+see `base.DatabaseWrapper`.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+import psycopg2
+from psycopg2 import extensions
+
+_pools: dict[tuple, "ConnectionPool"] = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """
+    No connection became available within the pool timeout.
+    """
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of at most `max_size` connections. Getting a connection
+    waits up to `timeout` seconds for one to be returned when all of them
+    are in use.
+
+    Returned connections are rolled back and their session state discarded.
+    Idle connections are checked before being handed out again when they
+    have been idle for `check_after` seconds, and closed after `max_idle`
+    seconds, keeping at least `min_size` of them.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int,
+        min_size: int = 0,
+        timeout: float = 10.0,
+        check_after: float = 30.0,
+        max_idle: float = 600.0,
+    ) -> None:
+        self.connect = connect
+        self.max_size = max_size
+        self.min_size = min_size
+        self.timeout = timeout
+        self.check_after = check_after
+        self.max_idle = max_idle
+        self._condition = threading.Condition()
+        # Idle connections with the time they were returned at,
+        # most recently returned last.
+        self._idle: deque[tuple[Any, float]] = deque()
+        # Open connections, idle or in use.
+        self._size = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._timeouts = 0
+        self._discarded = 0
+
+    def get(self) -> Any:
+        while True:
+            connection, idle_since = self._checkout()
+            if connection is None:
+                break
+            if time.monotonic() - idle_since < self.check_after or _is_usable(
+                connection
+            ):
+                return connection
+            self._discard(connection)
+
+        try:
+            return self.connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def _checkout(self) -> tuple[Any, float]:
+        """
+        Take the most recently returned idle connection, or reserve room
+        for a new one, returned as None.
+        """
+        start = time.monotonic()
+        with self._condition:
+            self._close_expired()
+            if not self._idle and self._size >= self.max_size:
+                self._waiting += 1
+                self._waits += 1
+                try:
+                    while not self._idle and self._size >= self.max_size:
+                        remaining = start + self.timeout - time.monotonic()
+                        if remaining <= 0:
+                            self._timeouts += 1
+                            raise PoolTimeout(
+                                f"No database connection available "
+                                f"within {self.timeout}s."
+                            )
+                        self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+                    wait_time = time.monotonic() - start
+                    self._wait_time += wait_time
+                    self._max_wait_time = max(self._max_wait_time, wait_time)
+            self._checkouts += 1
+            if self._idle:
+                return self._idle.pop()
+            self._size += 1
+            return None, start
+
+    def put(self, connection: Any, discard: bool = False) -> None:
+        if discard or not _reset(connection):
+            self._discard(connection)
+            return
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def _discard(self, connection: Any) -> None:
+        if not connection.closed:
+            connection.close()
+        with self._condition:
+            self._size -= 1
+            self._discarded += 1
+            self._condition.notify()
+
+    def _close_expired(self) -> None:
+        # Oldest idle connections come first.
+        now = time.monotonic()
+        while (
+            len(self._idle) > self.min_size and now - self._idle[0][1] >= self.max_idle
+        ):
+            connection, _ = self._idle.popleft()
+            connection.close()
+            self._size -= 1
+
+    def close(self) -> None:
+        """
+        Close idle connections, e.g. before dropping their database.
+        """
+        with self._condition:
+            while self._idle:
+                connection, _ = self._idle.popleft()
+                connection.close()
+                self._size -= 1
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time": round(self._wait_time, 6),
+                "max_wait_time": round(self._max_wait_time, 6),
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+            }
+
+
+def _is_usable(connection: Any) -> bool:
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except psycopg2.Error:
+        return False
+    return True
+
+
+def _reset(connection: Any) -> bool:
+    """
+    Get a connection back to a clean session, or return False
+    if it's unusable.
+    """
+    if connection.closed:
+        return False
+    try:
+        if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute("DISCARD ALL")
+    except psycopg2.Error:
+        return False
+    return True
+
+
+def get_pool(alias: str, conn_params: dict, **options) -> ConnectionPool:
+    """
+    Get the pool of a database alias and connection parameters,
+    creating it with `options` if needed.
+    """
+    key = (
+        alias,
+        tuple(sorted((name, str(value)) for name, value in conn_params.items())),
+    )
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(**options)
+        return _pools[key]
+
+
+def get_pools_stats() -> list[dict[str, Any]]:
+    with _pools_lock:
+        pools = list(_pools.items())
+    return [
+        {
+            "alias": alias,
+            "database": dict(params).get("database"),
+            **pool.get_stats(),
+        }
+        for (alias, params), pool in pools
+    ]
+
+
+def close_pools(alias: str) -> None:
+    with _pools_lock:
+        pools = [
+            pool for (pool_alias, _), pool in _pools.items() if pool_alias == alias
+        ]
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,198 @@
+import threading
+from contextlib import ExitStack, contextmanager
+from http.cookies import Morsel, SimpleCookie
+from typing import TYPE_CHECKING, Iterator, Optional
+
+from django.conf import settings
+from django.db import OperationalError, connections
+from django.http import JsonResponse
+
+from digital import replicas
+from digital.backends.postgresql.pool import PoolTimeout
+from digital.slowqueries import SlowQueryRecorder
+
+if TYPE_CHECKING:
+    from django.http import HttpRequest, HttpResponse  # pragma: no cover
+
+# SQLSTATE of statements cancelled by `statement_timeout`.
+QUERY_CANCELED = "57014"
+
+# Set for `DATABASE_REPLICA_STICKINESS` seconds after a successful write.
+REPLICA_STICKY_COOKIE = "read_primary"
+
+# Sent by clients which don't keep cookies, to read from primaries.
+REPLICA_STICKY_HEADER = "HTTP_X_READ_PRIMARY"
+
+SAFE_METHODS: tuple[str, ...] = ("GET", "HEAD", "OPTIONS")
+
+_local = threading.local()
+
+
+def get_statement_timeout(url_name: Optional[str]) -> int:
+    """
+    Get the statement time budget of an endpoint by its URL name,
+    in milliseconds, zero meaning no limit.
+    """
+    return settings.API_STATEMENT_TIMEOUTS.get(url_name, settings.API_STATEMENT_TIMEOUT)
+
+
+class StatementBudget:
+    """
+    Execute wrapper applying a `statement_timeout` to the connection
+    before the first statement it runs, so that requests which don't
+    query the database don't connect to it.
+    """
+
+    def __init__(self, connection) -> None:
+        self.connection = connection
+        self.timeout: Optional[int] = None
+        self.applied = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.timeout is not None and not self.applied:
+            # Use the database cursor, bypassing execute wrappers.
+            context["cursor"].cursor.execute(
+                "SET statement_timeout = %s", [self.timeout]
+            )
+            self.applied = True
+        return execute(sql, params, many, context)
+
+    def reset(self) -> None:
+        # Connections may outlive requests, don't leave the budget behind.
+        if self.applied and self.connection.connection is not None:
+            with self.connection.connection.cursor() as cursor:
+                cursor.execute("RESET statement_timeout")
+        self.applied = False
+
+
+def get_replica_sticky_cookie() -> Morsel:
+    """
+    Get the cookie making clients read from primaries for
+    `DATABASE_REPLICA_STICKINESS` seconds, see `ReplicaReadMiddleware`.
+    """
+    cookie: SimpleCookie = SimpleCookie()
+    cookie[REPLICA_STICKY_COOKIE] = "1"
+    cookie[REPLICA_STICKY_COOKIE].update(
+        {
+            "max-age": settings.DATABASE_REPLICA_STICKINESS,
+            "path": "/",
+            "httponly": True,
+            "samesite": "Lax",
+        }
+    )
+    return cookie[REPLICA_STICKY_COOKIE]
+
+
+def get_request_budget() -> Optional[tuple[int, str]]:
+    """
+    Get the statement time budget of the request served by this thread,
+    and its path, for its worker threads to run under, see
+    `statement_budget`. None outside of requests.
+    """
+    return getattr(_local, "budget", None)
+
+
+@contextmanager
+def statement_budget(alias: str, timeout: int, path: str) -> Iterator[None]:
+    """
+    Run the statements of this thread on the database under a time budget,
+    recording slow ones, as `QueryBudgetMiddleware` does for requests.
+    Connections are per thread, worker threads of a request need this.
+    """
+    budget = StatementBudget(connections[alias])
+    budget.timeout = timeout
+    try:
+        with budget.connection.execute_wrapper(
+            budget
+        ), budget.connection.execute_wrapper(SlowQueryRecorder(path)):
+            yield
+    finally:
+        budget.reset()
+
+
+class QueryBudgetMiddleware:
+    """
+    Run the statements of each request under the `statement_timeout`
+    budget of its endpoint, on every database, so that a pathological query
+    can't tie up a worker thread, and answer requests running out of it,
+    or out of pooled connections, with 503.
+    Slow statements are recorded, see `digital.slowqueries`.
+    """
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: "HttpRequest") -> "HttpResponse":
+        # Reads may go to shards and replicas, see `dsrs.sharding` and
+        # `ReplicaReadMiddleware`.
+        request.statement_budgets = budgets = [
+            StatementBudget(connections[alias]) for alias in settings.DATABASES
+        ]
+        try:
+            with ExitStack() as stack:
+                for budget in budgets:
+                    stack.enter_context(budget.connection.execute_wrapper(budget))
+                    stack.enter_context(
+                        budget.connection.execute_wrapper(
+                            SlowQueryRecorder(request.path)
+                        )
+                    )
+                return self.get_response(request)
+        finally:
+            _local.budget = None
+            for budget in budgets:
+                budget.reset()
+
+    def process_view(self, request: "HttpRequest", *_) -> None:
+        timeout = get_statement_timeout(request.resolver_match.url_name)
+        for budget in request.statement_budgets:
+            budget.timeout = timeout
+        _local.budget = (timeout, request.path)
+
+    def process_exception(
+        self, request: "HttpRequest", exception: Exception
+    ) -> Optional["HttpResponse"]:
+        if isinstance(exception, OperationalError) and (
+            getattr(exception.__cause__, "pgcode", None) == QUERY_CANCELED
+            or isinstance(exception.__cause__, PoolTimeout)
+        ):
+            return JsonResponse(
+                {"detail": "Database is busy, please retry later."},
+                status=503,
+                headers={"Retry-After": str(settings.API_RETRY_AFTER)},
+            )
+        return None
+
+
+class ReplicaReadMiddleware:
+    """
+    Serve the read-only endpoints of `API_REPLICA_READS` from replicas,
+    see `digital.replicas`, so that reporting doesn't compete with
+    ingestion on the primary. Clients which wrote recently read from the
+    primary, so that they see their own writes: writes set a cookie to
+    that effect, as do streaming imports, see `dsrs.asgi`. Clients which
+    don't keep cookies send an `X-Read-Primary` header instead.
+    """
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: "HttpRequest") -> "HttpResponse":
+        with replicas.use_replicas(False):
+            response = self.get_response(request)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            response.cookies[REPLICA_STICKY_COOKIE] = get_replica_sticky_cookie()
+        return response
+
+    def process_view(self, request: "HttpRequest", *_) -> None:
+        if (
+            request.method in SAFE_METHODS
+            and request.resolver_match.url_name in settings.API_REPLICA_READS
+            and REPLICA_STICKY_COOKIE not in request.COOKIES
+            and not request.META.get(REPLICA_STICKY_HEADER)
+        ):
+            replicas.enable()
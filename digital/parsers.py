@@ -2,6 +2,7 @@ import gzip
 import struct
 from typing import IO, Any, NamedTuple, Optional, Tuple
 
+from django.core.files.uploadhandler import MemoryFileUploadHandler
 from rest_framework.parsers import FileUploadParser
 
 from digital.uploadhandler import GZipUploadHandler
@@ -29,10 +30,17 @@ class GzipFileUploadParser(FileUploadParser):
         if gz_info:
             # This is a suitable moment to inject the gzipped file upload handler
             request = parser_context["request"]
-            request.upload_handlers.insert(
-                0,
+            upload_handlers = request.upload_handlers
+            # Content length is the compressed size and tells nothing
+            # about the decompressed one: always spool the result to disk
+            upload_handlers[:] = [
                 GZipUploadHandler(request, read_bytes),
-            )
+                *(
+                    handler
+                    for handler in upload_handlers
+                    if not isinstance(handler, MemoryFileUploadHandler)
+                ),
+            ]
             # Given that we have original filenames that differ from gzipped filenames,
             # we want to prefer the original one
             return gz_info.fname or filename
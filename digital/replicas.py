@@ -0,0 +1,97 @@
+"""
+Reads from replicas of the databases, see `DATABASE_REPLICAS`.
+
+Reads run on a replica only within `use_replicas`, which
+`digital.middleware.ReplicaReadMiddleware` enters for the read-only
+endpoints of `API_REPLICA_READS`. Replicas lagging behind by more than
+`DATABASE_REPLICA_MAX_LAG`, or unavailable, are skipped in favour of the
+primary. Replication lag is checked at most once per
+`DATABASE_REPLICA_LAG_CHECK_INTERVAL` by each process.
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+# Seconds since the last replayed transaction, zero when the replica has
+# replayed everything it received or isn't a replica at all.
+REPLICA_LAG_SQL: str = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+_local = threading.local()
+
+# Replication lags by replica alias, None for unavailable replicas, along
+# with the time they were checked.
+_lags: dict[str, tuple[float, Optional[float]]] = {}
+
+
+@contextmanager
+def use_replicas(enabled: bool = True) -> Iterator[None]:
+    """
+    Read from replicas, if any, or from primaries if not `enabled`.
+    """
+    previous = getattr(_local, "enabled", False)
+    _local.enabled = enabled
+    try:
+        yield
+    finally:
+        _local.enabled = previous
+
+
+def enable() -> None:
+    """
+    Read from replicas until the end of the enclosing `use_replicas`.
+    """
+    _local.enabled = True
+
+
+def _check_lag(alias: str) -> Optional[float]:
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(REPLICA_LAG_SQL)
+            (lag,) = cursor.fetchone()
+    except DatabaseError:
+        return None
+    return float(lag or 0)
+
+
+def get_lag(alias: str) -> Optional[float]:
+    """
+    Get the replication lag of a replica in seconds, as checked at most
+    `DATABASE_REPLICA_LAG_CHECK_INTERVAL` ago. Return None if it's unavailable.
+    """
+    now = time.monotonic()
+    checked_at, lag = _lags.get(alias, (None, None))
+    if checked_at is None or now - checked_at >= (
+        settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL
+    ):
+        lag = _check_lag(alias)
+        _lags[alias] = (now, lag)
+    return lag
+
+
+def get_read_alias(alias: str) -> str:
+    """
+    Get a replica of the database to read from, one of those close enough
+    to the primary, or the database itself if there are none or reads
+    don't go to replicas.
+    """
+    if not getattr(_local, "enabled", False):
+        return alias
+    replicas = [
+        replica
+        for replica in settings.DATABASE_REPLICAS.get(alias, ())
+        if (lag := get_lag(replica)) is not None
+        and lag <= settings.DATABASE_REPLICA_MAX_LAG
+    ]
+    return random.choice(replicas) if replicas else alias
@@ -52,6 +52,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "digital.middleware.QueryBudgetMiddleware",
+    "digital.middleware.ReplicaReadMiddleware",
 ]
 
 ROOT_URLCONF = "digital.urls"
@@ -86,6 +88,18 @@ DATABASES = {
 }
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+DATABASE_ROUTERS = ["dsrs.routers.TerritoryShardRouter"]
+
+# Aliases of the read replicas of each database, see `digital.replicas`.
+# Replicas lagging behind by more than `DATABASE_REPLICA_MAX_LAG` (in seconds),
+# as checked every `DATABASE_REPLICA_LAG_CHECK_INTERVAL`, aren't read from.
+# Clients read from primaries for `DATABASE_REPLICA_STICKINESS` seconds after
+# a write, or when sending an `X-Read-Primary` header.
+DATABASE_REPLICAS: dict[str, list[str]] = {}
+DATABASE_REPLICA_MAX_LAG: float = 5.0
+DATABASE_REPLICA_LAG_CHECK_INTERVAL: float = 1.0
+DATABASE_REPLICA_STICKINESS: int = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -128,4 +142,115 @@ STATIC_URL = "/static/"
 
 # App-specific settings
 
+# Either "python", "numpy" to validate and load stored DSR files in
+# vectorized batches with NumPy, or "sql" to validate them in the
+# database through an UNLOGGED staging table.
+DSR_INGESTION_ENGINE: str = "python"
+
+# DSRs left `ingesting` by workers which died are claimed again by others,
+# until they've been claimed this many times, then they're marked failed.
+DSR_INGESTION_MAX_ATTEMPTS: int = 3
+
+# Either "plain" to store uploaded DSR files as is, or "blocked_gzip" to
+# compress them in independent blocks of about this many bytes, with an
+# index allowing them to be decompressed in parallel by this many worker
+# processes (zero to decompress them in process). Fast readers require
+# "plain" files, stored on the local filesystem.
+DSR_STORAGE_FORMAT: str = "plain"
+DSR_STORAGE_BLOCK_SIZE: int = 4 * 1024 * 1024
+DSR_STORAGE_DECOMPRESSION_WORKERS: int = 0
+
+# Resources are imported in batches which adapt their row count towards
+# a target commit latency (in seconds), within bounds in rows and bytes.
 DSR_RESOURCE_IMPORT_BATCH_SIZE: int = 1000
+DSR_RESOURCE_IMPORT_MIN_BATCH_SIZE: int = 100
+DSR_RESOURCE_IMPORT_MAX_BATCH_SIZE: int = 50000
+DSR_RESOURCE_IMPORT_MAX_BATCH_BYTES: int = 16 * 1024 * 1024
+DSR_RESOURCE_IMPORT_TARGET_BATCH_LATENCY: float = 0.5
+
+# With the "python" engine, resources of the same recording within a DSR
+# can be merged at ingestion, summing their usages and revenue. Merged
+# resources are held in memory up to this many recordings at a time.
+DSR_COMBINE_DUPLICATE_RESOURCES: bool = False
+DSR_RESOURCE_COMBINER_MAX_SIZE: int = 100000
+
+# Number of recordings with the highest revenue and usages kept in the stats
+# of each DSR, for top recordings to be found without grouping resources.
+DSR_TOP_RECORDINGS_LIMIT: int = 100
+
+# Resources of DSRs archived with the `archive_dsrs` command, by default those
+# ending more than this many days ago, are moved to compressed archives
+# in this directory of the storage, in row groups of this many resources.
+# Archiving requires NumPy.
+DSR_ARCHIVE_DIR: str = "archives"
+DSR_ARCHIVE_AFTER_DAYS: int = 365
+DSR_ARCHIVE_ROW_GROUP_SIZE: int = 100000
+
+# DSRs of these territories, by code, are stored on these databases, other
+# DSRs on the default one. Shards have to be migrated like the default database.
+DSR_SHARDS: dict[str, list[str]] = {}
+
+DSR_LIST_DEFAULT_LIMIT: int = 100
+DSR_LIST_MAX_LIMIT: int = 1000
+
+# Resources of deleted DSRs are removed in the background in batches
+# of this many rows, pausing between batches (in seconds).
+DSR_DELETION_BATCH_SIZE: int = 10000
+DSR_DELETION_BATCH_DELAY: float = 0.1
+
+# Admin change lists show planner estimates instead of counting rows
+# above this size.
+ADMIN_EXACT_COUNT_THRESHOLD: int = 10000
+
+# Gzipped DSR uploads are decompressed on the fly, and aborted as soon as
+# the decompressed size or the compression ratio exceeds these limits.
+DSR_UPLOAD_MAX_DECOMPRESSED_SIZE: int = 50 * 1024 * 1024 * 1024
+DSR_UPLOAD_MAX_COMPRESSION_RATIO: float = 100.0
+DSR_UPLOAD_DECOMPRESSION_PIECE_SIZE: int = 1024 * 1024
+
+# Resumable uploads are received in this directory of the storage, or of the
+# system's temporary directory if the storage isn't on the local filesystem.
+DSR_UPLOAD_DIR: str = "uploads"
+
+# Resumable uploads declaring more bytes than this, as sent, are refused.
+# Plain ones are also held to `DSR_UPLOAD_MAX_DECOMPRESSED_SIZE`.
+DSR_UPLOAD_MAX_SIZE: int = 50 * 1024 * 1024 * 1024
+
+# Chunks of resumable uploads are refused past this size. Uploads which
+# haven't received a chunk for this many hours are deleted by the
+# `delete_stale_uploads` command.
+DSR_UPLOAD_MAX_CHUNK_SIZE: int = 64 * 1024 * 1024
+DSR_UPLOAD_EXPIRE_AFTER_HOURS: int = 24
+
+# Dry runs validate DSR files across this many worker processes (zero for one
+# per CPU), each given at least this many bytes, and report up to this many
+# invalid rows.
+DSR_VALIDATION_WORKERS: int = 0
+DSR_VALIDATION_MIN_RANGE_SIZE: int = 16 * 1024 * 1024
+DSR_VALIDATION_ERROR_SAMPLE_SIZE: int = 20
+
+# Resource search returns at most this many matches, in no particular order.
+RESOURCE_SEARCH_DEFAULT_LIMIT: int = 50
+RESOURCE_SEARCH_MAX_LIMIT: int = 500
+
+# Statements of each request run under a time budget (in milliseconds) set
+# by URL name, zero meaning no limit. Requests running out of budget get
+# a 503 response asking to retry after a delay (in seconds).
+API_STATEMENT_TIMEOUT: int = 5000
+API_STATEMENT_TIMEOUTS: dict[str, int] = {
+    # Uploads are ingested within the request.
+    "dsr-import": 0,
+    "dsr-amend": 0,
+    "resource-percentile": 15000,
+    # Falls back to grouping all resources when kept top recordings don't do.
+    "resource-top": 15000,
+}
+API_RETRY_AFTER: int = 30
+
+# Endpoints reading from replicas, by URL name, see `DATABASE_REPLICAS`.
+API_REPLICA_READS: list[str] = ["dsr-list", "dsr-detail", "resource-percentile"]
+
+# Statements of requests running longer than this (in seconds) are recorded
+# with their parameters and plan, see the `slow_query_report` command.
+SLOW_QUERY_THRESHOLD: float = 1.0
+SLOW_QUERY_LOG_PATH: Path = BASE_DIR / "data/slow_queries.jsonl"
@@ -2,14 +2,29 @@ from .base import *
 
 MEDIA_ROOT = "/var/www/media"
 STATIC_ROOT = "/var/www/static"
+SLOW_QUERY_LOG_PATH = "/var/www/slow_queries.jsonl"
+
+# The ASGI server doesn't serve static files.
+MIDDLEWARE = [
+    MIDDLEWARE[0],
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+    *MIDDLEWARE[1:],
+]
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "digital.backends.postgresql",
         "NAME": "postgres",
         "USER": "postgres",
         "PASSWORD": "postgres",
         "HOST": "db",
         "PORT": 5432,
+        # Web threads keep their connection between requests,
+        # checking it before first use in a request.
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+        # Connections are taken from a pool shared by the threads of
+        # a process, e.g. `ingest_dsrs --workers`.
+        "OPTIONS": {"pool": {"min_size": 2, "max_size": 10, "timeout": 10.0}},
     }
 }
@@ -1 +1,8 @@
 from .local import *
+
+# A second database for sharding tests, see `DSR_SHARDS`.
+DATABASES["shard"] = {**DATABASES["default"], "TEST": {"NAME": "test_shard"}}
+
+# A replica for replica read tests, reading the default test database,
+# see `DATABASE_REPLICAS`.
+DATABASES["replica"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
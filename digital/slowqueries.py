@@ -0,0 +1,89 @@
+"""
+Capture of slow database statements, with their parameters and query plan,
+into a local JSON lines file, see the `slow_query_report` command.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator, Optional, Union
+
+from django.conf import settings
+
+# Statements which can be explained without being executed.
+EXPLAINABLE_PREFIXES: tuple[str, ...] = ("SELECT", "WITH")
+
+_write_lock = threading.Lock()
+
+
+def _explain(connection, sql: str, params) -> Optional[list]:
+    # Use a raw cursor, so that neither execute wrappers nor the results
+    # of the wrapped cursor are involved.
+    try:
+        with connection.connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+    except connection.Database.Error:
+        return None
+    return json.loads(plan) if isinstance(plan, str) else plan
+
+
+def record_slow_query(record: dict[str, Any]) -> None:
+    line = json.dumps(record, default=str)
+    with _write_lock:
+        with Path(settings.SLOW_QUERY_LOG_PATH).open("a") as fp:
+            fp.write(f"{line}\n")
+
+
+def read_slow_queries(path: Union[str, Path]) -> Iterator[dict[str, Any]]:
+    with Path(path).open() as fp:
+        for line in fp:
+            if line.strip():
+                yield json.loads(line)
+
+
+class SlowQueryRecorder:
+    """
+    Execute wrapper recording statements running for at least
+    `SLOW_QUERY_THRESHOLD` seconds, including failed ones.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.monotonic()
+        error = None
+        try:
+            return execute(sql, params, many, context)
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            duration = time.monotonic() - start
+            if duration >= settings.SLOW_QUERY_THRESHOLD:
+                self._record(sql, params, many, context, duration, error)
+
+    def _record(self, sql, params, many, context, duration, error) -> None:
+        connection = context["connection"]
+        plan = None
+        if (
+            not many
+            and sql.lstrip().upper().startswith(EXPLAINABLE_PREFIXES)
+            # A failed statement aborts the transaction it runs in.
+            and (error is None or not connection.in_atomic_block)
+        ):
+            plan = _explain(connection, sql, params)
+        record_slow_query(
+            {
+                "time": datetime.now(timezone.utc).isoformat(),
+                "path": self.path,
+                "duration": round(duration, 6),
+                "sql": sql,
+                "params": None if many else params,
+                "plan": plan,
+                "error": str(error) if error else None,
+            }
+        )
@@ -0,0 +1,72 @@
+import io
+from typing import Optional
+
+from django.core.files.uploadedfile import TemporaryUploadedFile
+
+from digital.parsers import _get_gz_info
+from digital.uploadhandler import GzipStreamDecompressor
+
+# How much of the upload to buffer before looking for a gzip header.
+HEAD_SIZE: int = 64 * 1024
+
+
+class StreamingUpload:
+    """
+    Receive an uploaded file chunk by chunk into a temporary file,
+    decompressing it on the fly when gzipped.
+
+    Calls are blocking, and are meant to be run off the event loop.
+    """
+
+    def __init__(self, filename: Optional[str] = None) -> None:
+        self.filename = filename
+        self.file = TemporaryUploadedFile(
+            name="upload",
+            content_type="text/tab-separated-values",
+            size=0,
+            charset=None,
+        )
+        self._head = bytearray()
+        self._started = False
+        self._decompressor: Optional[GzipStreamDecompressor] = None
+
+    def write(self, data: bytes) -> None:
+        if self._started:
+            self._write(data)
+            return
+        self._head += data
+        if len(self._head) >= HEAD_SIZE:
+            self._start()
+
+    def _start(self) -> None:
+        self._started = True
+        head, self._head = bytes(self._head), bytearray()
+        gz_info, _ = _get_gz_info(io.BytesIO(head))
+        if gz_info:
+            self._decompressor = GzipStreamDecompressor()
+            # Prefer the original filename over the gzipped one
+            self.filename = gz_info.fname or self.filename
+        self._write(head)
+
+    def _write(self, data: bytes) -> None:
+        if self._decompressor:
+            data = self._decompressor.decompress(data)
+        self.file.write(data)
+
+    def finish(self) -> Optional[TemporaryUploadedFile]:
+        """
+        Get the received file, or None if its filename is unknown.
+        """
+        if not self._started:
+            self._start()
+        if self._decompressor:
+            self._decompressor.finish()
+        if not self.filename:
+            return None
+        self.file.name = self.filename
+        self.file.size = self.file.tell()
+        self.file.seek(0)
+        return self.file
+
+    def close(self) -> None:
+        self.file.close()
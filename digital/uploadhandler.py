@@ -1,58 +1,87 @@
-import gzip
-import io
+import zlib
 from typing import TYPE_CHECKING, Optional
 
+from django.conf import settings
 from django.core.files.uploadhandler import FileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
 
 if TYPE_CHECKING:
     from django.http.request import HttpRequest  # pragma: no cover
 
 
-class StreamGzipReader(gzip._GzipReader):
-    def read_chunk(self, size=-1):
-        # size=0 is special because decompress(max_length=0) is not supported
-        if not size:
-            return b""
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = (
+        "Decompressed upload exceeds the allowed size or compression ratio."
+    )
+    default_code = "upload_too_large"
 
-        # For certain input data, a single
-        # call to decompress() may not return
-        # any data. In this case, retry until we get some data or reach EOF.
-        while True:
+
+class GzipStreamDecompressor:
+    """
+    Incrementally decompress a (possibly multi-member) gzip stream
+    fed in arbitrary chunks.
+
+    Output is produced in bounded pieces, and decompression is aborted
+    with `UploadTooLarge` as soon as the decompressed size or the compression
+    ratio exceeds the configured limits, so that a small but highly
+    compressible upload can't exhaust memory or disk.
+    """
+
+    # Small files may legitimately compress well, only check the ratio
+    # past this decompressed size.
+    RATIO_GRACE_SIZE: int = 1024 * 1024
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        max_ratio: Optional[float] = None,
+    ) -> None:
+        self.max_size = max_size or settings.DSR_UPLOAD_MAX_DECOMPRESSED_SIZE
+        self.max_ratio = max_ratio or settings.DSR_UPLOAD_MAX_COMPRESSION_RATIO
+        self.piece_size = settings.DSR_UPLOAD_DECOMPRESSION_PIECE_SIZE
+        self.compressed_size = 0
+        self.decompressed_size = 0
+        self._decompressor = self._new_decompressor()
+        self._in_member = False
+
+    @staticmethod
+    def _new_decompressor():
+        # Let zlib parse and verify gzip headers and trailers.
+        return zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+
+    def _check_limits(self) -> None:
+        if self.decompressed_size > self.max_size:
+            raise UploadTooLarge()
+        if (
+            self.decompressed_size > self.RATIO_GRACE_SIZE
+            and self.decompressed_size > self.compressed_size * self.max_ratio
+        ):
+            raise UploadTooLarge()
+
+    def decompress(self, data: bytes) -> bytes:
+        self.compressed_size += len(data)
+        pieces = []
+        while data:
+            self._in_member = True
+            piece = self._decompressor.decompress(data, self.piece_size)
+            self.decompressed_size += len(piece)
+            self._check_limits()
+            pieces.append(piece)
             if self._decompressor.eof:
-                # Ending case: we've come to the end of a member in the file,
-                # so finish up this member, and read a new gzip header.
-                # Check the CRC and file size, and set the flag so we read
-                # a new member
-                self._read_eof()
-                self._new_member = True
-                self._decompressor = self._decomp_factory(**self._decomp_args)
-
-            if self._new_member:
-                # If the _new_member flag is set, we have to
-                # jump to the next member, if there is one.
-                self._init_read()
-                if not self._read_gzip_header():
-                    self._size = self._pos
-                    return b""
-                self._new_member = False
-
-            # Read a chunk of data from the file
-            buf = self._fp.read(io.DEFAULT_BUFFER_SIZE)
-
-            uncompress = self._decompressor.decompress(buf)
-            if self._decompressor.unconsumed_tail != b"":
-                self._fp.prepend(self._decompressor.unconsumed_tail)
-            elif self._decompressor.unused_data != b"":
-                # Prepend the already read bytes to the fileobj so they can
-                # be seen by _read_eof() and _read_gzip_header()
-                self._fp.prepend(self._decompressor.unused_data)
-
-            if uncompress != b"" or buf == b"":
-                break
-
-        self._add_read_data(uncompress)
-        self._pos += len(uncompress)
-        return uncompress
+                # Ending case: we've come to the end of a member,
+                # whatever follows is the next one.
+                data = self._decompressor.unused_data
+                self._decompressor = self._new_decompressor()
+                self._in_member = False
+            else:
+                data = self._decompressor.unconsumed_tail
+        return b"".join(pieces)
+
+    def finish(self) -> None:
+        if self._in_member:
+            raise EOFError("Compressed file ended before the end-of-stream marker")
 
 
 class GZipUploadHandler(FileUploadHandler):
@@ -64,18 +93,17 @@ class GZipUploadHandler(FileUploadHandler):
         self, request: "HttpRequest", header_bytes: Optional[bytes] = None
     ) -> None:
         super().__init__(request=request)
-        self.buf = buf = io.BytesIO()
-        if header_bytes:
-            buf.write(header_bytes)
-        self.gzipped = StreamGzipReader(buf)
+        self.header_bytes = header_bytes or b""
+        self.decompressor = GzipStreamDecompressor()
 
     def receive_data_chunk(self, raw_data: bytes, start: int) -> bytes:
-        self.buf.write(raw_data)
-        self.buf.seek(start)
-        data = self.gzipped.read_chunk()
-        self.buf.truncate()
-        return data
+        if self.header_bytes:
+            raw_data = self.header_bytes + raw_data
+            self.header_bytes = b""
+        try:
+            return self.decompressor.decompress(raw_data)
+        except zlib.error as exc:
+            raise ParseError(f"Gzip decompression error: {exc}")
 
     def file_complete(self, *_) -> None:
-        self.gzipped.close()
-        self.buf.close()
+        return None
@@ -13,20 +13,51 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+
 from django.contrib import admin
 from django.urls import include, path, re_path
 from rest_framework import routers
 
+from digital.views import DatabasePoolsView
 from dsrs import views
 
 router = routers.DefaultRouter()
+# Before DSRs, whose detail route would match uploads.
+router.register(r"dsrs/uploads", views.DSRUploadViewSet)
 router.register(r"dsrs", views.DSRViewSet)
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics/db-pools/", DatabasePoolsView.as_view(), name="database-pools"),
     path("", include(router.urls)),
     re_path(
         r"^resources/percentile/(?P<number>[1-9][0-9]?|100)/$",
         views.ResourcePercentileView.as_view(),
+        name="resource-percentile",
+    ),
+    re_path(
+        r"^resources/percentile/(?P<number>[1-9][0-9]?|100)/monthly/$",
+        views.ResourceMonthlyPercentileView.as_view(),
+        name="resource-monthly-percentile",
+    ),
+    re_path(
+        r"^resources/top/(?P<n>[1-9][0-9]{0,2}|1000)/$",
+        views.ResourceTopView.as_view(),
+        name="resource-top",
+    ),
+    path(
+        "resources/",
+        views.RecordingRevenueByISRCView.as_view(),
+        name="recording-revenue-by-isrc",
+    ),
+    path(
+        "resources/search/",
+        views.ResourceSearchView.as_view(),
+        name="resource-search",
+    ),
+    path(
+        "resources/<str:dsp_id>/",
+        views.RecordingRevenueByDSPIdView.as_view(),
+        name="recording-revenue-by-dsp-id",
     ),
 ]
@@ -0,0 +1,19 @@
+from typing import TYPE_CHECKING
+
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from digital.backends.postgresql.pool import get_pools_stats
+
+if TYPE_CHECKING:
+    from rest_framework.request import Request  # pragma: no cover
+
+
+class DatabasePoolsView(APIView):
+    """
+    Sizes and wait times of the database connection pools
+    of the serving process.
+    """
+
+    def get(self, request: "Request") -> Response:
+        return Response(get_pools_stats())
@@ -1,13 +1,213 @@
+import json
+from typing import Optional
+
 from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import QuerySet
+from django.http import HttpRequest, QueryDict
+from django.utils.functional import cached_property
 
-from dsrs import models
+from dsrs import models, services, sharding
+
+KEYSET_VAR = "after"
+SHARD_VAR = "shard"
+
+
+def estimate_count(queryset: QuerySet) -> int:
+    """
+    Estimate the number of rows in a queryset from planner statistics.
+
+    Unfiltered querysets use `pg_class.reltuples`, filtered ones the row
+    estimate of their query plan. Small estimates are replaced with
+    exact counts, as these are cheap and users expect them to be right.
+    """
+    estimate = -1
+    with connections[queryset.db].cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            estimate = int(cursor.fetchone()[0])
+        if estimate < 0:
+            # Filtered or never analyzed, ask the planner instead.
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = int(plan[0]["Plan"]["Plan Rows"])
+    if estimate < settings.ADMIN_EXACT_COUNT_THRESHOLD:
+        return queryset.count()
+    return estimate
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self) -> int:
+        return estimate_count(self.object_list)
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Change list paginated by primary key instead of offset, so that
+    every page is an index range scan no matter how deep it is.
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(KEYSET_VAR, None)
+        return lookup_params
+
+    def get_results(self, request):
+        super().get_results(request)
+        self.multi_page = False
+        self.can_show_all = False
+
+        queryset = self.queryset
+        if after := self.params.get(KEYSET_VAR):
+            if not after.isdigit():
+                raise IncorrectLookupParameters(f"Invalid page key: {after!r}")
+            queryset = queryset.filter(pk__gt=after)
+        result_list = list(queryset.order_by("pk")[: self.list_per_page + 1])
+
+        self.result_list = result_list[: self.list_per_page]
+        self.next_after: Optional[int] = None
+        if len(result_list) > self.list_per_page:
+            self.next_after = self.result_list[-1].pk
+
+    @property
+    def first_page_url(self) -> Optional[str]:
+        if KEYSET_VAR in self.params:
+            return self.get_query_string(remove=[KEYSET_VAR])
+        return None
+
+    @property
+    def next_page_url(self) -> Optional[str]:
+        if self.next_after is not None:
+            return self.get_query_string({KEYSET_VAR: self.next_after})
+        return None
+
+
+class DSRIdFilter(admin.SimpleListFilter):
+    """
+    Filter by DSR id typed in, rather than picked from a list of every DSR.
+    """
+
+    title = "DSR id"
+    parameter_name = "dsr__id__exact"
+    template = "admin/dsrs/input_filter.html"
+
+    def lookups(self, *_):
+        # A single, empty choice, for the filter to be shown.
+        return ((None, None),)
+
+    def choices(self, changelist):
+        yield {
+            "query_parts": [
+                (name, value)
+                for name, value in changelist.params.items()
+                if name not in (self.parameter_name, KEYSET_VAR)
+            ],
+        }
+
+    def queryset(self, _, queryset):
+        if (dsr_id := self.value()) is None:
+            return queryset
+        if not dsr_id.isdigit():
+            raise IncorrectLookupParameters(f"Invalid DSR id: {dsr_id!r}")
+        return queryset.filter(dsr_id=dsr_id)
+
+
+def get_request_shard(request: HttpRequest) -> str:
+    """
+    Get the shard picked in the change list, or in the change list the
+    request comes from, see `ShardFilter`. The default database otherwise.
+    """
+    params = request.GET
+    if changelist_filters := params.get("_changelist_filters"):
+        params = QueryDict(changelist_filters)
+    alias = params.get(SHARD_VAR)
+    return alias if alias in sharding.get_aliases() else DEFAULT_DB_ALIAS
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """
+    Pick the shard to list DSR data of, see `dsrs.sharding`, the default
+    database unless picked. Only shown with several shards.
+    """
+
+    title = "shard"
+    parameter_name = SHARD_VAR
+
+    def lookups(self, *_):
+        aliases = sharding.get_aliases()
+        return [(alias, alias) for alias in aliases] if len(aliases) > 1 else []
+
+    def choices(self, changelist):
+        for alias, title in self.lookup_choices:
+            yield {
+                "selected": (self.value() or DEFAULT_DB_ALIAS) == alias,
+                "query_string": changelist.get_query_string(
+                    {self.parameter_name: alias}, [KEYSET_VAR]
+                ),
+                "display": title,
+            }
+
+    def queryset(self, _, queryset):
+        if self.value() not in (None, *sharding.get_aliases()):
+            raise IncorrectLookupParameters(f"Invalid shard: {self.value()!r}")
+        # Already read from the shard, see `DeleteOnlyAdmin.get_queryset`.
+        return queryset
 
 
-@admin.register(models.Resource)
-@admin.register(models.DSR)
 class DeleteOnlyAdmin(admin.ModelAdmin):
     form = forms.ModelForm
+    change_list_template = "admin/dsrs/keyset_change_list.html"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ("id",)
+    sortable_by = ()
 
     def has_add_permission(self, *_):
         return False
+
+    def get_changelist(self, *_, **__):
+        return KeysetChangeList
+
+    def get_list_filter(self, request):
+        return (ShardFilter, *super().get_list_filter(request))
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).using(get_request_shard(request))
+
+
+@admin.register(models.DSR)
+class DSRAdmin(DeleteOnlyAdmin):
+    """
+    Deleting DSRs only marks them for deletion, their resources are
+    deleted in the background by `delete_dsrs` workers.
+    """
+
+    list_display = ("__str__", "status", "deleted_resource_count")
+
+    def get_deleted_objects(self, objs, request):
+        # Don't collect the resources, there can be millions of them.
+        return [str(obj) for obj in objs], {"DSRs": len(objs)}, set(), []
+
+    def delete_model(self, request, obj):
+        services.mark_dsr_for_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        services.mark_dsrs_for_deletion(queryset)
+
+
+@admin.register(models.Resource)
+class ResourceAdmin(DeleteOnlyAdmin):
+    list_filter = (DSRIdFilter,)
+    raw_id_fields = ("dsr",)
@@ -0,0 +1,237 @@
+"""
+Incremental maintenance of the monthly aggregates materialized
+in `MonthlyResourceRevenue`.
+
+A DSR covering several calendar months contributes to each of them
+proportionally to the number of its days falling into the month. Shares are
+computed as differences of cumulative, rounded amounts, so they always sum
+up to the exact DSR totals, and removing a DSR subtracts exactly what adding
+it did.
+"""
+
+from itertools import islice
+from typing import Iterable, Optional
+
+from django.conf import settings
+
+from dsrs import sharding
+from dsrs.archives import ArchivedRecording
+from dsrs.models import DSR
+
+RECORDINGS_SQL = """
+        SELECT
+            dsrs_resource.dsp_id,
+            dsrs_resource.title,
+            dsrs_resource.artists,
+            dsrs_resource.isrc,
+            SUM(dsrs_resource.usages) AS usages,
+            SUM(dsrs_resource.revenue) AS revenue
+        FROM dsrs_resource
+        WHERE dsrs_resource.dsr_id = %(dsr_id)s
+            AND (
+                %(dsp_ids)s::text[] IS NULL
+                OR dsrs_resource.dsp_id = ANY(%(dsp_ids)s::text[])
+            )
+        GROUP BY
+            dsrs_resource.dsp_id,
+            dsrs_resource.title,
+            dsrs_resource.artists,
+            dsrs_resource.isrc
+"""
+
+# Sums of recordings of an archived DSR, by archive row group.
+CREATE_ARCHIVED_RECORDINGS_TABLE_SQL = """
+    CREATE TEMPORARY TABLE archived_recordings (
+        dsp_id text NOT NULL,
+        title text NOT NULL,
+        artists text NOT NULL,
+        isrc text NOT NULL,
+        usages bigint NOT NULL,
+        revenue numeric NOT NULL
+    ) ON COMMIT DROP
+"""
+
+INSERT_ARCHIVED_RECORDINGS_SQL = """
+    INSERT INTO archived_recordings
+    SELECT * FROM UNNEST(
+        %(dsp_ids)s::text[],
+        %(titles)s::text[],
+        %(artists)s::text[],
+        %(isrcs)s::text[],
+        %(usages)s::bigint[],
+        %(revenues)s::numeric[]
+    )
+"""
+
+# Same as `RECORDINGS_SQL`, for a DSR whose resources were archived.
+# Usages add up as bigint, as they do for integer resource usages.
+ARCHIVED_RECORDINGS_SQL = """
+        SELECT
+            dsp_id,
+            title,
+            artists,
+            isrc,
+            SUM(usages)::bigint AS usages,
+            SUM(revenue) AS revenue
+        FROM archived_recordings
+        GROUP BY dsp_id, title, artists, isrc
+"""
+
+# Monthly shares of the recordings of a DSR, from one of the above.
+DSR_MONTHLY_SHARES_SQL = """
+    WITH months AS (
+        SELECT
+            month::date AS month,
+            LEAST(
+                (month + INTERVAL '1 month' - INTERVAL '1 day')::date,
+                %(period_end)s
+            ) - GREATEST(month::date, %(period_start)s) + 1 AS days
+        FROM GENERATE_SERIES(
+            DATE_TRUNC('month', %(period_start)s::date),
+            %(period_end)s::date,
+            INTERVAL '1 month'
+        ) AS month
+    ),
+    weights AS (
+        SELECT
+            month,
+            SUM(days) OVER (ORDER BY month) - days AS days_before,
+            SUM(days) OVER (ORDER BY month) AS days_through,
+            SUM(days) OVER () AS days_total
+        FROM months
+    ),
+    recordings AS ({recordings}),
+    shares AS (
+        SELECT
+            weights.month,
+            recordings.dsp_id,
+            recordings.title,
+            recordings.artists,
+            recordings.isrc,
+            FLOOR(recordings.usages * weights.days_through / weights.days_total)
+            - FLOOR(recordings.usages * weights.days_before / weights.days_total)
+            AS usages,
+            ROUND(recordings.revenue * weights.days_through / weights.days_total, 20)
+            - ROUND(recordings.revenue * weights.days_before / weights.days_total, 20)
+            AS revenue
+        FROM recordings CROSS JOIN weights
+    )
+"""
+
+
+ADD_DSR_SQL = DSR_MONTHLY_SHARES_SQL.format(recordings=RECORDINGS_SQL) + """
+    INSERT INTO dsrs_monthlyresourcerevenue AS aggregate (
+        territory_id, month, dsp_id, title, artists, isrc, usages, revenue, dsr_ids
+    )
+    SELECT
+        %(territory_id)s,
+        shares.month,
+        shares.dsp_id,
+        shares.title,
+        shares.artists,
+        shares.isrc,
+        shares.usages,
+        shares.revenue,
+        ARRAY[%(dsr_id)s]::bigint[]
+    FROM shares
+    ON CONFLICT (territory_id, month, dsp_id, title, artists, isrc) DO UPDATE SET
+        usages = aggregate.usages + EXCLUDED.usages,
+        revenue = aggregate.revenue + EXCLUDED.revenue,
+        dsr_ids = aggregate.dsr_ids || EXCLUDED.dsr_ids
+    WHERE NOT %(dsr_id)s = ANY(aggregate.dsr_ids);
+"""
+
+SUBTRACT_SHARES_SQL = """
+    UPDATE dsrs_monthlyresourcerevenue AS aggregate SET
+        usages = aggregate.usages - shares.usages,
+        revenue = aggregate.revenue - shares.revenue,
+        dsr_ids = ARRAY_REMOVE(aggregate.dsr_ids, %(dsr_id)s)
+    FROM shares
+    WHERE aggregate.territory_id = %(territory_id)s
+        AND aggregate.month = shares.month
+        AND aggregate.dsp_id = shares.dsp_id
+        AND aggregate.title = shares.title
+        AND aggregate.artists = shares.artists
+        AND aggregate.isrc = shares.isrc
+        AND %(dsr_id)s = ANY(aggregate.dsr_ids);
+"""
+
+REMOVE_DSR_SQL = (
+    DSR_MONTHLY_SHARES_SQL.format(recordings=RECORDINGS_SQL) + SUBTRACT_SHARES_SQL
+)
+
+REMOVE_ARCHIVED_DSR_SQL = (
+    DSR_MONTHLY_SHARES_SQL.format(recordings=ARCHIVED_RECORDINGS_SQL)
+    + SUBTRACT_SHARES_SQL
+)
+
+DELETE_EMPTY_SQL = """
+    DELETE FROM dsrs_monthlyresourcerevenue
+    WHERE territory_id = %(territory_id)s AND dsr_ids = '{}';
+"""
+
+
+def _get_params(dsr: DSR, dsp_ids: Optional[list[str]]) -> dict:
+    return {
+        "dsr_id": dsr.id,
+        "territory_id": dsr.territory_id,
+        "period_start": dsr.period_start,
+        "period_end": dsr.period_end,
+        "dsp_ids": dsp_ids,
+    }
+
+
+def add_dsr_to_monthly_aggregates(
+    dsr: DSR, dsp_ids: Optional[list[str]] = None
+) -> None:
+    """
+    Add the ingested resources of a DSR to the monthly aggregates,
+    optionally only those with the given DSP ids.
+    Adding the same resources twice has no effect.
+    """
+    with sharding.get_connection().cursor() as cursor:
+        cursor.execute(ADD_DSR_SQL, _get_params(dsr, dsp_ids))
+
+
+def remove_dsr_from_monthly_aggregates(
+    dsr: DSR, dsp_ids: Optional[list[str]] = None
+) -> None:
+    """
+    Subtract the resources of a DSR from the monthly aggregates,
+    optionally only those with the given DSP ids.
+    Must be called before the resources themselves are deleted.
+    """
+    with sharding.get_connection().cursor() as cursor:
+        cursor.execute(REMOVE_DSR_SQL, _get_params(dsr, dsp_ids))
+        cursor.execute(DELETE_EMPTY_SQL, _get_params(dsr, dsp_ids))
+
+
+def remove_archived_dsr_from_monthly_aggregates(
+    dsr: DSR, recordings: Iterable[ArchivedRecording]
+) -> None:
+    """
+    Same as `remove_dsr_from_monthly_aggregates`, for an archived DSR,
+    given the sums of its recordings as read by `archives.iter_recordings`.
+    They're copied to a temporary table in batches, within the transaction.
+    """
+    recordings = iter(recordings)
+    params = _get_params(dsr, dsp_ids=None)
+    with sharding.get_connection().cursor() as cursor:
+        cursor.execute(CREATE_ARCHIVED_RECORDINGS_TABLE_SQL)
+        while batch := list(islice(recordings, settings.DSR_ARCHIVE_ROW_GROUP_SIZE)):
+            columns = list(zip(*batch))
+            cursor.execute(
+                INSERT_ARCHIVED_RECORDINGS_SQL,
+                {
+                    "dsp_ids": list(columns[0]),
+                    "titles": list(columns[1]),
+                    "artists": list(columns[2]),
+                    "isrcs": list(columns[3]),
+                    "usages": list(columns[4]),
+                    "revenues": list(columns[5]),
+                },
+            )
+        cursor.execute(REMOVE_ARCHIVED_DSR_SQL, params)
+        cursor.execute(DELETE_EMPTY_SQL, params)
+        # Several DSRs may be removed in the same transaction.
+        cursor.execute("DROP TABLE archived_recordings")
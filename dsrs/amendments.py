@@ -0,0 +1,196 @@
+"""
+Amendments of ingested DSRs, see `services.amend_dsr`.
+
+Resources of the amended DSR file are copied into a temporary table, then
+diffed against the stored resources of the DSR in SQL, keyed by DSP id.
+Only differences are written, and only the recordings of the changed
+DSP ids are taken out of and back into the monthly aggregates.
+"""
+
+import io
+from typing import Iterable
+
+from dsrs import sharding
+from dsrs.models import DSR, Resource
+
+# Dropped at the end of the amendment's transaction.
+CREATE_AMENDED_TABLE_SQL: str = """
+    CREATE TEMPORARY TABLE amended_resources (
+        dsp_id text NOT NULL,
+        title text NOT NULL,
+        artists text NOT NULL,
+        isrc text NOT NULL,
+        usages integer NOT NULL,
+        revenue numeric NOT NULL
+    ) ON COMMIT DROP
+"""
+
+COPY_AMENDED_SQL: str = """
+    COPY amended_resources (dsp_id, title, artists, isrc, usages, revenue)
+    FROM STDIN
+"""
+
+# Identical rows are matched first. The remaining ones are paired by DSP id,
+# and by rank for DSP ids repeated within the DSR, as updates. Rows to insert
+# have no id, rows to delete no DSP id.
+DIFF_SQL: str = """
+    CREATE TEMPORARY TABLE resource_changes ON COMMIT DROP AS
+    WITH amended AS (
+        SELECT
+            *,
+            ROW_NUMBER() OVER (
+                PARTITION BY dsp_id, title, artists, isrc, usages, revenue
+            ) AS copy
+        FROM amended_resources
+    ),
+    stored AS (
+        SELECT
+            id,
+            dsp_id,
+            title,
+            artists,
+            isrc,
+            usages,
+            revenue,
+            ROW_NUMBER() OVER (
+                PARTITION BY dsp_id, title, artists, isrc, usages, revenue
+            ) AS copy
+        FROM dsrs_resource
+        WHERE dsr_id = %(dsr_id)s
+    ),
+    unmatched AS (
+        SELECT
+            stored.id,
+            stored.dsp_id AS stored_dsp_id,
+            amended.dsp_id,
+            amended.title,
+            amended.artists,
+            amended.isrc,
+            amended.usages,
+            amended.revenue
+        FROM stored
+        -- Numerically equal revenues match whatever their scale.
+        FULL JOIN amended
+            ON amended.dsp_id = stored.dsp_id
+            AND amended.title = stored.title
+            AND amended.artists = stored.artists
+            AND amended.isrc = stored.isrc
+            AND amended.usages = stored.usages
+            AND amended.revenue = stored.revenue
+            AND amended.copy = stored.copy
+        WHERE stored.id IS NULL OR amended.dsp_id IS NULL
+    ),
+    removed AS (
+        SELECT
+            id,
+            stored_dsp_id,
+            ROW_NUMBER() OVER (PARTITION BY stored_dsp_id ORDER BY id) AS rank
+        FROM unmatched
+        WHERE id IS NOT NULL
+    ),
+    added AS (
+        SELECT
+            dsp_id,
+            title,
+            artists,
+            isrc,
+            usages,
+            revenue,
+            ROW_NUMBER() OVER (
+                PARTITION BY dsp_id ORDER BY title, artists, isrc, usages, revenue
+            ) AS rank
+        FROM unmatched
+        WHERE id IS NULL
+    )
+    SELECT
+        removed.id,
+        removed.stored_dsp_id,
+        added.dsp_id,
+        added.title,
+        added.artists,
+        added.isrc,
+        added.usages,
+        added.revenue
+    FROM removed
+    FULL JOIN added
+        ON added.dsp_id = removed.stored_dsp_id AND added.rank = removed.rank
+"""
+
+CHANGED_DSP_IDS_SQL: str = """
+    SELECT DISTINCT COALESCE(dsp_id, stored_dsp_id) FROM resource_changes
+"""
+
+DELETE_SQL: str = """
+    DELETE FROM dsrs_resource
+    WHERE id IN (SELECT id FROM resource_changes WHERE dsp_id IS NULL)
+"""
+
+UPDATE_SQL: str = """
+    UPDATE dsrs_resource SET
+        title = resource_changes.title,
+        artists = resource_changes.artists,
+        isrc = resource_changes.isrc,
+        usages = resource_changes.usages,
+        revenue = resource_changes.revenue
+    FROM resource_changes
+    WHERE dsrs_resource.id = resource_changes.id
+        AND resource_changes.dsp_id IS NOT NULL
+"""
+
+INSERT_SQL: str = """
+    INSERT INTO dsrs_resource (dsr_id, dsp_id, title, artists, isrc, usages, revenue)
+    SELECT %(dsr_id)s, dsp_id, title, artists, isrc, usages, revenue
+    FROM resource_changes
+    WHERE id IS NULL
+"""
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def create_amended_table() -> None:
+    with sharding.get_connection().cursor() as cursor:
+        cursor.execute(CREATE_AMENDED_TABLE_SQL)
+
+
+def copy_amended_resources(resources: Iterable[Resource]) -> None:
+    data = "".join(
+        f"{_escape(resource.dsp_id)}\t{_escape(resource.title)}\t"
+        f"{_escape(resource.artists)}\t{_escape(resource.isrc)}\t"
+        f"{resource.usages}\t{resource.revenue}\n"
+        for resource in resources
+    )
+    with sharding.get_connection().cursor() as cursor:
+        cursor.copy_expert(COPY_AMENDED_SQL, io.StringIO(data))
+
+
+def diff_amended_resources(dsr: DSR) -> list[str]:
+    """
+    Compute changes between the copied resources and the stored ones.
+    Return the DSP ids they affect.
+    """
+    with sharding.get_connection().cursor() as cursor:
+        cursor.execute(DIFF_SQL, {"dsr_id": dsr.id})
+        cursor.execute(CHANGED_DSP_IDS_SQL)
+        return [dsp_id for dsp_id, in cursor.fetchall()]
+
+
+def apply_resource_changes(dsr: DSR) -> tuple[int, int, int]:
+    """
+    Write the computed changes to the resources of the DSR.
+    Return the numbers of inserted, updated and deleted resources.
+    """
+    with sharding.get_connection().cursor() as cursor:
+        cursor.execute(DELETE_SQL)
+        deleted = cursor.rowcount
+        cursor.execute(UPDATE_SQL)
+        updated = cursor.rowcount
+        cursor.execute(INSERT_SQL, {"dsr_id": dsr.id})
+        inserted = cursor.rowcount
+    return inserted, updated, deleted
@@ -0,0 +1,208 @@
+"""
+Cold storage of the resources of old DSRs, see `services.archive_dsr`.
+
+Resources of an archived DSR are moved out of `dsrs_resource` into a
+compressed zip archive of NumPy arrays, one per column and row group of at
+most `DSR_ARCHIVE_ROW_GROUP_SIZE` resources, so that archives are written and
+read a row group at a time. Revenues are kept exact as scaled integers, split
+into base 10^10 limbs which can be summed with NumPy.
+
+Queries covering archived DSRs read their archives a row group at a time,
+sum up resources by recording with NumPy, and merge the sums with those of
+live DSRs in Python.
+
+Requires NumPy.
+"""
+
+import tempfile
+import zipfile
+from datetime import date
+from decimal import Decimal
+from itertools import islice
+from typing import IO, Iterable, Iterator, Optional, Sequence
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.core.files.storage import Storage, get_storage_class
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.query import QuerySet
+
+from dsrs.models import DSR, Resource
+from dsrs.readers import FIELDNAMES
+from dsrs.stats import REVENUE_CONTEXT
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+KEY_NAMES: tuple[str, ...] = FIELDNAMES[:4]
+
+REVENUE_SCALE: int = Resource._meta.get_field("revenue").decimal_places
+LIMB_BASE: int = 10**10
+# Enough limbs for the largest revenue, scaled to an integer.
+LIMB_COUNT: int = -(-Resource._meta.get_field("revenue").max_digits // 10)
+
+# A recording, its summed usages and revenue, and its number of resources.
+ArchivedRecording = tuple[str, str, str, str, int, Decimal, int]
+
+
+def check_numpy() -> None:
+    if np is None:
+        raise ImproperlyConfigured("NumPy is required to archive DSRs.")
+
+
+def _split_revenues(revenues: Sequence[Decimal]) -> "np.ndarray":
+    limbs = np.empty((len(revenues), LIMB_COUNT), dtype=np.int64)
+    for row, revenue in enumerate(revenues):
+        scaled = int(revenue.scaleb(REVENUE_SCALE, context=REVENUE_CONTEXT))
+        magnitude = abs(scaled)
+        for index in range(LIMB_COUNT):
+            magnitude, limb = divmod(magnitude, LIMB_BASE)
+            limbs[row, index] = -limb if scaled < 0 else limb
+    return limbs
+
+
+def _join_revenues(limbs: "np.ndarray") -> list[Decimal]:
+    weights = np.array([LIMB_BASE**index for index in range(LIMB_COUNT)], dtype=object)
+    return [
+        Decimal(int(total)).scaleb(-REVENUE_SCALE, context=REVENUE_CONTEXT)
+        for total in limbs.astype(object) @ weights
+    ]
+
+
+def write_archive(
+    fp: IO[bytes], resources: Iterable[tuple], row_group_size: Optional[int] = None
+) -> None:
+    """
+    Write resources, as tuples of values in the order of `FIELDNAMES`,
+    to a compressed archive, a row group at a time.
+    """
+    row_group_size = row_group_size or settings.DSR_ARCHIVE_ROW_GROUP_SIZE
+    resources = iter(resources)
+    with zipfile.ZipFile(fp, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        group = 0
+        while rows := list(islice(resources, row_group_size)):
+            columns = list(zip(*rows))
+            arrays = {
+                name: np.array(values, dtype=str)
+                for name, values in zip(KEY_NAMES, columns)
+            }
+            arrays["usages"] = np.array(columns[4], dtype=np.int64)
+            arrays["revenue"] = _split_revenues(columns[5])
+            for name, array in arrays.items():
+                with archive.open(
+                    f"{group}/{name}.npy", mode="w", force_zip64=True
+                ) as member:
+                    np.lib.format.write_array(member, array, allow_pickle=False)
+            group += 1
+
+
+def iter_row_groups(fp: IO[bytes]) -> Iterator[dict[str, "np.ndarray"]]:
+    """
+    Read the row groups of an archive, as arrays by column name.
+    """
+    with zipfile.ZipFile(fp) as archive:
+        groups = sorted({int(name.split("/")[0]) for name in archive.namelist()})
+        for group in groups:
+            columns = {}
+            for name in FIELDNAMES:
+                with archive.open(f"{group}/{name}.npy") as member:
+                    columns[name] = np.lib.format.read_array(member)
+            yield columns
+
+
+def _group_archive(
+    columns: dict[str, "np.ndarray"],
+) -> tuple[list["np.ndarray"], "np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    Group resources by recording. Return the recordings, their summed usages
+    and revenue limbs, and their numbers of resources.
+    """
+    keys = [columns[name] for name in KEY_NAMES]
+    order = np.lexsort(keys[::-1])
+    keys = [key[order] for key in keys]
+    changed = np.zeros(len(order), dtype=bool)
+    changed[:1] = True
+    for key in keys:
+        changed[1:] |= key[1:] != key[:-1]
+    starts = np.flatnonzero(changed)
+    return (
+        [key[starts] for key in keys],
+        np.add.reduceat(columns["usages"][order], starts),
+        np.add.reduceat(columns["revenue"][order], starts, axis=0),
+        np.diff(np.append(starts, len(order))),
+    )
+
+
+def iter_recordings(
+    storage: Storage, name: str, dsp_ids: Optional[Iterable[str]] = None
+) -> Iterator[ArchivedRecording]:
+    """
+    Sum up usages and revenue by recording over the resources of an archive,
+    optionally only those with the given DSP ids. Recordings come up once per
+    row group holding them.
+    """
+    if dsp_ids is not None:
+        dsp_ids = np.array(list(dsp_ids), dtype=str)
+    with storage.open(name) as fp:
+        for columns in iter_row_groups(fp):
+            if dsp_ids is not None:
+                mask = np.isin(columns["dsp_id"], dsp_ids)
+                columns = {name: column[mask] for name, column in columns.items()}
+            if not len(columns["usages"]):
+                continue
+            keys, usages, limbs, counts = _group_archive(columns)
+            yield from zip(
+                *(key.tolist() for key in keys),
+                usages.tolist(),
+                _join_revenues(limbs),
+                counts.tolist(),
+            )
+
+
+def iter_stored_recordings(
+    name: str, dsp_ids: Optional[Iterable[str]] = None
+) -> Iterator[ArchivedRecording]:
+    """
+    `iter_recordings` over an archive in the default storage.
+    """
+    check_numpy()
+    return iter_recordings(get_storage_class()(), name, dsp_ids=dsp_ids)
+
+
+def save_archive(dsr: DSR) -> str:
+    """
+    Write the resources of a DSR of the current shard to an archive in the
+    default storage, see `write_archive`. Return its name.
+    """
+    resources = (
+        Resource.objects.filter(dsr=dsr)
+        .order_by("id")
+        .values_list(*FIELDNAMES)
+        .iterator()
+    )
+    with tempfile.TemporaryFile() as fp:
+        write_archive(fp, resources)
+        return get_storage_class()().save(
+            content=File(fp), name=f"{settings.DSR_ARCHIVE_DIR}/{dsr.id}.npz"
+        )
+
+
+def get_dsrs_to_archive(alias: str, period_end: date) -> QuerySet:
+    """
+    Get the ingested DSRs of a shard ending before `period_end`, and those
+    whose archival was interrupted.
+    """
+    interrupted = Q(
+        Exists(Resource.objects.filter(dsr=OuterRef("pk"))), status="archived"
+    )
+    return (
+        DSR.objects.using(alias)
+        .filter(
+            Q(status__in=("ingested", "failed")) | interrupted,
+            period_end__lt=period_end,
+        )
+        .order_by("id")
+    )
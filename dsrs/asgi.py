@@ -0,0 +1,107 @@
+import zlib
+from typing import Any, Optional, Sequence
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http.multipartparser import parse_header
+from rest_framework.renderers import JSONRenderer
+
+from digital.middleware import get_replica_sticky_cookie
+from digital.streaming import StreamingUpload
+from digital.uploadhandler import UploadTooLarge
+from dsrs import serializers, services
+
+
+class DSRStreamingImportMiddleware:
+    """
+    ASGI middleware serving DSR imports without buffering request bodies.
+
+    Django reads the whole body before calling a view, so a slow client
+    uploading a large DSR would hold a worker for the whole transfer. Here,
+    the body is consumed as it arrives, and decompression and storage writes
+    run in threads, leaving the event loop free to serve other uploads.
+    The DSR is left pending for the ingestion workers, and the client
+    reads from primaries for a while, as after writes served by Django,
+    see `digital.middleware.ReplicaReadMiddleware`.
+    """
+
+    path: str = "/dsrs/import/stream/"
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] != self.path:
+            return await self.app(scope, receive, send)
+        if scope["method"] != "POST":
+            return await _send_json(
+                send, 405, {"detail": f'Method "{scope["method"]}" not allowed.'}
+            )
+        return await _import_dsr_stream(scope, receive, send)
+
+
+async def _import_dsr_stream(scope, receive, send) -> None:
+    upload = StreamingUpload(filename=_get_filename(scope["headers"]))
+    write = sync_to_async(upload.write, thread_sensitive=False)
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            await write(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        dsr_file = await sync_to_async(upload.finish, thread_sensitive=False)()
+        data = dsr_file and await sync_to_async(_queue_dsr)(dsr_file)
+    except UploadTooLarge as exc:
+        return await _send_json(send, exc.status_code, {"detail": exc.detail})
+    except (OSError, EOFError, zlib.error):
+        data = None
+    finally:
+        upload.close()
+
+    if not data:
+        return await _send_json(send, 400, {"detail": "Malformed request."})
+    headers = []
+    if settings.DATABASE_REPLICAS:
+        headers.append(
+            (b"set-cookie", get_replica_sticky_cookie().OutputString().encode())
+        )
+    return await _send_json(send, 202, data, headers=headers)
+
+
+def _queue_dsr(dsr_file) -> Optional[dict[str, Any]]:
+    close_old_connections()
+    try:
+        dsr = services.queue_dsr(dsr_file)
+        return dsr and serializers.DSRSerializer(dsr).data
+    finally:
+        close_old_connections()
+
+
+def _get_filename(headers: list[tuple[bytes, bytes]]) -> Optional[str]:
+    for name, value in headers:
+        if name.lower() == b"content-disposition":
+            _, params = parse_header(value)
+            if filename := params.get("filename"):
+                return filename.decode()
+    return None
+
+
+async def _send_json(
+    send, status: int, data: Any, headers: Sequence[tuple[bytes, bytes]] = ()
+) -> None:
+    body = JSONRenderer().render(data)
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *headers,
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
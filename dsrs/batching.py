@@ -0,0 +1,94 @@
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional, TypeVar
+
+from django.conf import settings
+
+from dsrs.models import Resource
+
+T = TypeVar("T", bound=Optional[Resource])
+
+# Rough per-row overhead of a resource, on top of its text fields.
+RESOURCE_ROW_OVERHEAD: int = 64
+
+
+def estimate_resource_size(resource: Optional[Resource]) -> int:
+    if resource is None:
+        return 0
+    return (
+        RESOURCE_ROW_OVERHEAD
+        + len(resource.dsp_id)
+        + len(resource.title)
+        + len(resource.artists)
+        + len(resource.isrc)
+    )
+
+
+class AdaptiveBatcher:
+    """
+    Split resources into batches bounded both by row count and by estimated
+    size in bytes. The row count adapts to how long batches take to commit,
+    growing or shrinking towards a target latency within the configured bounds.
+    """
+
+    # Limit how much the batch size can change after a single measurement.
+    MAX_GROWTH: float = 2.0
+    MAX_SHRINK: float = 0.5
+    # Weight of the latest measurement in the per-row latency average.
+    SMOOTHING: float = 0.5
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        target_latency: Optional[float] = None,
+    ) -> None:
+        self.min_size = min_size or settings.DSR_RESOURCE_IMPORT_MIN_BATCH_SIZE
+        self.max_size = max_size or settings.DSR_RESOURCE_IMPORT_MAX_BATCH_SIZE
+        self.max_bytes = max_bytes or settings.DSR_RESOURCE_IMPORT_MAX_BATCH_BYTES
+        self.target_latency = (
+            target_latency or settings.DSR_RESOURCE_IMPORT_TARGET_BATCH_LATENCY
+        )
+        self.size = self._clamp(size or settings.DSR_RESOURCE_IMPORT_BATCH_SIZE)
+        self.row_latency: Optional[float] = None
+
+    def _clamp(self, size: float) -> int:
+        return max(self.min_size, min(self.max_size, int(size)))
+
+    def batches(self, resources: Iterable[T]) -> Iterator[list[T]]:
+        batch: list[T] = []
+        batch_bytes = 0
+        for resource in resources:
+            batch.append(resource)
+            batch_bytes += estimate_resource_size(resource)
+            if len(batch) >= self.size or batch_bytes >= self.max_bytes:
+                yield batch
+                batch = []
+                batch_bytes = 0
+        if batch:
+            yield batch
+
+    def record(self, rows: int, latency: float) -> None:
+        """
+        Adjust the batch size given the time it took to commit a batch.
+        """
+        if not rows or latency <= 0:
+            return
+        row_latency = latency / rows
+        if self.row_latency is None:
+            self.row_latency = row_latency
+        else:
+            self.row_latency = (
+                self.SMOOTHING * row_latency + (1 - self.SMOOTHING) * self.row_latency
+            )
+        size = self.target_latency / self.row_latency
+        size = max(self.size * self.MAX_SHRINK, min(self.size * self.MAX_GROWTH, size))
+        self.size = self._clamp(size)
+
+    @contextmanager
+    def measure(self, rows: int) -> Iterator[None]:
+        start = time.monotonic()
+        yield
+        self.record(rows=rows, latency=time.monotonic() - start)
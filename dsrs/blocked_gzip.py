@@ -0,0 +1,192 @@
+"""
+Blocked gzip storage of DSR files, see `services.save_dsr_file`.
+
+Files are split into blocks of whole lines, each compressed as an independent
+gzip member. Concatenated, the blocks still make up a regular gzip file.
+A sidecar index of block offsets and line numbers allows decompressing
+blocks in parallel across processes, and reading any range of lines without
+decompressing the blocks before it.
+"""
+
+import gzip
+import io
+import json
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import IO, Iterator, NamedTuple, Optional
+
+from django.core.files.storage import Storage
+
+INDEX_SUFFIX: str = ".idx"
+
+
+class Block(NamedTuple):
+    # Position and size of the compressed block.
+    offset: int
+    size: int
+    # Number of the first line in the block, from 0, and its line count.
+    first_line: int
+    line_count: int
+
+
+def get_index_name(name: str) -> str:
+    return f"{name}{INDEX_SUFFIX}"
+
+
+def is_blocked(storage: Storage, name: str) -> bool:
+    return storage.exists(get_index_name(name))
+
+
+def write_blocks(
+    src: IO[bytes], dst: IO[bytes], block_size: int, compresslevel: int = 6
+) -> list[Block]:
+    """
+    Compress `src` into `dst` in blocks of about `block_size` decompressed
+    bytes, ending on a line feed. Return the blocks.
+    """
+    blocks = []
+    offset = first_line = 0
+    while data := src.read(block_size):
+        if not data.endswith(b"\n"):
+            data += src.readline()
+        compressed = gzip.compress(data, compresslevel=compresslevel, mtime=0)
+        dst.write(compressed)
+        # Counting an unterminated last line.
+        line_count = data.count(b"\n") + (not data.endswith(b"\n"))
+        blocks.append(Block(offset, len(compressed), first_line, line_count))
+        offset += len(compressed)
+        first_line += line_count
+    return blocks
+
+
+def dump_index(blocks: list[Block]) -> bytes:
+    return json.dumps([list(block) for block in blocks]).encode()
+
+
+def load_index(data: bytes) -> list[Block]:
+    return [Block(*block) for block in json.loads(data)]
+
+
+def _iter_compressed(fp: IO[bytes], blocks: list[Block]) -> Iterator[bytes]:
+    position = None
+    for block in blocks:
+        if position != block.offset:
+            fp.seek(block.offset)
+        yield fp.read(block.size)
+        position = block.offset + block.size
+
+
+def iter_decompressed(
+    fp: IO[bytes],
+    blocks: list[Block],
+    executor: Optional[Executor] = None,
+    prefetch: int = 1,
+) -> Iterator[bytes]:
+    """
+    Decompress blocks of `fp` in order, in parallel if an executor is given,
+    with up to `prefetch` blocks being decompressed ahead.
+    """
+    compressed = _iter_compressed(fp, blocks)
+    if executor is None:
+        yield from map(gzip.decompress, compressed)
+        return
+    futures: deque = deque()
+    for data in compressed:
+        futures.append(executor.submit(gzip.decompress, data))
+        if len(futures) >= prefetch:
+            yield futures.popleft().result()
+    while futures:
+        yield futures.popleft().result()
+
+
+def _get_line_range(
+    blocks: list[Block], start: int, stop: Optional[int]
+) -> list[Block]:
+    return [
+        block
+        for block in blocks
+        if block.first_line + block.line_count > start
+        and (stop is None or block.first_line < stop)
+    ]
+
+
+def read_lines(
+    fp: IO[bytes], blocks: list[Block], start: int = 0, stop: Optional[int] = None
+) -> bytes:
+    """
+    Read lines `start` to `stop` (excluded), counted from 0, decompressing
+    only the blocks holding them.
+    """
+    selected = _get_line_range(blocks, start, stop)
+    if not selected:
+        return b""
+    data = io.BytesIO(b"".join(iter_decompressed(fp, selected)))
+    first_line = selected[0].first_line
+    lines = data.readlines()
+    return b"".join(
+        lines[start - first_line : None if stop is None else stop - first_line]
+    )
+
+
+class BlockedGzipReader(io.RawIOBase):
+    """
+    Read-only stream of the decompressed content of a blocked gzip file,
+    decompressing blocks in parallel across `workers` processes, if any.
+    """
+
+    def __init__(self, fp: IO[bytes], blocks: list[Block], workers: int = 0) -> None:
+        super().__init__()
+        self._fp = fp
+        self._executor = ProcessPoolExecutor(workers) if workers else None
+        self._pieces = iter_decompressed(
+            fp, blocks, executor=self._executor, prefetch=2 * workers
+        )
+        self._piece = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._piece:
+            piece = next(self._pieces, None)
+            if piece is None:
+                return 0
+            self._piece = memoryview(piece)
+        size = min(len(buffer), len(self._piece))
+        buffer[:size] = self._piece[:size]
+        self._piece = self._piece[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self._pieces.close()
+            if self._executor:
+                self._executor.shutdown(cancel_futures=True)
+            self._fp.close()
+        super().close()
+
+
+def _load_stored_index(storage: Storage, name: str) -> list[Block]:
+    with storage.open(get_index_name(name)) as fp:
+        return load_index(fp.read())
+
+
+def open_blocked(storage: Storage, name: str, workers: int = 0) -> IO[bytes]:
+    """
+    Open a stored blocked gzip file for reading its decompressed content.
+    """
+    blocks = _load_stored_index(storage, name)
+    return io.BufferedReader(
+        BlockedGzipReader(storage.open(name), blocks, workers=workers)
+    )
+
+
+def read_stored_lines(
+    storage: Storage, name: str, start: int = 0, stop: Optional[int] = None
+) -> bytes:
+    """
+    Same as `read_lines`, for a stored blocked gzip file.
+    """
+    blocks = _load_stored_index(storage, name)
+    with storage.open(name) as fp:
+        return read_lines(fp, blocks, start=start, stop=stop)
@@ -0,0 +1,150 @@
+"""
+Ingest-time combining of duplicate recordings within a DSR,
+see `services.ingest_dsr`.
+
+Resources with the same dsp_id, title, artists and ISRC are merged into
+one with summed usages and revenue, in a bounded hash map. When the map
+is full it's spilled to the database, merging into rows spilled before.
+Sums which wouldn't fit their columns are kept as separate rows.
+"""
+
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.conf import settings
+
+from dsrs import sharding
+from dsrs.models import DSR, Resource
+from dsrs.readers import USAGES_MAX, USAGES_MIN
+from dsrs.stats import REVENUE_CONTEXT
+
+RecordingKey = tuple[str, str, str, str]
+
+_revenue_field = Resource._meta.get_field("revenue")
+
+# Revenue sums must stay below this, in absolute value.
+REVENUE_LIMIT: Decimal = Decimal(10) ** (
+    _revenue_field.max_digits - _revenue_field.decimal_places
+)
+
+# Spilled resources update the latest row of their recording if the sums
+# fit, and are inserted otherwise. The DSR lock makes it safe to read
+# then write without a unique constraint.
+SPILL_RESOURCES_SQL: str = """
+    WITH spilled AS (
+        SELECT *
+        FROM unnest(
+            %(dsp_ids)s::text[],
+            %(titles)s::text[],
+            %(artists)s::text[],
+            %(isrcs)s::text[],
+            %(usages)s::integer[],
+            %(revenues)s::numeric[]
+        ) WITH ORDINALITY AS spilled (
+            dsp_id, title, artists, isrc, usages, revenue, position
+        )
+    ),
+    targets AS (
+        SELECT DISTINCT ON (spilled.position)
+            spilled.position, dsrs_resource.id
+        FROM spilled
+        JOIN dsrs_resource USING (dsp_id, title, artists, isrc)
+        WHERE dsrs_resource.dsr_id = %(dsr_id)s
+            AND dsrs_resource.usages::bigint + spilled.usages
+                BETWEEN %(usages_min)s AND %(usages_max)s
+            AND abs(dsrs_resource.revenue + spilled.revenue) < %(revenue_limit)s
+        ORDER BY spilled.position, dsrs_resource.id DESC
+    ),
+    updated AS (
+        UPDATE dsrs_resource
+        SET
+            usages = dsrs_resource.usages + spilled.usages,
+            revenue = dsrs_resource.revenue + spilled.revenue
+        FROM targets
+        JOIN spilled USING (position)
+        WHERE dsrs_resource.id = targets.id
+        RETURNING targets.position
+    )
+    INSERT INTO dsrs_resource (dsr_id, dsp_id, title, artists, isrc, usages, revenue)
+    SELECT %(dsr_id)s, dsp_id, title, artists, isrc, usages, revenue
+    FROM spilled
+    WHERE position NOT IN (SELECT position FROM updated)
+"""
+
+
+def _get_key(resource: Resource) -> RecordingKey:
+    return resource.dsp_id, resource.title, resource.artists, resource.isrc
+
+
+def _can_combine(resource: Resource, other: Resource) -> bool:
+    return (
+        USAGES_MIN <= resource.usages + other.usages <= USAGES_MAX
+        and abs(REVENUE_CONTEXT.add(resource.revenue, other.revenue)) < REVENUE_LIMIT
+    )
+
+
+class ResourceCombiner:
+    """
+    Merge resources of a DSR by recording, holding at most `max_size`
+    of them before they have to be spilled.
+    """
+
+    def __init__(self, dsr: DSR, max_size: Optional[int] = None) -> None:
+        self.dsr = dsr
+        self.max_size = max_size or settings.DSR_RESOURCE_COMBINER_MAX_SIZE
+        self._resources: dict[RecordingKey, Resource] = {}
+        # Resources which couldn't be merged into the ones held.
+        self._overflow: list[Resource] = []
+
+    def __len__(self) -> int:
+        return len(self._resources) + len(self._overflow)
+
+    @property
+    def is_full(self) -> bool:
+        return len(self) >= self.max_size
+
+    def add(self, resource: Resource) -> None:
+        key = _get_key(resource)
+        combined = self._resources.get(key)
+        if combined is None:
+            self._resources[key] = resource
+        elif _can_combine(combined, resource):
+            combined.usages += resource.usages
+            combined.revenue = REVENUE_CONTEXT.add(combined.revenue, resource.revenue)
+        else:
+            self._overflow.append(combined)
+            self._resources[key] = resource
+
+    def add_all(self, resources: Iterable[Resource]) -> None:
+        for resource in resources:
+            self.add(resource)
+
+    def spill(self) -> int:
+        """
+        Merge held resources into the stored ones and forget them.
+        Return the number of spilled resources.
+        """
+        count = len(self)
+        if self._overflow:
+            Resource.objects.bulk_create(self._overflow)
+        if self._resources:
+            resources = self._resources.values()
+            with sharding.get_connection().cursor() as cursor:
+                cursor.execute(
+                    SPILL_RESOURCES_SQL,
+                    {
+                        "dsr_id": self.dsr.id,
+                        "dsp_ids": [resource.dsp_id for resource in resources],
+                        "titles": [resource.title for resource in resources],
+                        "artists": [resource.artists for resource in resources],
+                        "isrcs": [resource.isrc for resource in resources],
+                        "usages": [resource.usages for resource in resources],
+                        "revenues": [resource.revenue for resource in resources],
+                        "usages_min": USAGES_MIN,
+                        "usages_max": USAGES_MAX,
+                        "revenue_limit": REVENUE_LIMIT,
+                    },
+                )
+        self._resources = {}
+        self._overflow = []
+        return count
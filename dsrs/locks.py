@@ -0,0 +1,42 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+from dsrs import sharding
+from dsrs.models import DSR
+
+
+def try_lock_dsr(dsr: DSR) -> bool:
+    """
+    Try to take a session-level Postgres advisory lock keyed by the DSR id,
+    without waiting. Return whether the lock was acquired.
+
+    The lock is reentrant: a session holding it can take it again, and has
+    to release it as many times.
+    """
+    with sharding.get_connection().cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [dsr.id])
+        (acquired,) = cursor.fetchone()
+    return acquired
+
+
+def unlock_dsr(dsr: DSR) -> None:
+    with sharding.get_connection().cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", [dsr.id])
+
+
+@contextmanager
+def dsr_lock(dsr: DSR) -> Iterator[bool]:
+    """
+    Try to take the advisory lock of the DSR, see `try_lock_dsr`.
+    Yields whether the lock was acquired.
+
+    Unlike row locks, the advisory lock outlives transactions, so it can guard
+    a whole ingestion made of many short transactions; it is released
+    on exit, or by Postgres if the worker dies.
+    """
+    acquired = try_lock_dsr(dsr)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            unlock_dsr(dsr)
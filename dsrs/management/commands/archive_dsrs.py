@@ -0,0 +1,27 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from dsrs import services
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the resources of old DSRs to compressed archives. "
+        "Several workers can run concurrently."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.DSR_ARCHIVE_AFTER_DAYS,
+            help="Archive DSRs ending more than this many days ago.",
+        )
+
+    def handle(self, *args, days: int, **options):
+        count = services.archive_old_dsrs(
+            period_end=date.today() - timedelta(days=days)
+        )
+        self.stdout.write(f"Archived {count} DSR(s)")
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dsrs import services
+
+
+class Command(BaseCommand):
+    help = "Delete DSRs marked for deletion. Several workers can run concurrently."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once there are no DSRs marked for deletion left.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait before polling again for DSRs to delete.",
+        )
+
+    def handle(self, *args, once: bool, interval: float, **options):
+        while True:
+            count = services.delete_marked_dsrs()
+            if count:
+                self.stdout.write(f"Deleted {count} DSR(s)")
+            if once:
+                return
+            time.sleep(interval)
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dsrs import services
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete resumable uploads which haven't received a chunk for a while, "
+        "and whatever was received of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=settings.DSR_UPLOAD_EXPIRE_AFTER_HOURS,
+            help="Delete uploads which haven't received a chunk for this many hours.",
+        )
+
+    def handle(self, *args, hours: int, **options):
+        count = services.delete_stale_uploads(
+            updated_before=timezone.now() - timedelta(hours=hours)
+        )
+        self.stdout.write(f"Deleted {count} stale upload(s)")
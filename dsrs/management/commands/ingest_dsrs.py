@@ -0,0 +1,59 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from digital.backends.postgresql.pool import get_pools_stats
+from dsrs import services
+
+
+class Command(BaseCommand):
+    help = "Ingest DSRs pending ingestion. Several workers can run concurrently."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once there are no pending DSRs left.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait before polling again for pending DSRs.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of worker threads, sharing the connection pool if any.",
+        )
+
+    def handle(self, *args, once: bool, interval: float, workers: int, **options):
+        threads = [
+            threading.Thread(target=self.work, args=(once, interval, options))
+            for _ in range(workers - 1)
+        ]
+        for thread in threads:
+            thread.start()
+        self.work(once, interval, options)
+        for thread in threads:
+            thread.join()
+
+    def work(self, once: bool, interval: float, options: dict) -> None:
+        try:
+            while True:
+                count = services.ingest_pending_dsrs()
+                # Give the connection back while idle.
+                connection.close()
+                if count:
+                    self.stdout.write(f"Ingested {count} DSR(s)")
+                if options["verbosity"] > 1:
+                    for stats in get_pools_stats():
+                        self.stdout.write(f"Connection pool: {stats}")
+                if once:
+                    return
+                time.sleep(interval)
+        finally:
+            connection.close()
@@ -0,0 +1,56 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from digital.slowqueries import read_slow_queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarize recorded slow statements by SQL, "
+        "the ones taking the most time overall first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default=settings.SLOW_QUERY_LOG_PATH,
+            help="Slow query log to read.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=10,
+            help="Number of statements to report.",
+        )
+        parser.add_argument(
+            "--plans",
+            action="store_true",
+            help="Show parameters and plan of the slowest run of each statement.",
+        )
+
+    def handle(self, *args, path: str, limit: int, plans: bool, **options):
+        records_by_sql = defaultdict(list)
+        for record in read_slow_queries(path):
+            records_by_sql[record["sql"]].append(record)
+
+        summaries = sorted(
+            records_by_sql.values(),
+            key=lambda records: sum(record["duration"] for record in records),
+            reverse=True,
+        )
+        for records in summaries[:limit]:
+            slowest = max(records, key=lambda record: record["duration"])
+            total = sum(record["duration"] for record in records)
+            errors = sum(1 for record in records if record["error"])
+            self.stdout.write(
+                f"{len(records)} run(s), {errors} failed, total {total:.3f}s, "
+                f"mean {total / len(records):.3f}s, max {slowest['duration']:.3f}s, "
+                f"paths: {', '.join(sorted({record['path'] for record in records}))}"
+            )
+            self.stdout.write(f"    {' '.join(slowest['sql'].split())}")
+            if plans:
+                self.stdout.write(f"    params: {json.dumps(slowest['params'])}")
+                self.stdout.write(json.dumps(slowest["plan"], indent=2))
@@ -0,0 +1,37 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dsrs import services
+
+
+class Command(BaseCommand):
+    help = (
+        "Validate a DSR file the way it would be ingested, without writing "
+        "anything, and report invalid rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path of an uncompressed DSR file.")
+        parser.add_argument(
+            "--filename",
+            help="Filename to take DSR metadata from, the path's by default.",
+        )
+
+    def handle(self, *args, path: str, filename: str, **options):
+        filename = filename or os.path.basename(path)
+        try:
+            result = services.validate_dsr_file(path, filename)
+        except OSError as exc:
+            raise CommandError(f"Could not read {path}: {exc}")
+        if result is None:
+            raise CommandError(f"Invalid DSR filename: {filename}")
+        for error in result["errors"]:
+            self.stdout.write(
+                f"Line {error['line_number']}: {error['error']}\n  {error['line']}"
+            )
+        self.stdout.write(
+            f"{result['row_count']} row(s), {result['failed_row_count']} invalid, "
+            f"projected size {result['projected_size']} bytes, "
+            f"status {result['status']}"
+        )
@@ -21,6 +21,47 @@ def map_dsr_row_to_resource(
     return serializer.validated_data
 
 
+def map_dsr_row_to_resource_fields(dsr_row: dict[str, str]) -> types.ResourceKwargs:
+    """
+    Same as `map_dsr_row_to_resource`, without a DSR.
+    """
+    # Sensible defaults.
+    dsr_row["usages"] = dsr_row.get("usages") or 0
+    dsr_row["revenue"] = dsr_row.get("revenue") or Decimal("0.0")
+
+    serializer = serializers.ResourceRowSerializer(data=dsr_row)
+    serializer.is_valid(True)
+    return serializer.validated_data
+
+
+def map_view_data_to_import(query_params: dict[str, Any]) -> types.ImportDSRKwargs:
+    query_serializer = serializers.DSRImportQuerySerializer(data=query_params)
+    query_serializer.is_valid(True)
+    return query_serializer.data
+
+
+def map_view_data_to_upload(data: dict[str, Any]) -> types.CreateUploadKwargs:
+    serializer = serializers.DSRUploadCreateSerializer(data=data)
+    serializer.is_valid(True)
+    return serializer.data
+
+
+def map_view_data_to_upload_chunk(
+    query_params: dict[str, Any],
+) -> types.WriteUploadChunkKwargs:
+    query_serializer = serializers.DSRUploadChunkQuerySerializer(data=query_params)
+    query_serializer.is_valid(True)
+    return query_serializer.data
+
+
+def map_view_data_to_upload_completion(
+    data: dict[str, Any],
+) -> types.CompleteUploadKwargs:
+    serializer = serializers.DSRUploadCompleteSerializer(data=data)
+    serializer.is_valid(True)
+    return serializer.data
+
+
 def map_view_data_to_top_resources(
     query_params: dict[str, Any], kwargs: dict[str, str]
 ) -> types.GetTopResourcesByPercentileKwargs:
@@ -31,3 +72,51 @@ def map_view_data_to_top_resources(
     result["territory_code"] = result.pop("territory", None)
     result["percentile"] = int(kwargs["number"]) / 100
     return result
+
+
+def map_view_data_to_top_n_resources(
+    query_params: dict[str, Any], kwargs: dict[str, str]
+) -> types.GetTopResourcesKwargs:
+    query_serializer = serializers.ResourceTopQuerySerializer(data=query_params)
+    query_serializer.is_valid(True)
+    result = query_serializer.data
+
+    result["territory_code"] = result.pop("territory", None)
+    result["n"] = int(kwargs["n"])
+    return result
+
+
+def map_view_data_to_dsrs(query_params: dict[str, Any]) -> types.GetDSRsKwargs:
+    query_serializer = serializers.DSRQuerySerializer(data=query_params)
+    query_serializer.is_valid(True)
+    result = query_serializer.data
+
+    result["territory_code"] = result.pop("territory", None)
+    return result
+
+
+def map_view_data_to_dsr_stats_summary(
+    query_params: dict[str, Any],
+) -> types.GetDSRStatsSummaryKwargs:
+    query_serializer = serializers.ResourcePercentileQuerySerializer(data=query_params)
+    query_serializer.is_valid(True)
+    result = query_serializer.data
+
+    result["territory_code"] = result.pop("territory", None)
+    return result
+
+
+def map_view_data_to_recording_revenue(
+    query_params: dict[str, Any],
+) -> types.GetRecordingRevenueKwargs:
+    query_serializer = serializers.RecordingRevenueQuerySerializer(data=query_params)
+    query_serializer.is_valid(True)
+    return query_serializer.data
+
+
+def map_view_data_to_search_resources(
+    query_params: dict[str, Any],
+) -> types.SearchResourcesKwargs:
+    query_serializer = serializers.ResourceSearchQuerySerializer(data=query_params)
+    query_serializer.is_valid(True)
+    return query_serializer.data
@@ -0,0 +1,42 @@
+# Generated by Django 3.2.7 on 2026-10-18 22:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dsrs", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DSRStats",
+            fields=[
+                (
+                    "dsr",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="dsrs.dsr",
+                    ),
+                ),
+                ("row_count", models.BigIntegerField(default=0)),
+                ("failed_row_count", models.BigIntegerField(default=0)),
+                ("total_usages", models.BigIntegerField(default=0)),
+                (
+                    "total_revenue",
+                    models.DecimalField(decimal_places=20, default=0, max_digits=60),
+                ),
+                ("distinct_recordings", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "DSR stats",
+                "verbose_name_plural": "DSR stats",
+                "db_table": "dsr_stats",
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 3.2.7 on 2026-10-18 22:54
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dsrs", "0002_dsr_stats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlyResourceRevenue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField()),
+                ("dsp_id", models.CharField(max_length=30)),
+                ("title", models.CharField(max_length=255)),
+                ("artists", models.CharField(max_length=255)),
+                ("isrc", models.CharField(max_length=12)),
+                ("usages", models.BigIntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=20, default=0, max_digits=60),
+                ),
+                (
+                    "dsr_ids",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.BigIntegerField(), default=list, size=None
+                    ),
+                ),
+                (
+                    "territory",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_resources",
+                        to="dsrs.territory",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="monthlyresourcerevenue",
+            index=models.Index(fields=["month"], name="dsrs_monthl_month_60ec36_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="monthlyresourcerevenue",
+            constraint=models.UniqueConstraint(
+                fields=("territory", "month", "dsp_id", "title", "artists", "isrc"),
+                name="monthly_resource_revenue_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.7 on 2026-10-18 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dsrs", "0003_monthly_resource_revenue"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="dsr",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("failed", "FAILED"),
+                    ("ingested", "INGESTED"),
+                    ("ingesting", "INGESTING"),
+                ],
+                default="failed",
+                max_length=48,
+            ),
+        ),
+    ]
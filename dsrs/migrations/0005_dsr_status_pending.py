@@ -0,0 +1,27 @@
+# Generated by Django 3.2.7 on 2026-10-18 22:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dsrs", "0004_dsr_status_ingesting"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="dsr",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("failed", "FAILED"),
+                    ("ingested", "INGESTED"),
+                    ("ingesting", "INGESTING"),
+                    ("pending", "PENDING"),
+                ],
+                default="failed",
+                max_length=48,
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.7 on 2026-10-18 23:08
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The resource table is huge, don't lock it for writes while indexing.
+    atomic = False
+
+    dependencies = [
+        ("dsrs", "0005_dsr_status_pending"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="resource",
+            index=models.Index(
+                fields=["dsr", "id"], name="dsrs_resour_dsr_id_e6a3db_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.7 on 2026-10-18 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dsrs", "0006_resource_dsr_id_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dsr",
+            name="deleted_resource_count",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="dsr",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("failed", "FAILED"),
+                    ("ingested", "INGESTED"),
+                    ("ingesting", "INGESTING"),
+                    ("pending", "PENDING"),
+                    ("deleting", "DELETING"),
+                ],
+                default="failed",
+                max_length=48,
+            ),
+        ),
+    ]
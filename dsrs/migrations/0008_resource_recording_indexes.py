@@ -0,0 +1,32 @@
+# Generated by Django 3.2.7 on 2026-10-18 23:29
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build over the already loaded resources without blocking ingestion.
+    atomic = False
+
+    dependencies = [
+        ("dsrs", "0007_dsr_deletion"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="resource",
+            index=models.Index(
+                fields=["isrc"],
+                include=("dsr", "usages", "revenue"),
+                name="resource_isrc_covering_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="resource",
+            index=models.Index(
+                fields=["dsp_id"],
+                include=("dsr", "usages", "revenue"),
+                name="resource_dsp_id_covering_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+# Expression indexes rather than generated columns: adding a stored column
+# would rewrite the whole resource table under an exclusive lock. Queries
+# must use the same expressions, see `services.search_resources`.
+CREATE_SEARCH_VECTOR_INDEX_SQL = """
+    CREATE INDEX CONCURRENTLY resource_search_vector_idx
+    ON dsrs_resource USING GIN ((
+        to_tsvector('simple'::regconfig, title || ' ' || replace(artists, '|', ' '))
+    ));
+"""
+
+CREATE_ARTIST_NAMES_INDEX_SQL = """
+    CREATE INDEX CONCURRENTLY resource_artist_names_idx
+    ON dsrs_resource USING GIN ((string_to_array(lower(artists), '|')));
+"""
+
+
+class Migration(migrations.Migration):
+    # Indexes are created concurrently on the large resource table,
+    # which can't be done inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("dsrs", "0008_resource_recording_indexes"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            CREATE_SEARCH_VECTOR_INDEX_SQL,
+            "DROP INDEX CONCURRENTLY resource_search_vector_idx;",
+        ),
+        migrations.RunSQL(
+            CREATE_ARTIST_NAMES_INDEX_SQL,
+            "DROP INDEX CONCURRENTLY resource_artist_names_idx;",
+        ),
+    ]
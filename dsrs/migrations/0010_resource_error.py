@@ -0,0 +1,42 @@
+# Generated by Django 3.2.7 on 2026-10-18 23:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dsrs", "0009_resource_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResourceError",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("line_number", models.BigIntegerField()),
+                ("line", models.TextField()),
+                ("error", models.CharField(max_length=255)),
+                (
+                    "dsr",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="resource_errors",
+                        to="dsrs.dsr",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("dsr", "line_number"),
+            },
+        ),
+    ]
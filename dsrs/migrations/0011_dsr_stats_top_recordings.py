@@ -0,0 +1,41 @@
+# Generated by Django 3.2.7 on 2026-10-19 00:16
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dsrs", "0010_resource_error"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dsrstats",
+            name="top_recordings_by_revenue",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=django.contrib.postgres.fields.ArrayField(
+                    base_field=models.TextField(), size=6
+                ),
+                default=list,
+                size=None,
+            ),
+        ),
+        migrations.AddField(
+            model_name="dsrstats",
+            name="top_recordings_by_usages",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=django.contrib.postgres.fields.ArrayField(
+                    base_field=models.TextField(), size=6
+                ),
+                default=list,
+                size=None,
+            ),
+        ),
+        migrations.AddField(
+            model_name="dsrstats",
+            name="top_recordings_limit",
+            field=models.IntegerField(default=0),
+        ),
+    ]
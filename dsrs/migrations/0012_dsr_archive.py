@@ -0,0 +1,34 @@
+# Generated by Django 3.2.7 on 2026-10-19 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dsrs", "0011_dsr_stats_top_recordings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dsr",
+            name="archive_path",
+            field=models.CharField(blank=True, default="", max_length=256),
+        ),
+        migrations.AlterField(
+            model_name="dsr",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("failed", "FAILED"),
+                    ("ingested", "INGESTED"),
+                    ("ingesting", "INGESTING"),
+                    ("pending", "PENDING"),
+                    ("deleting", "DELETING"),
+                    ("archived", "ARCHIVED"),
+                ],
+                default="failed",
+                max_length=48,
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.7 on 2026-10-19 00:34
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dsrs", "0012_dsr_archive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DSRUpload",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("filename", models.CharField(max_length=256)),
+                ("size", models.BigIntegerField()),
+                ("received_size", models.BigIntegerField(default=0)),
+                (
+                    "sha256",
+                    models.CharField(
+                        default="e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855",
+                        max_length=64,
+                    ),
+                ),
+                ("decompressed_size", models.BigIntegerField(default=0)),
+                ("compressed", models.BooleanField(null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "db_table": "dsr_upload",
+            },
+        ),
+    ]
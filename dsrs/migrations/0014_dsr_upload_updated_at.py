@@ -0,0 +1,22 @@
+# Generated by Django 3.2.7 on 2026-10-19 12:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dsrs", "0013_dsr_upload"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dsrupload",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.7 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dsrs", "0014_dsr_upload_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dsr",
+            name="ingestion_attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
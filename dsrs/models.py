@@ -1,9 +1,14 @@
+import hashlib
+import uuid
 from typing import get_args
 
+from django.contrib.postgres.fields import ArrayField
 from django.db import models
 
 from dsrs.types import DSRStatus
 
+EMPTY_SHA256: str = hashlib.sha256().hexdigest()
+
 
 class Territory(models.Model):
     name = models.CharField(max_length=48)
@@ -54,10 +59,44 @@ class DSR(models.Model):
         Currency, related_name="dsrs", on_delete=models.CASCADE
     )
 
+    # Claims by ingestion workers, see `services.claim_pending_dsr`.
+    ingestion_attempts = models.PositiveSmallIntegerField(default=0)
+    # Progress of a background deletion, see `services.delete_dsr`.
+    deleted_resource_count = models.BigIntegerField(default=0)
+    # Archive of the resources of an archived DSR, see `services.archive_dsr`.
+    archive_path = models.CharField(max_length=256, blank=True, default="")
+
     def __str__(self):
         return self.path
 
 
+class DSRUpload(models.Model):
+    """
+    A resumable upload of a DSR file, received in chunks, see `dsrs.uploads`.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=256)
+    # Size of the uploaded file, compressed if gzipped.
+    size = models.BigIntegerField()
+    # Bytes received so far from the start of the file, their SHA-256 digest,
+    # and the size they decompress to.
+    received_size = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, default=EMPTY_SHA256)
+    decompressed_size = models.BigIntegerField(default=0)
+    # None until the first bytes tell whether the file is gzipped.
+    compressed = models.BooleanField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last time a chunk was received, for stale uploads to be deleted.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "dsr_upload"
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_size}/{self.size})"
+
+
 class Resource(models.Model):
     dsr = models.ForeignKey(DSR, related_name="resources", on_delete=models.CASCADE)
     dsp_id = models.CharField(max_length=30)
@@ -67,5 +106,107 @@ class Resource(models.Model):
     usages = models.IntegerField()
     revenue = models.DecimalField(decimal_places=20, max_digits=40)
 
+    # The table also has GIN expression indexes over titles and artist
+    # names, for `services.search_resources`.
+
+    class Meta:
+        indexes = (
+            # Serves keyset pagination over the resources of a single DSR.
+            models.Index(fields=["dsr", "id"]),
+            # Serve per-DSR breakdowns of a recording with index-only scans.
+            models.Index(
+                fields=["isrc"],
+                include=["dsr", "usages", "revenue"],
+                name="resource_isrc_covering_idx",
+            ),
+            models.Index(
+                fields=["dsp_id"],
+                include=["dsr", "usages", "revenue"],
+                name="resource_dsp_id_covering_idx",
+            ),
+        )
+
     def __str__(self):
         return f"[{self.isrc}] {self.artists} — {self.title}"
+
+
+class ResourceError(models.Model):
+    """
+    A DSR row rejected during ingestion with the "sql" engine,
+    see `dsrs.staging`.
+    """
+
+    dsr = models.ForeignKey(
+        DSR, related_name="resource_errors", on_delete=models.CASCADE
+    )
+    # Counting the header row as line 1.
+    line_number = models.BigIntegerField()
+    line = models.TextField()
+    error = models.CharField(max_length=255)
+
+    class Meta:
+        ordering = ("dsr", "line_number")
+
+    def __str__(self):
+        return f"{self.dsr}:{self.line_number}: {self.error}"
+
+
+class DSRStats(models.Model):
+    """
+    Summary statistics for a DSR, computed during ingestion.
+    """
+
+    dsr = models.OneToOneField(
+        DSR, related_name="stats", on_delete=models.CASCADE, primary_key=True
+    )
+    row_count = models.BigIntegerField(default=0)
+    failed_row_count = models.BigIntegerField(default=0)
+    total_usages = models.BigIntegerField(default=0)
+    total_revenue = models.DecimalField(decimal_places=20, max_digits=60, default=0)
+    distinct_recordings = models.BigIntegerField(default=0)
+    # Up to `top_recordings_limit` recordings with the highest revenue and
+    # usages, as [dsp_id, title, artists, isrc, usages, revenue] arrays,
+    # see `services.get_top_resources`. Shorter lists hold all recordings.
+    top_recordings_limit = models.IntegerField(default=0)
+    top_recordings_by_revenue = ArrayField(
+        ArrayField(models.TextField(), size=6), default=list
+    )
+    top_recordings_by_usages = ArrayField(
+        ArrayField(models.TextField(), size=6), default=list
+    )
+
+    class Meta:
+        db_table = "dsr_stats"
+        verbose_name = "DSR stats"
+        verbose_name_plural = "DSR stats"
+
+
+class MonthlyResourceRevenue(models.Model):
+    """
+    Usages and revenue of a recording in a territory during a calendar month.
+    DSRs spanning several months are spread over them proportionally to days.
+    """
+
+    territory = models.ForeignKey(
+        Territory, related_name="monthly_resources", on_delete=models.CASCADE
+    )
+    month = models.DateField()
+    dsp_id = models.CharField(max_length=30)
+    title = models.CharField(max_length=255)
+    artists = models.CharField(max_length=255)
+    isrc = models.CharField(max_length=12)
+    usages = models.BigIntegerField(default=0)
+    revenue = models.DecimalField(decimal_places=20, max_digits=60, default=0)
+    dsr_ids = ArrayField(models.BigIntegerField(), default=list)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=("territory", "month", "dsp_id", "title", "artists", "isrc"),
+                name="monthly_resource_revenue_uniq",
+            ),
+        )
+        indexes = (models.Index(fields=["month"]),)
+
+    def __str__(self):
+        return f"[{self.month:%Y-%m}] [{self.isrc}] {self.artists} — {self.title}"
@@ -0,0 +1,13 @@
+from django.conf import settings
+from rest_framework.pagination import LimitOffsetPagination
+
+
+class DSRPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination that is always applied, so that listing DSRs
+    never returns an unbounded response.
+    """
+
+    def __init__(self) -> None:
+        self.default_limit = settings.DSR_LIST_DEFAULT_LIMIT
+        self.max_limit = settings.DSR_LIST_MAX_LIMIT
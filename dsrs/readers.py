@@ -0,0 +1,214 @@
+"""
+Fast reader for stored, uncompressed DSR files on a local filesystem.
+
+The file is memory-mapped and split into lines and fields on bytes. Only text
+columns are decoded, and numbers are parsed straight from byte slices.
+Rows which don't pass the checks of `serializers.ResourceSerializer`
+are handed over to `mappers.map_dsr_row_to_resource` in the same shape
+`csv.DictReader` would produce, so that they fail the same way.
+
+Files containing quotes are left to the `csv` module.
+"""
+
+import logging
+import mmap
+import os
+from decimal import Decimal
+from typing import BinaryIO, Generator, Optional
+
+from django.db import connection
+from rest_framework import fields
+from rest_framework.exceptions import ValidationError
+
+from dsrs.mappers import map_dsr_row_to_resource, map_dsr_row_to_resource_fields
+from dsrs.models import DSR, Resource
+
+logger = logging.getLogger(__name__)
+
+FIELDNAMES: tuple[str, ...] = (
+    "dsp_id",
+    "title",
+    "artists",
+    "isrc",
+    "usages",
+    "revenue",
+)
+
+# Maximum lengths of text columns, in the order of `FIELDNAMES`.
+TEXT_FIELD_MAX_LENGTHS: tuple[tuple[int, int], ...] = tuple(
+    (index, Resource._meta.get_field(name).max_length)
+    for index, name in enumerate(FIELDNAMES[:4])
+)
+
+USAGES_MIN, USAGES_MAX = connection.ops.integer_field_range("IntegerField")
+
+_revenue_field = fields.DecimalField(
+    max_digits=Resource._meta.get_field("revenue").max_digits,
+    decimal_places=Resource._meta.get_field("revenue").decimal_places,
+)
+
+ZERO_REVENUE: Decimal = _revenue_field.to_internal_value(Decimal("0.0"))
+
+INVALID_UTF8_MESSAGE: str = "Not valid UTF-8."
+
+
+def open_dsr_file_mmap(path: str) -> Optional[mmap.mmap]:
+    """
+    Memory-map a stored DSR file if the fast reader can handle it.
+    """
+    if not os.path.getsize(path):
+        return None
+    with open(path, mode="rb") as fp:
+        mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm.find(b'"') != -1:
+        mm.close()
+        return None
+    return mm
+
+
+def iter_lines(fp: BinaryIO) -> Generator[bytes, None, None]:
+    # Newlines are translated the way `TextIOWrapper` does,
+    # and empty lines are skipped the way `csv.DictReader` does.
+    while line := fp.readline():
+        line = line.rstrip(b"\n")
+        if line.endswith(b"\r"):
+            line = line[:-1]
+        if b"\r" in line:
+            yield from filter(None, line.split(b"\r"))
+        elif line:
+            yield line
+
+
+def _parse_row(values: list[bytes], dsr: Optional[DSR]) -> Optional[Resource]:
+    """
+    Build a resource from a row, or return None if the row needs
+    the full validation.
+    """
+    if len(values) < len(FIELDNAMES):
+        return None
+
+    texts = []
+    for index, max_length in TEXT_FIELD_MAX_LENGTHS:
+        try:
+            text = values[index].decode().strip()
+        except UnicodeDecodeError:
+            return None
+        if not text or len(text) > max_length or "\x00" in text:
+            return None
+        texts.append(text)
+
+    raw_usages, raw_revenue = values[4], values[5]
+    if not raw_usages:
+        usages = 0
+    elif b"." in raw_usages:
+        return None
+    else:
+        try:
+            usages = int(raw_usages)
+        except ValueError:
+            return None
+        if not USAGES_MIN <= usages <= USAGES_MAX:
+            return None
+
+    if not raw_revenue:
+        revenue = ZERO_REVENUE
+    else:
+        try:
+            revenue = _revenue_field.to_internal_value(raw_revenue.decode())
+        except ValidationError:
+            return None
+
+    dsp_id, title, artists, isrc = texts
+    return Resource(
+        dsr=dsr,
+        dsp_id=dsp_id,
+        title=title,
+        artists=artists,
+        isrc=isrc,
+        usages=usages,
+        revenue=revenue,
+    )
+
+
+def _get_dict_row(values: list[bytes]) -> dict:
+    """
+    Decode a row the way `csv.DictReader` would read it. Raise
+    `ValidationError` if fields aren't valid UTF-8, as the serializer
+    would for invalid ones.
+    """
+    row = {}
+    errors = {}
+    for name, value in zip(FIELDNAMES, values):
+        try:
+            row[name] = value.decode()
+        except UnicodeDecodeError:
+            errors[name] = [INVALID_UTF8_MESSAGE]
+    if errors:
+        raise ValidationError(errors)
+    for name in FIELDNAMES[len(values) :]:
+        row[name] = None
+    if len(values) > len(FIELDNAMES):
+        # Ignored, as they are by the serializer.
+        row[None] = [
+            value.decode(errors="replace") for value in values[len(FIELDNAMES) :]
+        ]
+    return row
+
+
+def check_row_encoding(row: dict) -> None:
+    """
+    Raise `ValidationError` if fields of a row read with the
+    "surrogateescape" error handler weren't valid UTF-8.
+    """
+    errors = {}
+    for name in FIELDNAMES:
+        try:
+            (row[name] or "").encode()
+        except UnicodeEncodeError:
+            errors[name] = [INVALID_UTF8_MESSAGE]
+    if errors:
+        raise ValidationError(errors)
+
+
+def read_line(line: bytes, dsr: DSR) -> Optional[Resource]:
+    """
+    Build a resource from a line without its line terminator.
+    Return None if the line is invalid.
+    """
+    values = line.split(b"\t")
+    if resource := _parse_row(values, dsr):
+        return resource
+    try:
+        row = _get_dict_row(values)
+        kwargs = map_dsr_row_to_resource(dsr_row=row, dsr=dsr)
+    except ValidationError as exc:
+        logger.error("Could not map row %s for DSR %s: %s", line, dsr, exc)
+        return None
+    return Resource(**kwargs)
+
+
+def validate_line(line: bytes) -> Resource:
+    """
+    Same as `read_line`, without a DSR nor database access.
+    Raise `ValidationError` if the line is invalid.
+    """
+    values = line.split(b"\t")
+    if resource := _parse_row(values, dsr=None):
+        return resource
+    return Resource(**map_dsr_row_to_resource_fields(dsr_row=_get_dict_row(values)))
+
+
+def iter_resources_mmap(
+    mm: mmap.mmap, dsr: DSR
+) -> Generator[Optional[Resource], None, None]:
+    """
+    Same as `services.iter_resources`, for a memory-mapped DSR file.
+    """
+    try:
+        lines = iter_lines(mm)
+        # Skip header row
+        next(lines, None)
+        for line in lines:
+            yield read_line(line, dsr=dsr)
+    finally:
+        mm.close()
@@ -0,0 +1,299 @@
+"""
+Sums of usages and revenue by recording over the DSRs of one or several
+shards, see `services.get_top_resources_by_percentile` and
+`services.get_top_resources`.
+
+Each shard sums up its live DSRs in SQL and its archived ones with NumPy,
+see `dsrs.archives`. Shards are queried from worker threads when several
+are, under the statement budget of the request, and their sums are merged
+and ranked in Python.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from decimal import Decimal
+from functools import partial
+from typing import Any, Iterable, Optional
+
+from django.db import connections
+
+from digital import middleware
+from dsrs import archives, sharding, types
+from dsrs.models import DSR, Resource
+from dsrs.stats import REVENUE_CONTEXT
+
+# Sums up usages and revenue of each recording over live DSRs.
+RECORDING_REVENUES_SQL: str = """
+        SELECT
+            dsp_id,
+            title,
+            artists,
+            isrc,
+            ARRAY_AGG(dsr_id ORDER BY dsr_id) AS dsr_ids,
+            SUM(usages) AS usages,
+            SUM(revenue) AS revenue
+        FROM dsrs_resource
+        WHERE dsr_id = ANY(%(dsr_ids)s)
+        GROUP BY dsp_id, title, artists, isrc
+"""
+
+# Sums up usages and revenue of each recording over monthly aggregates,
+# optionally of a territory and/or months.
+MONTHLY_RECORDING_REVENUES_SQL: str = """
+        WITH monthly_resources AS (
+            SELECT aggregate.*
+            FROM dsrs_monthlyresourcerevenue AS aggregate
+            JOIN territory ON territory.id = aggregate.territory_id
+            WHERE (%(territory_code)s IS NULL OR territory.code_2 = %(territory_code)s)
+                AND (
+                    %(period_start)s IS NULL
+                    OR aggregate.month >= DATE_TRUNC('month', %(period_start)s::date)
+                )
+                AND (%(period_end)s IS NULL OR aggregate.month <= %(period_end)s::date)
+        ),
+        aggregated_resources AS (
+            SELECT
+                dsp_id,
+                title,
+                artists,
+                isrc,
+                SUM(usages) AS usages,
+                SUM(revenue) AS revenue
+            FROM monthly_resources
+            GROUP BY dsp_id, title, artists, isrc
+        ),
+        resource_dsr_ids AS (
+            SELECT
+                dsp_id,
+                title,
+                artists,
+                isrc,
+                ARRAY_AGG(DISTINCT dsr_id ORDER BY dsr_id) AS dsr_ids
+            FROM monthly_resources, UNNEST(monthly_resources.dsr_ids) AS dsr_id
+            GROUP BY dsp_id, title, artists, isrc
+        )
+        SELECT dsp_id, title, artists, isrc, dsr_ids, usages, revenue
+        FROM aggregated_resources
+        JOIN resource_dsr_ids USING (dsp_id, title, artists, isrc)
+"""
+
+
+def get_dsrs_by_storage(
+    dsr_filter: dict[str, Any],
+) -> tuple[list[int], list[tuple[int, str]]]:
+    """
+    Get ids of DSRs matching the filter whose resources are stored in
+    `dsrs_resource`, and ids and archive names of archived ones.
+    """
+    dsr_ids, archived = [], []
+    for dsr_id, archive_path in (
+        DSR.objects.filter(**dsr_filter)
+        .exclude(status="deleting")
+        .values_list("id", "archive_path")
+    ):
+        if archive_path:
+            archived.append((dsr_id, archive_path))
+        else:
+            dsr_ids.append(dsr_id)
+    return dsr_ids, archived
+
+
+def get_recording_revenues(
+    dsr_ids: list[int], archived: list[tuple[int, str]]
+) -> list[tuple]:
+    """
+    Sum up usages and revenue of each recording over DSRs of the current
+    shard, in SQL for live DSRs and with NumPy for archived ones, given
+    as ids and archive names. A recording comes up once for live DSRs
+    and once per archive row group holding it, see
+    `merge_recording_revenues`.
+    """
+    rows = []
+    if dsr_ids:
+        with sharding.get_connection().cursor() as cursor:
+            cursor.execute(RECORDING_REVENUES_SQL, {"dsr_ids": dsr_ids})
+            rows = cursor.fetchall()
+    for dsr_id, archive_path in archived:
+        rows.extend(
+            (dsp_id, title, artists, isrc, [dsr_id] * count, usages, revenue)
+            for dsp_id, title, artists, isrc, usages, revenue, count in (
+                archives.iter_stored_recordings(archive_path)
+            )
+        )
+    return rows
+
+
+def get_shard_recording_revenues(
+    alias: str,
+    dsr_filter: dict[str, Any],
+    budget: Optional[tuple[int, str]] = None,
+) -> list:
+    """
+    Run `get_recording_revenues` over the DSRs of a shard matching
+    the filter, from a worker thread, under the statement budget of
+    the request, if any, see `digital.middleware.get_request_budget`.
+    """
+    try:
+        with (
+            middleware.statement_budget(alias, *budget) if budget else nullcontext()
+        ), sharding.use_shard(alias):
+            return get_recording_revenues(*get_dsrs_by_storage(dsr_filter))
+    finally:
+        connections[alias].close()
+
+
+def get_recording_revenues_by_shard(
+    aliases: list[str], dsr_filter: dict[str, Any]
+) -> list[list]:
+    """
+    Run `get_shard_recording_revenues` over several shards in parallel.
+    """
+    with ThreadPoolExecutor(max_workers=len(aliases)) as executor:
+        return list(
+            executor.map(
+                partial(
+                    get_shard_recording_revenues,
+                    dsr_filter=dsr_filter,
+                    budget=middleware.get_request_budget(),
+                ),
+                aliases,
+            )
+        )
+
+
+def _get_recording_resource(
+    key: tuple[str, str, str, str], dsr_ids: list[int], usages: int, revenue: Decimal
+) -> Resource:
+    dsp_id, title, artists, isrc = key
+    resource = Resource(
+        id=dsp_id,
+        dsp_id=dsp_id,
+        title=title,
+        artists=artists,
+        isrc=isrc,
+        usages=usages,
+        revenue=revenue,
+    )
+    resource.dsr_ids = dsr_ids
+    return resource
+
+
+def merge_recording_revenues(
+    shard_recordings: Iterable[list], percentile: float
+) -> list[Resource]:
+    """
+    Sum up usages and revenue of recordings found on several shards, or in
+    live and archived DSRs, and keep the top percentile by revenue, ranked
+    the way `PERCENT_RANK` ranks them.
+    """
+    recordings: dict[tuple[str, str, str, str], list] = {}
+    for rows in shard_recordings:
+        for dsp_id, title, artists, isrc, dsr_ids, usages, revenue in rows:
+            key = (dsp_id, title, artists, isrc)
+            if recording := recordings.get(key):
+                recording[0].extend(dsr_ids)
+                recording[1] += usages
+                recording[2] = REVENUE_CONTEXT.add(recording[2], revenue)
+            else:
+                recordings[key] = [list(dsr_ids), usages, revenue]
+
+    ordered = sorted(recordings.items(), key=lambda item: item[1][2], reverse=True)
+    top_resources = []
+    rank = 0
+    for index, (key, (dsr_ids, usages, revenue)) in enumerate(ordered):
+        if index and revenue != ordered[index - 1][1][2]:
+            rank = index
+        if index and rank / (len(ordered) - 1) > percentile:
+            break
+        top_resources.append(
+            _get_recording_resource(key, sorted(dsr_ids), usages, revenue)
+        )
+    return top_resources
+
+
+def get_top_resources(
+    shard_dsrs: dict[str, tuple[list[int], list[tuple[int, str]]]],
+    n: int,
+    by: types.TopResourcesOrder,
+    candidates: Optional[set[tuple[str, str, str, str]]] = None,
+) -> list[Resource]:
+    """
+    Group resources of DSRs by recording, only the `candidates` if given,
+    and get the top `n`. DSRs are given by shard, as ids of live DSRs and
+    ids and archive names of archived ones. Sums over several shards, or
+    over archived DSRs, are merged in Python before ranking.
+    """
+    params: dict[str, Any] = {}
+    join = ""
+    if candidates is not None:
+        join = """
+    JOIN UNNEST(
+        %(dsp_ids)s::text[], %(titles)s::text[], %(artists)s::text[], %(isrcs)s::text[]
+    ) AS candidate (dsp_id, title, artists, isrc)
+        USING (dsp_id, title, artists, isrc)"""
+        for name, values in zip(
+            ("dsp_ids", "titles", "artists", "isrcs"), zip(*candidates)
+        ):
+            params[name] = list(values)
+    # Ties are broken by code point, as Python sorts the merged sums.
+    sql = f"""
+    SELECT
+        dsp_id AS id,
+        dsp_id,
+        title,
+        artists,
+        isrc,
+        ARRAY_AGG(DISTINCT dsr_id ORDER BY dsr_id) AS dsr_ids,
+        SUM(usages) AS usages,
+        SUM(revenue) AS revenue
+    FROM dsrs_resource{join}
+    WHERE dsr_id = ANY(%(dsr_ids)s)
+    GROUP BY dsp_id, title, artists, isrc
+    ORDER BY
+        {by} DESC,
+        dsp_id COLLATE "C",
+        title COLLATE "C",
+        artists COLLATE "C",
+        isrc COLLATE "C"
+    LIMIT %(limit)s;
+    """
+    if len(shard_dsrs) == 1:
+        ((alias, (dsr_ids, archived)),) = shard_dsrs.items()
+        if not archived:
+            return list(
+                Resource.objects.using(alias).raw(
+                    sql, {**params, "dsr_ids": dsr_ids, "limit": n}
+                )
+            )
+
+    # All sums are needed to merge them.
+    dsp_ids = None if candidates is None else {dsp_id for dsp_id, *_ in candidates}
+    recordings: dict[tuple[str, str, str, str], list] = {}
+    for alias, (dsr_ids, archived) in shard_dsrs.items():
+        rows = []
+        if dsr_ids:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(sql, {**params, "dsr_ids": dsr_ids, "limit": None})
+                for _, *key, resource_dsr_ids, usages, revenue in cursor.fetchall():
+                    rows.append((tuple(key), resource_dsr_ids, usages, revenue))
+        for dsr_id, archive_path in archived:
+            rows.extend(
+                ((dsp_id, title, artists, isrc), [dsr_id], usages, revenue)
+                for dsp_id, title, artists, isrc, usages, revenue, _ in (
+                    archives.iter_stored_recordings(archive_path, dsp_ids=dsp_ids)
+                )
+            )
+        for key, resource_dsr_ids, usages, revenue in rows:
+            if candidates is not None and key not in candidates:
+                continue
+            recording = recordings.setdefault(key, [set(), 0, Decimal(0)])
+            recording[0].update(resource_dsr_ids)
+            recording[1] += usages
+            recording[2] = REVENUE_CONTEXT.add(recording[2], revenue)
+
+    position = 1 if by == "usages" else 2
+    ordered = sorted(recordings.items(), key=lambda item: (-item[1][position], item[0]))
+    return [
+        _get_recording_resource(key, sorted(resource_dsr_ids), usages, revenue)
+        for key, (resource_dsr_ids, usages, revenue) in ordered[:n]
+    ]
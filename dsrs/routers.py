@@ -0,0 +1,46 @@
+from typing import Optional
+
+from django.db import DEFAULT_DB_ALIAS, models
+
+from digital import replicas
+from dsrs import sharding
+from dsrs.models import DSR, DSRStats, MonthlyResourceRevenue, Resource, ResourceError
+
+SHARDED_MODELS: frozenset[type[models.Model]] = frozenset(
+    (DSR, DSRStats, MonthlyResourceRevenue, Resource, ResourceError)
+)
+
+
+class TerritoryShardRouter:
+    """
+    Route DSR data to the shard of its territory, see `dsrs.sharding`,
+    and the other models of the app to the default database. Reads may go
+    to replicas of those, see `digital.replicas`.
+    """
+
+    def _get_alias(self, model: type[models.Model], **hints) -> Optional[str]:
+        if model._meta.app_label != "dsrs":
+            return None
+        if model not in SHARDED_MODELS:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get("instance")
+        if isinstance(instance, DSR):
+            return sharding.get_dsr_alias(instance)
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return sharding.get_current_alias()
+
+    def db_for_read(self, model: type[models.Model], **hints) -> Optional[str]:
+        alias = self._get_alias(model, **hints)
+        return alias and replicas.get_read_alias(alias)
+
+    def db_for_write(self, model: type[models.Model], **hints) -> Optional[str]:
+        return self._get_alias(model, **hints)
+
+    def allow_relation(
+        self, obj1: models.Model, obj2: models.Model, **hints
+    ) -> Optional[bool]:
+        # DSR data refers to territories and currencies across databases.
+        if obj1._meta.app_label == obj2._meta.app_label == "dsrs":
+            return True
+        return None
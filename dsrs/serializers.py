@@ -1,3 +1,6 @@
+import re
+
+from django.conf import settings
 from rest_framework import fields, serializers
 
 from dsrs import models
@@ -21,9 +24,30 @@ class CurrencySerializer(serializers.ModelSerializer):
         )
 
 
+class DSRStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.DSRStats
+        fields = (
+            "row_count",
+            "failed_row_count",
+            "total_usages",
+            "total_revenue",
+            "distinct_recordings",
+        )
+
+
+class DSRStatsSummarySerializer(serializers.Serializer):
+    dsr_count = fields.IntegerField()
+    row_count = fields.IntegerField()
+    failed_row_count = fields.IntegerField()
+    total_usages = fields.IntegerField()
+    total_revenue = fields.DecimalField(decimal_places=20, max_digits=60)
+
+
 class DSRSerializer(serializers.ModelSerializer):
     territory = TerritorySerializer()
     currency = CurrencySerializer()
+    stats = DSRStatsSerializer(read_only=True, allow_null=True)
 
     class Meta:
         model = models.DSR
@@ -35,6 +59,31 @@ class DSRSerializer(serializers.ModelSerializer):
             "status",
             "territory",
             "currency",
+            "stats",
+        )
+
+
+class DSRAmendmentSerializer(serializers.Serializer):
+    dsr = DSRSerializer()
+    inserted = fields.IntegerField()
+    updated = fields.IntegerField()
+    deleted = fields.IntegerField()
+
+
+class ResourceRowSerializer(serializers.ModelSerializer):
+    """
+    Validate a DSR row on its own, without a DSR.
+    """
+
+    class Meta:
+        model = models.Resource
+        fields = (
+            "dsp_id",
+            "title",
+            "artists",
+            "isrc",
+            "usages",
+            "revenue",
         )
 
 
@@ -72,3 +121,110 @@ class ResourcePercentileQuerySerializer(serializers.Serializer):
     territory = fields.CharField(min_length=2, max_length=2, required=False)
     period_start = fields.DateField(required=False)
     period_end = fields.DateField(required=False)
+
+
+class ResourceTopQuerySerializer(ResourcePercentileQuerySerializer):
+    by = fields.ChoiceField(choices=("revenue", "usages"), default="revenue")
+
+
+class RecordingRevenueQuerySerializer(serializers.Serializer):
+    isrc = fields.CharField(max_length=12)
+
+
+class ResourceSearchQuerySerializer(serializers.Serializer):
+    q = fields.CharField(max_length=255, required=False)
+    artist = fields.CharField(max_length=255, required=False)
+    limit = fields.IntegerField(min_value=1, required=False)
+
+    def validate_limit(self, value: int) -> int:
+        if value > settings.RESOURCE_SEARCH_MAX_LIMIT:
+            raise serializers.ValidationError(
+                "Ensure this value is less than or equal to "
+                f"{settings.RESOURCE_SEARCH_MAX_LIMIT}."
+            )
+        return value
+
+    def validate_q(self, value: str) -> str:
+        if not re.search(r"[^\W_]", value):
+            raise serializers.ValidationError("Search query must contain a word.")
+        return value
+
+    def validate(self, attrs: dict) -> dict:
+        if not attrs.get("q") and not attrs.get("artist"):
+            raise serializers.ValidationError("Either q or artist is required.")
+        return attrs
+
+
+class DSRRevenueSerializer(serializers.Serializer):
+    dsr_id = fields.IntegerField()
+    usages = fields.IntegerField()
+    revenue = fields.DecimalField(decimal_places=20, max_digits=60)
+
+
+class RecordingRevenueSerializer(serializers.Serializer):
+    usages = fields.IntegerField()
+    revenue = fields.DecimalField(decimal_places=20, max_digits=60)
+    dsrs = DSRRevenueSerializer(many=True)
+
+
+class DSRImportQuerySerializer(serializers.Serializer):
+    dry_run = fields.BooleanField(default=False)
+
+
+class DSRUploadSerializer(serializers.ModelSerializer):
+    received_ranges = fields.SerializerMethodField()
+
+    class Meta:
+        model = models.DSRUpload
+        fields = (
+            "id",
+            "filename",
+            "size",
+            "received_size",
+            "received_ranges",
+            "sha256",
+            "created_at",
+        )
+
+    def get_received_ranges(self, obj: models.DSRUpload) -> list[list[int]]:
+        # Chunks are received in order, so there's at most one range.
+        return [[0, obj.received_size]] if obj.received_size else []
+
+
+class DSRUploadCreateSerializer(serializers.Serializer):
+    filename = fields.CharField(max_length=256)
+    size = fields.IntegerField(min_value=0)
+
+    def validate_size(self, value: int) -> int:
+        if value > settings.DSR_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                "Ensure this value is less than or equal to "
+                f"{settings.DSR_UPLOAD_MAX_SIZE}."
+            )
+        return value
+
+
+class DSRUploadChunkQuerySerializer(serializers.Serializer):
+    offset = fields.IntegerField(min_value=0)
+
+
+class DSRUploadCompleteSerializer(serializers.Serializer):
+    sha256 = fields.RegexField(r"^[0-9a-f]{64}$", allow_null=True, default=None)
+
+
+class DSRRowErrorSerializer(serializers.Serializer):
+    line_number = fields.IntegerField()
+    line = fields.CharField()
+    error = fields.CharField()
+
+
+class DSRValidationSerializer(serializers.Serializer):
+    status = fields.ChoiceField(choices=models.DSR.STATUS_ALL)
+    row_count = fields.IntegerField()
+    failed_row_count = fields.IntegerField()
+    projected_size = fields.IntegerField()
+    errors = DSRRowErrorSerializer(many=True)
+
+
+class DSRQuerySerializer(ResourcePercentileQuerySerializer):
+    status = fields.ChoiceField(choices=models.DSR.STATUS_ALL, required=False)
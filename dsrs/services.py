@@ -1,21 +1,70 @@
 import csv
+import io
 import logging
+import mmap
+import os
 import re
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
 from datetime import date, datetime
+from decimal import Decimal
+from functools import partial
 from io import TextIOWrapper
-from itertools import islice
-from typing import Generator, Optional
+from operator import attrgetter, itemgetter
+from typing import Any, Generator, Iterable, Iterator, Optional, Union
 
 from django.conf import settings
 from django.core.files import File
-from django.core.files.storage import get_storage_class
-from django.db import DatabaseError
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, get_storage_class
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
 from django.db.models.query import QuerySet
 from rest_framework.exceptions import ValidationError
 
+from digital import replicas
+from dsrs import (
+    amendments,
+    archives,
+    blocked_gzip,
+    recordings,
+    sharding,
+    staging,
+    types,
+    uploads,
+    validation,
+    vectorized,
+)
+from dsrs.aggregates import (
+    add_dsr_to_monthly_aggregates,
+    remove_archived_dsr_from_monthly_aggregates,
+    remove_dsr_from_monthly_aggregates,
+)
+from dsrs.batching import RESOURCE_ROW_OVERHEAD, AdaptiveBatcher
+from dsrs.combining import ResourceCombiner
+from dsrs.locks import dsr_lock, try_lock_dsr, unlock_dsr
 from dsrs.mappers import map_dsr_row_to_resource
-from dsrs.models import DSR, Currency, Resource, Territory
-from dsrs.types import DSRFilenameData
+from dsrs.models import (
+    DSR,
+    Currency,
+    DSRStats,
+    DSRUpload,
+    Resource,
+    ResourceError,
+    Territory,
+)
+from dsrs.readers import (
+    check_row_encoding,
+    iter_lines,
+    iter_resources_mmap,
+    open_dsr_file_mmap,
+    read_line,
+)
+from dsrs.stats import REVENUE_CONTEXT, DSRStatsAccumulator, StoredDSRStatsCounter
+from dsrs.types import DSRFilenameData, DSRStatus
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +77,15 @@ FILENAME_REGEX: re.Pattern = re.compile(
 
 FILENAME_DATE_FORMAT: str = "%Y%m%d"
 
+# Words as split by the 'simple' text search configuration, near enough.
+SEARCH_WORD_REGEX: re.Pattern = re.compile(r"[^\W_]+")
+
+# Expressions of the indexes of migration `0009_resource_search`.
+SEARCH_VECTOR_SQL: str = (
+    "to_tsvector('simple'::regconfig, title || ' ' || replace(artists, '|', ' '))"
+)
+ARTIST_NAMES_SQL: str = "string_to_array(lower(artists), '|')"
+
 
 def get_dsr(parsed_data: DSRFilenameData) -> Optional[DSR]:
     """
@@ -53,6 +111,15 @@ def get_dsr(parsed_data: DSRFilenameData) -> Optional[DSR]:
         except ValueError:
             return None
 
+    alias = sharding.get_shard_alias(territory_code)
+    if alias != DEFAULT_DB_ALIAS:
+        # Copies of reference rows, for foreign keys on the shard.
+        if territory.local_currency_id != currency.pk:
+            sharding.copy_to_shard(territory.local_currency, alias)
+        sharding.copy_to_shard(currency, alias)
+        sharding.copy_to_shard(territory, alias)
+        kwargs["id"] = sharding.get_next_dsr_id()
+
     return DSR(**kwargs)
 
 
@@ -61,10 +128,32 @@ def save_dsr_file(dsr_file: File) -> str:
     Save DSR file and get its relative path.
     """
     storage = get_storage_class()()
-    name = storage.save(content=dsr_file, name=None)
+    if settings.DSR_STORAGE_FORMAT != "blocked_gzip":
+        name = storage.save(content=dsr_file, name=None)
+        return name
+
+    dsr_file.seek(0)
+    with tempfile.TemporaryFile() as fp:
+        blocks = blocked_gzip.write_blocks(
+            dsr_file, fp, block_size=settings.DSR_STORAGE_BLOCK_SIZE
+        )
+        name = storage.save(content=File(fp), name=f"{dsr_file.name}.gz")
+    index_name = blocked_gzip.get_index_name(name)
+    # Left behind by a deleted file, maybe.
+    storage.delete(index_name)
+    storage.save(content=ContentFile(blocked_gzip.dump_index(blocks)), name=index_name)
     return name
 
 
+def _delete_dsr_file(path: str) -> None:
+    """
+    Delete a stored DSR file, along with its block index if any.
+    """
+    storage = get_storage_class()()
+    storage.delete(blocked_gzip.get_index_name(path))
+    storage.delete(path)
+
+
 def parse_filename(filename: str) -> Optional[DSRFilenameData]:
     match = FILENAME_REGEX.search(filename)
     return match and match.groupdict()
@@ -73,7 +162,8 @@ def parse_filename(filename: str) -> Optional[DSRFilenameData]:
 def iter_resources(
     dsr_file: File, dsr: DSR
 ) -> Generator[Optional[Resource], None, None]:
-    with TextIOWrapper(dsr_file) as fp:
+    # Rows which aren't valid UTF-8 fail on their own.
+    with TextIOWrapper(dsr_file, errors="surrogateescape") as fp:
         reader = csv.DictReader(
             fp,
             fieldnames=["dsp_id", "title", "artists", "isrc", "usages", "revenue"],
@@ -83,6 +173,7 @@ def iter_resources(
         next(reader, None)
         for row in reader:
             try:
+                check_row_encoding(row)
                 kwargs = map_dsr_row_to_resource(dsr_row=row, dsr=dsr)
             except ValidationError as exc:
                 logger.error("Could not map row %s for DSR %s: %s", row, dsr, exc)
@@ -91,38 +182,379 @@ def iter_resources(
                 yield Resource(**kwargs)
 
 
+def _get_dsr_file_mmap(dsr: DSR, path: Optional[str] = None) -> Optional[mmap.mmap]:
+    storage = get_storage_class()()
+    path = path or dsr.path
+    if isinstance(storage, FileSystemStorage) and not blocked_gzip.is_blocked(
+        storage, path
+    ):
+        return open_dsr_file_mmap(storage.path(path))
+    return None
+
+
+def _iter_dsr_resources(
+    dsr: DSR, path: Optional[str] = None
+) -> Generator[Optional[Resource], None, None]:
+    """
+    Iterate over resources of the stored DSR file, or of the file stored
+    at `path`, memory-mapping it when it's on the local filesystem.
+    """
+    if mm := _get_dsr_file_mmap(dsr, path=path):
+        return iter_resources_mmap(mm, dsr=dsr)
+    storage = get_storage_class()()
+    path = path or dsr.path
+    if blocked_gzip.is_blocked(storage, path):
+        dsr_file = blocked_gzip.open_blocked(
+            storage, path, workers=settings.DSR_STORAGE_DECOMPRESSION_WORKERS
+        )
+        return iter_resources(dsr_file=dsr_file, dsr=dsr)
+    return iter_resources(dsr_file=storage.open(path), dsr=dsr)
+
+
+def _remove_dsr_from_monthly_aggregates(dsr: DSR) -> None:
+    if not dsr.archive_path:
+        remove_dsr_from_monthly_aggregates(dsr)
+        return
+    remove_archived_dsr_from_monthly_aggregates(
+        dsr, recordings=archives.iter_stored_recordings(dsr.archive_path)
+    )
+
+
+def _start_ingestion(dsr: DSR) -> bool:
+    """
+    Mark the DSR as being ingested and discard the results of any previous
+    ingestion, so that re-ingesting a DSR never duplicates its resources.
+    Its previous resources are deleted in throttled batches once it is out
+    of the aggregates, as for deletion, see `delete_dsr`.
+    Return False if the DSR is being deleted.
+    """
+    with sharding.atomic():
+        if (
+            not DSR.objects.filter(pk=dsr.pk)
+            .exclude(status="deleting")
+            .update(status="ingesting")
+        ):
+            return False
+        stored_dsr = DSR.objects.get(pk=dsr.pk)
+        _remove_dsr_from_monthly_aggregates(stored_dsr)
+        DSRStats.objects.filter(dsr=dsr).delete()
+        ResourceError.objects.filter(dsr=dsr).delete()
+        DSR.objects.filter(pk=dsr.pk).update(archive_path="")
+    _delete_resources(dsr, track_progress=False)
+    if stored_dsr.archive_path:
+        get_storage_class()().delete(stored_dsr.archive_path)
+    dsr.status = "ingesting"
+    dsr.archive_path = ""
+    return True
+
+
+def _finish_ingestion(
+    dsr: DSR,
+    batch: list[Resource],
+    stats: Union[DSRStatsAccumulator, StoredDSRStatsCounter],
+    status: DSRStatus,
+) -> None:
+    """
+    Save the last batch of resources, derived data and the final status
+    in a single transaction.
+    """
+    with sharding.atomic():
+        Resource.objects.bulk_create(batch)
+        # The DSR may have been marked for deletion in the meantime.
+        if DSR.objects.filter(pk=dsr.pk, status="ingesting").update(status=status):
+            add_dsr_to_monthly_aggregates(dsr)
+            stats.get_stats(dsr).save()
+            dsr.status = status
+
+
+def _fail_ingestion(dsr: DSR) -> None:
+    if DSR.objects.filter(pk=dsr.pk, status="ingesting").update(status="failed"):
+        dsr.status = "failed"
+
+
 def ingest_dsr(dsr: DSR) -> None:
     """
     Ingest DSR file and save resulting resources.
-    Assign ingestion status to the DSR instance.
+    Assign ingestion status to the DSR instance, store its summary statistics
+    and add it to the monthly aggregates.
+
+    Safe to run concurrently: a DSR is ingested by one worker at a time,
+    others skip it.
     """
-    dsr_file = get_storage_class()().open(dsr.path)
-    batch_size = settings.DSR_RESOURCE_IMPORT_BATCH_SIZE
-    resources = iter_resources(dsr_file=dsr_file, dsr=dsr)
-    final_status = "ingested"
-    while True:
-        try:
-            batch = list(islice(resources, batch_size))
-            batch_without_fails = list(filter(None, batch))
-            if len(batch) != len(batch_without_fails):
-                final_status = "failed"
-            if not batch:
-                dsr.status = final_status
-                dsr.save(update_fields=["status"])
+    with sharding.use_shard(sharding.get_dsr_alias(dsr)), dsr_lock(dsr) as locked:
+        if not locked:
+            logger.warning("DSR %s is already being ingested, skipping", dsr)
+            return
+        _ingest_dsr(dsr)
+
+
+def _ingest_dsr(dsr: DSR) -> None:
+    if settings.DSR_INGESTION_ENGINE == "numpy":
+        vectorized.check_numpy()
+        if mm := _get_dsr_file_mmap(dsr):
+            _ingest_dsr_vectorized(dsr, mm)
+            return
+    if settings.DSR_INGESTION_ENGINE == "sql":
+        if mm := _get_dsr_file_mmap(dsr):
+            if staging.can_stage(mm):
+                _ingest_dsr_staged(dsr, mm)
                 return
-            Resource.objects.bulk_create(batch_without_fails, batch_size)
-        except (OSError, csv.Error, DatabaseError) as exc:
-            logger.error("Error ingesting %s: %s", dsr_file, exc, exc_info=exc)
+            mm.close()
+    batcher = AdaptiveBatcher()
+    stats = DSRStatsAccumulator()
+    resources = stats.track(_iter_dsr_resources(dsr))
+    batches = batcher.batches(resources)
+    try:
+        if not _start_ingestion(dsr):
+            logger.warning("DSR %s is being deleted, skipping", dsr)
+            return
+        if settings.DSR_COMBINE_DUPLICATE_RESOURCES:
+            _ingest_dsr_combined(dsr, batches=batches, batcher=batcher, stats=stats)
+            return
+        batch = list(filter(None, next(batches, [])))
+        # Read one batch ahead to know which one is the last.
+        for next_batch in batches:
+            with batcher.measure(rows=len(batch)):
+                Resource.objects.bulk_create(batch)
+            batch = list(filter(None, next_batch))
+        _finish_ingestion(
+            dsr=dsr,
+            batch=batch,
+            stats=stats,
+            status="failed" if stats.failed_row_count else "ingested",
+        )
+    except (OSError, csv.Error, DatabaseError) as exc:
+        logger.error("Error ingesting %s: %s", dsr.path, exc, exc_info=exc)
+        _fail_ingestion(dsr)
+
+
+def _ingest_dsr_combined(
+    dsr: DSR,
+    batches: Iterator[list[Optional[Resource]]],
+    batcher: AdaptiveBatcher,
+    stats: DSRStatsAccumulator,
+) -> None:
+    """
+    Ingest batches of resources merging duplicate recordings,
+    see `dsrs.combining`. Statistics are still those of the DSR rows.
+    """
+    combiner = ResourceCombiner(dsr)
+    for batch in batches:
+        combiner.add_all(filter(None, batch))
+        if combiner.is_full:
+            with batcher.measure(rows=len(combiner)):
+                combiner.spill()
+    with sharding.atomic():
+        combiner.spill()
+        _finish_ingestion(
+            dsr=dsr,
+            batch=[],
+            stats=stats,
+            status="failed" if stats.failed_row_count else "ingested",
+        )
+
+
+def _ingest_dsr_vectorized(dsr: DSR, mm: mmap.mmap) -> None:
+    """
+    Ingest a memory-mapped DSR file validating and loading lines in batches,
+    see `dsrs.vectorized`.
+    """
+    batcher = AdaptiveBatcher()
+    stats = StoredDSRStatsCounter()
+    try:
+        if not _start_ingestion(dsr):
+            logger.warning("DSR %s is being deleted, skipping", dsr)
             return
+        sizes = iter(lambda: batcher.size, None)
+        for batch in vectorized.iter_line_batches(mm, sizes, batcher.max_bytes):
+            parsed = vectorized.parse_batch(batch, dsr=dsr)
+            lines = iter_lines(io.BytesIO(b"\n".join(parsed.rejected_lines)))
+            resources = [read_line(line, dsr=dsr) for line in lines]
+            stats.add_rows(parsed.accepted_count)
+            for resource in resources:
+                stats.add(resource)
+            with batcher.measure(rows=parsed.accepted_count + len(resources)):
+                vectorized.copy_resources(parsed.copy_data)
+                Resource.objects.bulk_create(filter(None, resources))
+        _finish_ingestion(
+            dsr=dsr,
+            batch=[],
+            stats=stats,
+            status="failed" if stats.failed_row_count else "ingested",
+        )
+    except (OSError, DatabaseError) as exc:
+        logger.error("Error ingesting %s: %s", dsr.path, exc, exc_info=exc)
+        _fail_ingestion(dsr)
+    finally:
+        mm.close()
+
+
+def _ingest_dsr_staged(dsr: DSR, mm: mmap.mmap) -> None:
+    """
+    Ingest a memory-mapped DSR file validating and loading lines in SQL,
+    batch by batch, see `dsrs.staging`.
+    """
+    batcher = AdaptiveBatcher()
+    stats = StoredDSRStatsCounter()
+    # Bytes per line, refined as batches are read.
+    line_size = RESOURCE_ROW_OVERHEAD
+    try:
+        if not _start_ingestion(dsr):
+            logger.warning("DSR %s is being deleted, skipping", dsr)
+            return
+        staging.create_staging_table(dsr)
+        max_bytes = iter(lambda: min(batcher.max_bytes, batcher.size * line_size), None)
+        for chunk in staging.iter_chunks(mm, max_bytes):
+            line_count = chunk.count(b"\n")
+            line_size = max(1, len(chunk) // line_count)
+            with batcher.measure(rows=line_count), sharding.atomic():
+                loaded_count, error_ids, lines = staging.load_chunk(chunk, dsr=dsr)
+                resources = staging.recheck_rejected_lines(error_ids, lines, dsr=dsr)
+            stats.add_rows(
+                count=loaded_count + len(lines),
+                failed_count=len(lines) - len(resources),
+            )
+        _finish_ingestion(
+            dsr=dsr,
+            batch=[],
+            stats=stats,
+            status="failed" if stats.failed_row_count else "ingested",
+        )
+    except (OSError, DatabaseError) as exc:
+        logger.error("Error ingesting %s: %s", dsr.path, exc, exc_info=exc)
+        _fail_ingestion(dsr)
+    finally:
+        mm.close()
+        staging.drop_staging_table(dsr)
+
+
+def _matches_dsr(parsed_data: DSRFilenameData, dsr: DSR) -> bool:
+    return (
+        parsed_data["territory_code"] == dsr.territory.code_2
+        and parsed_data["currency_code"] == dsr.currency.code
+        and parsed_data["period_start"]
+        == dsr.period_start.strftime(FILENAME_DATE_FORMAT)
+        and parsed_data["period_end"] == dsr.period_end.strftime(FILENAME_DATE_FORMAT)
+    )
+
+
+def _amend_dsr(dsr: DSR, path: str) -> types.DSRAmendment:
+    """
+    Replace resources of the DSR with those of the file stored at `path`,
+    along with derived data, in a single transaction.
+    """
+    batcher = AdaptiveBatcher()
+    stats = DSRStatsAccumulator()
+    resources = stats.track(_iter_dsr_resources(dsr, path=path))
+    with sharding.atomic():
+        amendments.create_amended_table()
+        for batch in batcher.batches(resources):
+            with batcher.measure(rows=len(batch)):
+                amendments.copy_amended_resources(filter(None, batch))
+        dsp_ids = amendments.diff_amended_resources(dsr)
+        if dsp_ids:
+            remove_dsr_from_monthly_aggregates(dsr, dsp_ids=dsp_ids)
+        inserted, updated, deleted = amendments.apply_resource_changes(dsr)
+        if dsp_ids:
+            add_dsr_to_monthly_aggregates(dsr, dsp_ids=dsp_ids)
+        ResourceError.objects.filter(dsr=dsr).delete()
+        DSRStats.objects.filter(dsr=dsr).delete()
+        dsr.stats = stats.get_stats(dsr)
+        dsr.stats.save()
+        # The replaced file is only dropped once nothing refers to it.
+        sharding.on_commit(partial(_delete_dsr_file, dsr.path))
+        dsr.path = path
+        dsr.status = "failed" if stats.failed_row_count else "ingested"
+        dsr.save(update_fields=["path", "status"])
+    return {"dsr": dsr, "inserted": inserted, "updated": updated, "deleted": deleted}
+
+
+def _mark_dsrs_for_deletion(dsr_ids: list[int]) -> None:
+    """
+    Take DSRs out of all derived data at once, leaving their resources
+    to be deleted in the background.
+    """
+    with sharding.atomic():
+        for dsr in DSR.objects.filter(pk__in=dsr_ids).exclude(status="deleting"):
+            # Resources are still in place at this point, so we can compute
+            # what has to be subtracted.
+            _remove_dsr_from_monthly_aggregates(dsr)
+        DSRStats.objects.filter(dsr__in=dsr_ids).delete()
+        DSR.objects.filter(pk__in=dsr_ids).exclude(status="deleting").update(
+            status="deleting", deleted_resource_count=0
+        )
+
+
+def _delete_resource_batch(dsr: DSR, size: int, track_progress: bool = True) -> int:
+    """
+    Delete a batch of the DSR's resources, addressed by their physical
+    location so that each batch is a bounded index lookup followed by
+    a TID scan. Return the number of deleted rows.
+    With track_progress, add them to `DSR.deleted_resource_count`.
+    """
+    with sharding.atomic(), sharding.get_connection().cursor() as cursor:
+        # `ctid = ANY(ARRAY(...))` rather than `ctid IN (...)`: the latter may
+        # be planned as a semi-join scanning the whole table.
+        cursor.execute(
+            """
+            DELETE FROM dsrs_resource
+            WHERE ctid = ANY(ARRAY(
+                SELECT ctid FROM dsrs_resource WHERE dsr_id = %s LIMIT %s
+            ))
+            """,
+            [dsr.id, size],
+        )
+        count = cursor.rowcount
+        if count and track_progress:
+            DSR.objects.filter(pk=dsr.pk).update(
+                deleted_resource_count=F("deleted_resource_count") + count
+            )
+    return count
+
+
+def _delete_resources(dsr: DSR, track_progress: bool = True) -> None:
+    size = settings.DSR_DELETION_BATCH_SIZE
+    while _delete_resource_batch(dsr, size=size, track_progress=track_progress) == size:
+        time.sleep(settings.DSR_DELETION_BATCH_DELAY)
+
+
+def _get_dsr_filter(
+    territory_code: Optional[str] = None,
+    period_start: Optional[date] = None,
+    period_end: Optional[date] = None,
+) -> dict[str, Any]:
+    dsr_filter = {}
+    if territory_code:
+        dsr_filter["territory__code_2"] = territory_code
+    if period_start:
+        dsr_filter["period_start__gte"] = period_start
+    if period_end:
+        dsr_filter["period_end__lte"] = period_end
+    return dsr_filter
+
+
+def _get_read_aliases(territory_code: Optional[str] = None) -> list[str]:
+    """
+    Get the databases to read DSR data from, or their replicas: the shard
+    of the territory if given, every shard otherwise.
+    """
+    return [
+        replicas.get_read_alias(alias)
+        for alias in (
+            [sharding.get_shard_alias(territory_code)]
+            if territory_code
+            else sharding.get_aliases()
+        )
+    ]
 
 
 # Public services below.
 
 
-def import_dsr(dsr_file: File) -> Optional[DSR]:
+def create_dsr(dsr_file: File, status: DSRStatus = "failed") -> Optional[DSR]:
     """
-    Parse the uploaded file's filename. If valid, store the DSR
-    and ingest it immediately.
+    Parse the uploaded file's filename. If valid, store the file
+    and create the DSR.
     """
     # DRF parser guarantees file.name presence, but we want to be safe.
     if not dsr_file.name:
@@ -137,31 +569,577 @@ def import_dsr(dsr_file: File) -> Optional[DSR]:
         return None
 
     dsr.path = save_dsr_file(dsr_file)
+    dsr.status = status
     dsr.save()
 
-    ingest_dsr(dsr=dsr)
+    return dsr
 
+
+def import_dsr(dsr_file: File) -> Optional[DSR]:
+    """
+    Parse the uploaded file's filename. If valid, store the DSR
+    and ingest it immediately.
+    """
+    dsr = create_dsr(dsr_file)
+    if dsr:
+        ingest_dsr(dsr=dsr)
     return dsr
 
 
+def amend_dsr(dsr: DSR, dsr_file: File) -> Optional[types.DSRAmendment]:
+    """
+    Apply a corrected file of an ingested DSR, writing only the resources
+    which differ, see `dsrs.amendments`. The file's filename must carry the
+    same metadata as the DSR.
+    Return None if it doesn't, if the DSR isn't ingested, or is locked
+    by another worker.
+    """
+    # DRF parser guarantees file.name presence, but we want to be safe.
+    if not dsr_file.name:
+        return None  # pragma: no cover
+
+    parsed_data = parse_filename(dsr_file.name)
+    if not parsed_data or not _matches_dsr(parsed_data, dsr):
+        return None
+
+    with sharding.use_shard(sharding.get_dsr_alias(dsr)), dsr_lock(dsr) as locked:
+        if not locked:
+            logger.warning("DSR %s is locked by another worker, skipping", dsr)
+            return None
+        # Failed DSRs with stats were ingested through, skipping bad rows.
+        if not DSRStats.objects.filter(
+            dsr=dsr, dsr__status__in=("ingested", "failed")
+        ).exists():
+            return None
+        path = save_dsr_file(dsr_file)
+        try:
+            return _amend_dsr(dsr, path=path)
+        except (OSError, csv.Error, DatabaseError) as exc:
+            logger.error("Error amending %s with %s: %s", dsr, path, exc, exc_info=exc)
+            _delete_dsr_file(path)
+            return None
+
+
+def _parse_dsr_filename(filename: str) -> Optional[DSRFilenameData]:
+    """
+    Same as `parse_filename`, also checking dates the way `get_dsr` does,
+    without creating currencies nor territories.
+    """
+    parsed_data = parse_filename(filename)
+    if not parsed_data:
+        return None
+    for key in ("period_start", "period_end"):
+        try:
+            datetime.strptime(parsed_data[key], FILENAME_DATE_FORMAT)
+        except ValueError:
+            return None
+    return parsed_data
+
+
+def validate_dsr_file(path: str, filename: str) -> Optional[types.DSRValidation]:
+    """
+    Validate a DSR file on the local filesystem the way it would be ingested,
+    in parallel, without writing anything, see `dsrs.validation`.
+    Return None if its filename is invalid.
+    """
+    if not _parse_dsr_filename(filename):
+        return None
+    return validation.validate_file(
+        path,
+        workers=settings.DSR_VALIDATION_WORKERS or os.cpu_count() or 1,
+        min_range_size=settings.DSR_VALIDATION_MIN_RANGE_SIZE,
+        sample_size=settings.DSR_VALIDATION_ERROR_SAMPLE_SIZE,
+    )
+
+
+def validate_dsr(dsr_file: File) -> Optional[types.DSRValidation]:
+    """
+    Same as `validate_dsr_file`, for an uploaded file.
+    """
+    # DRF parser guarantees file.name presence, but we want to be safe.
+    if not dsr_file.name:
+        return None  # pragma: no cover
+
+    if hasattr(dsr_file, "temporary_file_path"):
+        return validate_dsr_file(dsr_file.temporary_file_path(), dsr_file.name)
+    with tempfile.NamedTemporaryFile() as fp:
+        dsr_file.seek(0)
+        shutil.copyfileobj(dsr_file, fp)
+        fp.flush()
+        return validate_dsr_file(fp.name, dsr_file.name)
+
+
+def queue_dsr(dsr_file: File) -> Optional[DSR]:
+    """
+    Parse the uploaded file's filename. If valid, store the DSR
+    and leave it pending for an ingestion worker.
+    """
+    return create_dsr(dsr_file, status="pending")
+
+
+def _save_uploaded_dsr_file(path: str, filename: str) -> str:
+    """
+    Move a completed upload to storage, as is if DSR files are stored plain
+    on the local filesystem. Return its relative path.
+    """
+    storage = get_storage_class()()
+    if isinstance(storage, FileSystemStorage) and settings.DSR_STORAGE_FORMAT != (
+        "blocked_gzip"
+    ):
+        name = storage.get_available_name(filename)
+        os.makedirs(os.path.dirname(storage.path(name)), exist_ok=True)
+        os.replace(path, storage.path(name))
+        return name
+    try:
+        with open(path, mode="rb") as fp:
+            return save_dsr_file(File(fp, name=filename))
+    finally:
+        os.remove(path)
+
+
+def create_upload(filename: str, size: int) -> Optional[DSRUpload]:
+    """
+    Start a resumable upload of a DSR file of `size` bytes, as sent,
+    see `dsrs.uploads`. Return None if the filename is invalid.
+    """
+    if not _parse_dsr_filename(filename):
+        return None
+    return DSRUpload.objects.create(filename=filename, size=size)
+
+
+def write_upload_chunk(
+    upload: DSRUpload, offset: int, stream: io.RawIOBase
+) -> Optional[DSRUpload]:
+    """
+    Append a chunk of the file to an upload, decompressing and hashing it
+    on the way. The chunk may start anywhere up to the bytes received so
+    far. Return None if the upload is gone.
+    """
+    return uploads.append_chunk(upload, offset=offset, stream=stream)
+
+
+def complete_upload(upload: DSRUpload, sha256: Optional[str] = None) -> Optional[DSR]:
+    """
+    Turn a fully received upload into a DSR pending for an ingestion worker,
+    its decompressed file becoming the DSR file without being read again.
+    Return None if the upload is gone or incomplete, or if its digest
+    doesn't match `sha256`.
+    """
+    with uploads.lock(upload.pk) as upload:
+        if not upload or upload.received_size != upload.size:
+            return None
+        if sha256 and sha256 != upload.sha256:
+            return None
+        dsr = get_dsr(_parse_dsr_filename(upload.filename))
+        if not dsr:
+            return None  # pragma: no cover
+        path = uploads.finish(uploads.get_directory(), upload)
+        dsr.path = _save_uploaded_dsr_file(path, upload.filename)
+        dsr.status = "pending"
+        dsr.save()
+        upload.delete()
+    return dsr
+
+
+def abort_upload(upload: DSRUpload) -> None:
+    """
+    Delete an upload and whatever was received of it.
+    """
+    uploads.delete(upload)
+
+
+def delete_stale_uploads(updated_before: datetime) -> int:
+    """
+    Delete uploads which haven't received a chunk since `updated_before`,
+    and whatever was received of them, skipping those being written to.
+    Return how many were deleted.
+    """
+    return uploads.delete_stale(updated_before)
+
+
+def _claim_dsr() -> Optional[DSR]:
+    """
+    Claim a DSR of the current shard, see `claim_pending_dsr`, taking its
+    advisory lock.
+    """
+    with sharding.atomic():
+        dsr = (
+            DSR.objects.select_for_update(skip_locked=True)
+            .filter(status="pending")
+            .order_by("id")
+            .first()
+        )
+        if dsr and try_lock_dsr(dsr):
+            dsr.status = "ingesting"
+            dsr.ingestion_attempts = 1
+            dsr.save(update_fields=["status", "ingestion_attempts"])
+            return dsr
+    # Ingestions hold the lock of their DSR, so it's only free if the worker
+    # is gone, or has just finished.
+    for dsr in DSR.objects.filter(status="ingesting").order_by("id"):
+        if not try_lock_dsr(dsr):
+            continue
+        dsr.refresh_from_db()
+        if dsr.status == "ingesting":
+            # Workers keep dying on it, likely from the DSR itself.
+            if dsr.ingestion_attempts >= settings.DSR_INGESTION_MAX_ATTEMPTS:
+                logger.error(
+                    "DSR %s was left ingesting %s times, failing it",
+                    dsr,
+                    dsr.ingestion_attempts,
+                )
+                _fail_ingestion(dsr)
+                unlock_dsr(dsr)
+                continue
+            logger.warning("DSR %s was left ingesting, claiming it again", dsr)
+            dsr.ingestion_attempts += 1
+            dsr.save(update_fields=["ingestion_attempts"])
+            return dsr
+        unlock_dsr(dsr)
+    return None
+
+
+@contextmanager
+def claim_pending_dsr() -> Iterator[Optional[DSR]]:
+    """
+    Claim the oldest DSR pending ingestion, of the first shard having one,
+    or one left `ingesting` by a worker which died. Yield None if there
+    are none.
+
+    The claim holds the advisory lock of the DSR until exit, so that each
+    DSR is claimed by a single worker, and is claimed again if the worker
+    dies or fails before the DSR is ingested.
+    """
+    for alias in sharding.get_aliases():
+        with sharding.use_shard(alias):
+            dsr = _claim_dsr()
+            if dsr:
+                try:
+                    yield dsr
+                finally:
+                    unlock_dsr(dsr)
+                return
+    yield None
+
+
+def ingest_pending_dsrs() -> int:
+    """
+    Ingest pending DSRs until there are none left.
+    Return the number of ingested DSRs.
+
+    Unexpected errors fail the DSR they occur on, rather than the worker,
+    which would leave it `ingesting` for the next worker to fail on.
+    """
+    count = 0
+    while True:
+        with claim_pending_dsr() as dsr:
+            if not dsr:
+                return count
+            try:
+                ingest_dsr(dsr=dsr)
+            except Exception as exc:
+                logger.error("Error ingesting %s: %s", dsr.path, exc, exc_info=exc)
+                with sharding.use_shard(sharding.get_dsr_alias(dsr)):
+                    _fail_ingestion(dsr)
+        count += 1
+
+
+def mark_dsr_for_deletion(dsr: DSR) -> None:
+    """
+    Mark the DSR for deletion and return immediately. Its resources and
+    the DSR itself are deleted by a deletion worker, see `delete_dsr`.
+    """
+    with sharding.use_shard(sharding.get_dsr_alias(dsr)):
+        _mark_dsrs_for_deletion([dsr.pk])
+    dsr.status = "deleting"
+    dsr.deleted_resource_count = 0
+
+
+def mark_dsrs_for_deletion(queryset: QuerySet) -> None:
+    """
+    Mark DSRs in queryset for deletion, see `mark_dsr_for_deletion`.
+    """
+    with sharding.use_shard(queryset.db):
+        _mark_dsrs_for_deletion(list(queryset.values_list("pk", flat=True)))
+
+
+def delete_dsr(dsr: DSR) -> bool:
+    """
+    Delete resources of a DSR marked for deletion in bounded batches,
+    throttled to spare the database, then delete the DSR itself.
+    Progress is saved to `DSR.deleted_resource_count` after every batch.
+
+    Safe to run concurrently with ingestion and other deletions: a DSR
+    locked by another worker is skipped. Return True if the DSR was deleted.
+    """
+    with sharding.use_shard(sharding.get_dsr_alias(dsr)), dsr_lock(dsr) as locked:
+        if not locked:
+            logger.warning("DSR %s is locked by another worker, skipping", dsr)
+            return False
+        _delete_resources(dsr)
+        dsr.delete()
+        if dsr.archive_path:
+            get_storage_class()().delete(dsr.archive_path)
+    return True
+
+
+def delete_marked_dsrs() -> int:
+    """
+    Delete DSRs marked for deletion, skipping ones locked by other workers.
+    Return the number of deleted DSRs.
+    """
+    return sum(
+        delete_dsr(dsr=dsr)
+        for alias in sharding.get_aliases()
+        for dsr in DSR.objects.using(alias).filter(status="deleting").order_by("id")
+    )
+
+
+def archive_dsr(dsr: DSR) -> bool:
+    """
+    Move the resources of an ingested DSR to a compressed archive in
+    storage, see `dsrs.archives`, and mark it archived. Queries covering
+    the DSR read the archive instead, its stats and monthly aggregates
+    are kept.
+
+    Resources are deleted in bounded batches once the DSR is marked, an
+    interrupted archival is resumed by archiving the DSR again.
+    Return False if the DSR isn't ingested, or is locked by another worker.
+    """
+    archives.check_numpy()
+    with sharding.use_shard(sharding.get_dsr_alias(dsr)), dsr_lock(dsr) as locked:
+        if not locked:
+            logger.warning("DSR %s is locked by another worker, skipping", dsr)
+            return False
+        dsr.refresh_from_db()
+        if dsr.status != "archived":
+            # Failed DSRs with stats were ingested through, skipping bad rows.
+            if not DSRStats.objects.filter(
+                dsr=dsr, dsr__status__in=("ingested", "failed")
+            ).exists():
+                return False
+            name = archives.save_archive(dsr)
+            # The DSR may have been marked for deletion in the meantime.
+            if not DSR.objects.filter(
+                pk=dsr.pk, status__in=("ingested", "failed")
+            ).update(status="archived", archive_path=name):
+                get_storage_class()().delete(name)
+                return False
+            dsr.status = "archived"
+            dsr.archive_path = name
+        _delete_resources(dsr)
+    return True
+
+
+def archive_old_dsrs(period_end: date) -> int:
+    """
+    Archive ingested DSRs ending before `period_end`, and resume interrupted
+    archivals, skipping DSRs locked by other workers.
+    Return the number of archived DSRs.
+    """
+    return sum(
+        archive_dsr(dsr=dsr)
+        for alias in sharding.get_aliases()
+        for dsr in archives.get_dsrs_to_archive(alias, period_end=period_end)
+    )
+
+
+def get_dsrs(
+    status: Optional[str] = None,
+    territory_code: Optional[str] = None,
+    period_start: Optional[date] = None,
+    period_end: Optional[date] = None,
+) -> Union[QuerySet, sharding.MergedQuerySet]:
+    """
+    Get DSRs along with their territories and currencies, in a stable order
+    suitable for pagination. Optionally, narrow results to a specific status,
+    territory and/or date boundaries. DSRs of several shards are merged.
+    """
+    dsr_filter = _get_dsr_filter(
+        territory_code=territory_code,
+        period_start=period_start,
+        period_end=period_end,
+    )
+    if status:
+        dsr_filter["status"] = status
+    querysets = [
+        DSR.objects.using(alias)
+        .filter(**dsr_filter)
+        .select_related("territory", "currency", "stats")
+        .order_by("id")
+        for alias in _get_read_aliases(territory_code)
+    ]
+    if len(querysets) == 1:
+        return querysets[0]
+    return sharding.MergedQuerySet(querysets, key=attrgetter("pk"))
+
+
+def get_dsr_stats_summary(
+    territory_code: Optional[str] = None,
+    period_start: Optional[date] = None,
+    period_end: Optional[date] = None,
+) -> types.DSRStatsSummary:
+    """
+    Sum up the precomputed statistics of DSRs, over every shard. Optionally,
+    narrow results to a specific territory and/or date boundaries.
+    """
+    dsr_filter = _get_dsr_filter(
+        territory_code=territory_code,
+        period_start=period_start,
+        period_end=period_end,
+    )
+    summary: types.DSRStatsSummary = {
+        "dsr_count": 0,
+        "row_count": 0,
+        "failed_row_count": 0,
+        "total_usages": 0,
+        "total_revenue": Decimal(0),
+    }
+    for alias in _get_read_aliases(territory_code):
+        shard_summary = (
+            DSRStats.objects.using(alias)
+            .filter(**{f"dsr__{key}": value for key, value in dsr_filter.items()})
+            .aggregate(
+                dsr_count=Count("dsr"),
+                row_count=Coalesce(Sum("row_count"), 0),
+                failed_row_count=Coalesce(Sum("failed_row_count"), 0),
+                total_usages=Coalesce(Sum("total_usages"), 0),
+                total_revenue=Coalesce(Sum("total_revenue"), Decimal(0)),
+            )
+        )
+        for key in ("dsr_count", "row_count", "failed_row_count", "total_usages"):
+            summary[key] += shard_summary[key]
+        summary["total_revenue"] = REVENUE_CONTEXT.add(
+            summary["total_revenue"], shard_summary["total_revenue"]
+        )
+    return summary
+
+
+def get_recording_revenue(
+    isrc: Optional[str] = None,
+    dsp_id: Optional[str] = None,
+) -> types.RecordingRevenue:
+    """
+    Break usages and revenue of a recording, identified by its ISRC
+    or DSP id, down by DSR, over every shard. Only needs index-only scans
+    over resources.
+    """
+    resource_filter = {}
+    if isrc:
+        resource_filter["isrc"] = isrc
+    if dsp_id:
+        resource_filter["dsp_id"] = dsp_id
+    dsrs = sorted(
+        (
+            dsr
+            for alias in _get_read_aliases()
+            for dsr in Resource.objects.using(alias)
+            .filter(**resource_filter)
+            .exclude(dsr__status__in=("deleting", "archived"))
+            .values("dsr_id")
+            .annotate(usages=Sum("usages"), revenue=Sum("revenue"))
+            .order_by("dsr_id")
+        ),
+        key=itemgetter("dsr_id"),
+    )
+    revenue = Decimal(0)
+    for dsr in dsrs:
+        revenue = REVENUE_CONTEXT.add(revenue, dsr["revenue"])
+    return {
+        "usages": sum(dsr["usages"] for dsr in dsrs),
+        "revenue": revenue,
+        "dsrs": dsrs,
+    }
+
+
+def _get_search_query(
+    q: Optional[str] = None, artist: Optional[str] = None
+) -> tuple[str, list[Any]]:
+    """
+    Get the query of `search_resources`, and its parameters but the limit.
+    """
+    conditions = [
+        "dsr_id NOT IN (SELECT id FROM dsr WHERE status IN ('deleting', 'archived'))",
+    ]
+    params: list[Any] = []
+    if q:
+        words = SEARCH_WORD_REGEX.findall(q.lower())
+        conditions.append(f"{SEARCH_VECTOR_SQL} @@ to_tsquery('simple', %s)")
+        params.append(" & ".join(f"{word}:*" for word in words))
+    if artist:
+        conditions.append(f"{ARTIST_NAMES_SQL} @> ARRAY[%s]::text[]")
+        params.append(artist.strip().lower())
+    sql = f"""
+    SELECT id, dsr_id, dsp_id, title, artists, isrc, usages, revenue
+    FROM dsrs_resource
+    WHERE {" AND ".join(conditions)}
+    LIMIT %s;
+    """
+    return sql, params
+
+
+def search_resources(
+    q: Optional[str] = None,
+    artist: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> list[Resource]:
+    """
+    Find resources with titles or artist names starting with every word
+    of `q`, and/or crediting `artist`, case insensitively. Backed by
+    GIN expression indexes, see migration `0009_resource_search`. Matches
+    are returned in no particular order, so that the first `limit` of them,
+    `RESOURCE_SEARCH_DEFAULT_LIMIT` by default, are returned without ranking
+    or sorting every match. Shards are searched in turn until enough match.
+    """
+    limit = limit or settings.RESOURCE_SEARCH_DEFAULT_LIMIT
+    sql, params = _get_search_query(q=q, artist=artist)
+    resources: list[Resource] = []
+    for alias in _get_read_aliases():
+        resources.extend(
+            Resource.objects.using(alias).raw(sql, [*params, limit - len(resources)])
+        )
+        if len(resources) == limit:
+            break
+    return resources
+
+
 def get_top_resources_by_percentile(
     percentile: float,
     territory_code: Optional[str] = None,
     period_start: Optional[date] = None,
     period_end: Optional[date] = None,
-) -> QuerySet:
+) -> Iterable[Resource]:
     """
     Find the top percentile by revenue. Optionally, narrow results
     to a specific territory and/or date boundaries.
+
+    Across shards, each shard sums up revenue by recording in parallel,
+    and the sums are merged to rank recordings, see `dsrs.sharding`.
     """
-    dsr_filter = {}
-    if territory_code:
-        dsr_filter["territory__code_2"] = territory_code
-    if period_start:
-        dsr_filter["period_start__gte"] = period_start
-    if period_end:
-        dsr_filter["period_end__lte"] = period_end
-    dsr_ids = DSR.objects.filter(**dsr_filter).values_list("id", flat=True)
+    dsr_filter = _get_dsr_filter(
+        territory_code=territory_code,
+        period_start=period_start,
+        period_end=period_end,
+    )
+    aliases = _get_read_aliases(territory_code)
+    if len(aliases) > 1:
+        shard_recordings = recordings.get_recording_revenues_by_shard(
+            aliases, dsr_filter=dsr_filter
+        )
+        return recordings.merge_recording_revenues(
+            shard_recordings, percentile=percentile
+        )
+
+    (alias,) = aliases
+    with sharding.use_shard(alias):
+        dsr_ids, archived = recordings.get_dsrs_by_storage(dsr_filter)
+        if archived:
+            return recordings.merge_recording_revenues(
+                [recordings.get_recording_revenues(dsr_ids, archived)],
+                percentile=percentile,
+            )
+    if not dsr_ids:
+        return []
     # TODO Requirements specify response currency as EUR; revenue currency
     # conversion is something that should be done during ingestion and requires
     # historical data to actually make sense.
@@ -177,30 +1155,137 @@ def get_top_resources_by_percentile(
     #
     # This is something that I feel is out of scope of the task at hand,
     # so for now just naively add it up
-    return Resource.objects.raw(
-        """
+    return Resource.objects.using(alias).raw(
+        f"""
+    WITH aggregated_resources AS (
+        SELECT
+            recordings.*,
+            PERCENT_RANK() OVER (ORDER BY recordings.revenue DESC) AS percentile
+        FROM ({recordings.RECORDING_REVENUES_SQL}) AS recordings
+    )
+    SELECT
+        dsp_id as id, dsp_id, title, artists, isrc, dsr_ids, usages, revenue
+    FROM aggregated_resources
+    WHERE aggregated_resources.percentile <= %(percentile)s;
+    """,
+        {"dsr_ids": dsr_ids, "percentile": percentile},
+    )
+
+
+def get_top_resources(
+    n: int,
+    by: types.TopResourcesOrder = "revenue",
+    territory_code: Optional[str] = None,
+    period_start: Optional[date] = None,
+    period_end: Optional[date] = None,
+) -> list[Resource]:
+    """
+    Find the top `n` recordings by revenue or usages. Optionally, narrow
+    results to a specific territory and/or date boundaries.
+
+    Only recordings kept in the stats of a DSR as its top ones are grouped.
+    Recordings which aren't kept anywhere add up to at most the sum of the
+    last kept values, if they're above it the top `n` is exact. Otherwise,
+    or if `n` exceeds the number of kept recordings, all resources are
+    grouped. DSRs of every shard count towards the bound.
+    """
+    dsr_filter = _get_dsr_filter(
+        territory_code=territory_code,
+        period_start=period_start,
+        period_end=period_end,
+    )
+    dsrs = []
+    shard_dsrs = {}
+    for alias in _get_read_aliases(territory_code):
+        values = list(
+            DSR.objects.using(alias)
+            .filter(**dsr_filter)
+            .exclude(status="deleting")
+            .values_list(
+                "id",
+                "archive_path",
+                f"stats__top_recordings_by_{by}",
+                "stats__top_recordings_limit",
+            )
+        )
+        dsrs.extend(values)
+        shard_dsrs[alias] = (
+            [dsr_id for dsr_id, archive_path, _, _ in values if not archive_path],
+            [
+                (dsr_id, archive_path)
+                for dsr_id, archive_path, _, _ in values
+                if archive_path
+            ],
+        )
+    # Position of `by` in kept recordings.
+    position = 4 if by == "usages" else 5
+    candidates = set()
+    # Bound of recordings which weren't kept, None if all of them were.
+    threshold = None
+    for _, _, top_recordings, limit in dsrs:
+        # Not ingested, or not keeping enough recordings.
+        if limit is None or limit < n:
+            return recordings.get_top_resources(shard_dsrs, n=n, by=by)
+        candidates.update(tuple(recording[:4]) for recording in top_recordings)
+        if len(top_recordings) == limit:
+            # Unseen recordings may be absent from the DSR.
+            threshold = (threshold or 0) + max(Decimal(top_recordings[-1][position]), 0)
+
+    resources = recordings.get_top_resources(
+        shard_dsrs, n=n, by=by, candidates=candidates
+    )
+    if threshold is None or (
+        len(resources) == n and getattr(resources[-1], by) > threshold
+    ):
+        return resources
+    return recordings.get_top_resources(shard_dsrs, n=n, by=by)
+
+
+def get_top_resources_by_percentile_from_monthly_aggregates(
+    percentile: float,
+    territory_code: Optional[str] = None,
+    period_start: Optional[date] = None,
+    period_end: Optional[date] = None,
+) -> Iterable[Resource]:
+    """
+    Find the top percentile by revenue using the monthly aggregates.
+    Optionally, narrow results to a specific territory and/or months:
+    date boundaries are widened to whole calendar months.
+
+    Across shards, the sums of each shard are merged to rank recordings,
+    as for `get_top_resources_by_percentile`.
+    """
+    params = {
+        "percentile": percentile,
+        "territory_code": territory_code,
+        "period_start": period_start,
+        "period_end": period_end,
+    }
+    aliases = _get_read_aliases(territory_code)
+    if len(aliases) > 1:
+        shard_recordings = []
+        for alias in aliases:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(recordings.MONTHLY_RECORDING_REVENUES_SQL, params)
+                shard_recordings.append(cursor.fetchall())
+        return recordings.merge_recording_revenues(
+            shard_recordings, percentile=percentile
+        )
+
+    (alias,) = aliases
+    return Resource.objects.using(alias).raw(
+        f"""
     WITH aggregated_resources AS (
         SELECT
-            dsrs_resource.dsp_id,
-            dsrs_resource.title,
-            dsrs_resource.artists,
-            dsrs_resource.isrc, 
-            ARRAY_AGG(dsrs_resource.dsr_id) AS dsr_ids,
-            SUM(dsrs_resource.usages) AS usages,
-            SUM(dsrs_resource.revenue) AS revenue,
-            PERCENT_RANK() OVER (ORDER BY SUM(revenue) DESC) AS percentile
-        FROM dsrs_resource
-        WHERE dsrs_resource.dsr_id = ANY(%s)
-        GROUP BY
-            dsrs_resource.dsp_id,
-            dsrs_resource.title,
-            dsrs_resource.artists, 
-            dsrs_resource.isrc
+            recordings.*,
+            PERCENT_RANK() OVER (ORDER BY recordings.revenue DESC) AS percentile
+        FROM ({recordings.MONTHLY_RECORDING_REVENUES_SQL}) AS recordings
     )
     SELECT
         dsp_id as id, dsp_id, title, artists, isrc, dsr_ids, usages, revenue
     FROM aggregated_resources
-    WHERE aggregated_resources.percentile <= %s;
+    WHERE aggregated_resources.percentile <= %(percentile)s
+    ORDER BY revenue DESC;
     """,
-        [list(dsr_ids), percentile],
+        params,
     )
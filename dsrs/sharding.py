@@ -0,0 +1,153 @@
+"""
+Placement of DSR data on shard databases by territory, see `DSR_SHARDS`
+and `dsrs.routers.TerritoryShardRouter`.
+
+DSRs, their resources and derived data live on the shard of their territory,
+territories and currencies on the default database. Shards hold copies of the
+territories and currencies of their DSRs, for foreign keys and joins. DSR ids
+are drawn from the default database, so that they're unique across shards.
+
+Queries without an instance to route by, raw SQL included, run on the shard
+set with `use_shard`, or on the default database outside of it. Reads which
+aren't narrowed to a territory run on every shard and merge the results.
+"""
+
+import heapq
+import threading
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Iterator
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models.query import QuerySet
+
+from dsrs.models import DSR
+
+_local = threading.local()
+
+
+def get_aliases() -> list[str]:
+    """
+    Get the aliases of the databases holding DSR data, the default one first.
+    """
+    return [
+        DEFAULT_DB_ALIAS,
+        *(alias for alias in settings.DSR_SHARDS if alias != DEFAULT_DB_ALIAS),
+    ]
+
+
+def get_shard_alias(territory_code: str) -> str:
+    for alias, territory_codes in settings.DSR_SHARDS.items():
+        if territory_code in territory_codes:
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+def get_dsr_alias(dsr: DSR) -> str:
+    """
+    Get the alias of the database holding the DSR, or which will hold it.
+    """
+    if not settings.DSR_SHARDS:
+        return DEFAULT_DB_ALIAS
+    if dsr._state.adding:
+        return get_shard_alias(dsr.territory.code_2)
+    return dsr._state.db or DEFAULT_DB_ALIAS
+
+
+def get_current_alias() -> str:
+    return getattr(_local, "alias", None) or DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_shard(alias: str) -> Iterator[None]:
+    """
+    Run queries of DSR data without an instance to route by on the shard.
+    """
+    previous = getattr(_local, "alias", None)
+    _local.alias = alias
+    try:
+        yield
+    finally:
+        _local.alias = previous
+
+
+def get_connection() -> BaseDatabaseWrapper:
+    return connections[get_current_alias()]
+
+
+def atomic() -> transaction.Atomic:
+    """
+    Same as `transaction.atomic`, on the current shard.
+    """
+    return transaction.atomic(using=get_current_alias())
+
+
+def on_commit(func: Callable[[], None]) -> None:
+    """
+    Same as `transaction.on_commit`, on the current shard.
+    """
+    transaction.on_commit(func, using=get_current_alias())
+
+
+def get_next_dsr_id() -> int:
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id'))", [DSR._meta.db_table]
+        )
+        (dsr_id,) = cursor.fetchone()
+    return dsr_id
+
+
+def copy_to_shard(instance: models.Model, alias: str) -> None:
+    """
+    Copy a row of a reference table from the default database to a shard.
+    """
+    if alias == DEFAULT_DB_ALIAS:
+        return
+    model = type(instance)
+    model.objects.using(alias).update_or_create(
+        pk=instance.pk,
+        defaults={
+            field.attname: getattr(instance, field.attname)
+            for field in model._meta.concrete_fields
+            if not field.primary_key
+        },
+    )
+
+
+class MergedQuerySet:
+    """
+    Querysets of a model on several shards, read as one in the order of
+    `key`, which must be the order of each of them. Supports what pagination
+    and object lookups need.
+    """
+
+    def __init__(self, querysets: list[QuerySet], key: Callable[[Any], Any]) -> None:
+        self.querysets = querysets
+        self.key = key
+        self.model = querysets[0].model
+
+    def count(self) -> int:
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def get(self, **kwargs) -> models.Model:
+        for queryset in self.querysets:
+            try:
+                return queryset.get(**kwargs)
+            except self.model.DoesNotExist:
+                pass
+        raise self.model.DoesNotExist(
+            f"{self.model._meta.object_name} matching query does not exist."
+        )
+
+    def __getitem__(self, item: slice) -> list[models.Model]:
+        # No shard has to return more rows than the end of the slice.
+        querysets = [queryset[: item.stop] for queryset in self.querysets]
+        return list(
+            islice(heapq.merge(*querysets, key=self.key), item.start, item.stop)
+        )
+
+    def __iter__(self) -> Iterator[models.Model]:
+        return heapq.merge(*self.querysets, key=self.key)
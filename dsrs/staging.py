@@ -0,0 +1,215 @@
+"""
+Set-based ingestion of memory-mapped DSR files, see `services.ingest_dsr`.
+
+Raw lines are copied, a batch at a time, into an UNLOGGED staging table
+of the DSR, so that they don't go through WAL. A single statement then
+casts and validates the whole batch in SQL, inserting valid rows into
+resources and routing the others into `ResourceError`, and the staging
+table is truncated. Rejected rows, which may still be valid in a form the
+SQL checks are too strict for, get a second look from `readers.read_line`.
+"""
+
+import io
+import mmap
+from typing import Iterator
+
+from dsrs import sharding
+from dsrs.models import DSR, Resource, ResourceError
+from dsrs.readers import TEXT_FIELD_MAX_LENGTHS, USAGES_MAX, USAGES_MIN, read_line
+
+# Characters `str.strip` removes, as DRF fields do. None of them is above
+# U+3000.
+WHITESPACE: str = "".join(char for char in map(chr, range(0x3001)) if char.isspace())
+
+REVENUE_MAX_DECIMAL_PLACES: int = Resource._meta.get_field("revenue").decimal_places
+REVENUE_MAX_WHOLE_DIGITS: int = (
+    Resource._meta.get_field("revenue").max_digits - REVENUE_MAX_DECIMAL_PLACES
+)
+
+# Plain integers, possibly with a zero decimal part, as DRF accepts them.
+# Enough digits to be range-checked as a bigint.
+USAGES_REGEX: str = rf"^[{WHITESPACE}]*[+-]?[0-9]{{1,18}}(\.0*)?[{WHITESPACE}]*$"
+REVENUE_REGEX: str = r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)$"
+
+CREATE_STAGING_TABLE_SQL: str = """
+    CREATE UNLOGGED TABLE {table} (position bigserial, line text NOT NULL)
+"""
+
+COPY_STAGING_SQL: str = "COPY {table} (line) FROM STDIN"
+
+# Fields missing from short rows are NULL.
+LOAD_STAGED_SQL: str = """
+    WITH parsed AS (
+        SELECT
+            position,
+            line,
+            btrim(fields[1], %(whitespace)s) AS dsp_id,
+            btrim(fields[2], %(whitespace)s) AS title,
+            btrim(fields[3], %(whitespace)s) AS artists,
+            btrim(fields[4], %(whitespace)s) AS isrc,
+            COALESCE(fields[5], '') AS usages,
+            btrim(COALESCE(fields[6], ''), %(whitespace)s) AS revenue
+        FROM {table}, string_to_array(line, E'\\t') AS fields
+        WHERE line <> ''
+    ),
+    checked AS (
+        SELECT
+            parsed.*,
+            CASE
+                WHEN isrc IS NULL THEN 'Missing fields.'
+                WHEN dsp_id = '' OR char_length(dsp_id) > %(dsp_id_max_length)s
+                THEN 'Invalid dsp_id.'
+                WHEN title = '' OR char_length(title) > %(title_max_length)s
+                THEN 'Invalid title.'
+                WHEN artists = '' OR char_length(artists) > %(artists_max_length)s
+                THEN 'Invalid artists.'
+                WHEN isrc = '' OR char_length(isrc) > %(isrc_max_length)s
+                THEN 'Invalid ISRC.'
+                WHEN usages <> '' AND usages !~ %(usages_regex)s
+                THEN 'Invalid usages.'
+                -- Only cast once the format is known to be right.
+                WHEN usages <> ''
+                AND split_part(btrim(usages, %(whitespace)s), '.', 1)::bigint
+                NOT BETWEEN %(usages_min)s AND %(usages_max)s
+                THEN 'Invalid usages.'
+                WHEN revenue <> '' AND (
+                    revenue !~ %(revenue_regex)s
+                    OR char_length(ltrim(split_part(revenue, '.', 1), '+-0'))
+                    > %(revenue_max_whole_digits)s
+                    OR char_length(split_part(revenue, '.', 2))
+                    > %(revenue_max_decimal_places)s
+                )
+                THEN 'Invalid revenue.'
+            END AS error
+        FROM parsed
+    ),
+    inserted AS (
+        INSERT INTO dsrs_resource (
+            dsr_id, dsp_id, title, artists, isrc, usages, revenue
+        )
+        SELECT
+            %(dsr_id)s,
+            dsp_id,
+            title,
+            artists,
+            isrc,
+            CASE WHEN usages = '' THEN 0
+            ELSE split_part(btrim(usages, %(whitespace)s), '.', 1)::integer END,
+            CASE WHEN revenue = '' THEN 0 ELSE revenue::numeric END
+        FROM checked
+        WHERE error IS NULL
+        RETURNING 1
+    ),
+    rejected AS (
+        INSERT INTO dsrs_resourceerror (dsr_id, line_number, line, error)
+        SELECT %(dsr_id)s, position + 1, line, error
+        FROM checked
+        WHERE error IS NOT NULL
+        RETURNING id, line
+    )
+    SELECT
+        (SELECT COUNT(*) FROM inserted),
+        ARRAY(SELECT id FROM rejected ORDER BY id),
+        ARRAY(SELECT line FROM rejected ORDER BY id)
+"""
+
+
+def _get_params(dsr: DSR) -> dict:
+    params = {
+        "dsr_id": dsr.id,
+        "whitespace": WHITESPACE,
+        "usages_regex": USAGES_REGEX,
+        "usages_min": USAGES_MIN,
+        "usages_max": USAGES_MAX,
+        "revenue_regex": REVENUE_REGEX,
+        "revenue_max_whole_digits": REVENUE_MAX_WHOLE_DIGITS,
+        "revenue_max_decimal_places": REVENUE_MAX_DECIMAL_PLACES,
+    }
+    for name, (_, max_length) in zip(
+        ("dsp_id", "title", "artists", "isrc"), TEXT_FIELD_MAX_LENGTHS
+    ):
+        params[f"{name}_max_length"] = max_length
+    return params
+
+
+def can_stage(mm: mmap.mmap) -> bool:
+    # Text columns can't hold NUL characters.
+    return mm.find(b"\x00") == -1
+
+
+def get_staging_table(dsr: DSR) -> str:
+    return sharding.get_connection().ops.quote_name(f"dsrs_resource_staging_{dsr.id}")
+
+
+def create_staging_table(dsr: DSR) -> None:
+    table = get_staging_table(dsr)
+    with sharding.get_connection().cursor() as cursor:
+        # Left behind by a crashed ingestion, maybe.
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(CREATE_STAGING_TABLE_SQL.format(table=table))
+
+
+def drop_staging_table(dsr: DSR) -> None:
+    with sharding.get_connection().cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {get_staging_table(dsr)}")
+
+
+def _to_copy_text(chunk: bytes) -> bytes:
+    """
+    Translate newlines the way `readers.iter_lines` does, and escape
+    whole lines as single COPY text values.
+    """
+    chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    return chunk.replace(b"\\", b"\\\\").replace(b"\t", b"\\t")
+
+
+def iter_chunks(mm: mmap.mmap, max_bytes: Iterator[int]) -> Iterator[bytes]:
+    """
+    Skip the header row, then read chunks of whole lines in COPY text
+    format, each of about the next number of bytes from `max_bytes`.
+    """
+    header_skipped = False
+    while chunk := mm.read(next(max_bytes)):
+        chunk = _to_copy_text(chunk + mm.readline())
+        if not header_skipped:
+            # Empty lines before the header are skipped.
+            chunk = chunk.lstrip(b"\n")
+            if not chunk:
+                continue
+            chunk = chunk.partition(b"\n")[2]
+            header_skipped = True
+        if chunk:
+            yield chunk if chunk.endswith(b"\n") else chunk + b"\n"
+
+
+def load_chunk(chunk: bytes, dsr: DSR) -> tuple[int, list[int], list[str]]:
+    """
+    Copy a chunk into the staging table of the DSR, then load it into
+    resources and resource errors. Return the number of loaded resources,
+    with the ids and lines of rejected rows.
+    """
+    table = get_staging_table(dsr)
+    with sharding.get_connection().cursor() as cursor:
+        cursor.copy_expert(COPY_STAGING_SQL.format(table=table), io.BytesIO(chunk))
+        cursor.execute(LOAD_STAGED_SQL.format(table=table), _get_params(dsr))
+        loaded_count, error_ids, lines = cursor.fetchone()
+        cursor.execute(f"TRUNCATE {table}")
+    return loaded_count, error_ids, lines
+
+
+def recheck_rejected_lines(
+    error_ids: list[int], lines: list[str], dsr: DSR
+) -> list[Resource]:
+    """
+    Load rejected rows which pass the full validation, and
+    drop their errors. Return the loaded resources.
+    """
+    resources, accepted_error_ids = [], []
+    for error_id, line in zip(error_ids, lines):
+        if resource := read_line(line.encode(), dsr=dsr):
+            resources.append(resource)
+            accepted_error_ids.append(error_id)
+    if resources:
+        Resource.objects.bulk_create(resources)
+        ResourceError.objects.filter(id__in=accepted_error_ids).delete()
+    return resources
@@ -0,0 +1,158 @@
+from decimal import Context, Decimal
+from typing import Any, Iterable, Iterator, Optional
+
+from django.conf import settings
+
+from dsrs import sharding
+from dsrs.models import DSR, DSRStats, Resource
+
+# Postgres keeps bounded heaps for `ORDER BY ... LIMIT`, recordings are
+# grouped once for both rankings and for the totals, in a single scan of the
+# DSR's resources.
+STORED_RESOURCE_STATS_SQL = """
+    WITH recordings AS MATERIALIZED (
+        SELECT
+            dsp_id,
+            title,
+            artists,
+            isrc,
+            SUM(usages) AS usages,
+            SUM(revenue) AS revenue
+        FROM dsrs_resource
+        WHERE dsr_id = %(dsr_id)s
+        GROUP BY dsp_id, title, artists, isrc
+    )
+    (
+        SELECT 'revenue', *, NULL::bigint
+        FROM recordings
+        ORDER BY revenue DESC, dsp_id, title, artists, isrc
+        LIMIT %(limit)s
+    )
+    UNION ALL
+    (
+        SELECT 'usages', *, NULL::bigint
+        FROM recordings
+        ORDER BY usages DESC, dsp_id, title, artists, isrc
+        LIMIT %(limit)s
+    )
+    UNION ALL
+    SELECT
+        'totals',
+        NULL,
+        NULL,
+        NULL,
+        NULL,
+        COALESCE(SUM(usages), 0)::bigint,
+        COALESCE(SUM(revenue), 0),
+        COUNT(*)
+    FROM recordings
+"""
+
+# The default context rounds to 28 significant digits, keep sums exact.
+REVENUE_CONTEXT = Context(prec=DSRStats._meta.get_field("total_revenue").max_digits)
+
+
+def get_stored_stats(dsr: DSR) -> dict[str, Any]:
+    """
+    Get the statistics of the stored resources of a DSR, totals, distinct
+    recordings and those with the highest revenue and usages, as `DSRStats`
+    fields.
+    """
+    limit = settings.DSR_TOP_RECORDINGS_LIMIT
+    top_recordings: dict[str, list] = {"revenue": [], "usages": []}
+    with sharding.get_connection().cursor() as cursor:
+        cursor.execute(STORED_RESOURCE_STATS_SQL, {"dsr_id": dsr.id, "limit": limit})
+        for (
+            by,
+            dsp_id,
+            title,
+            artists,
+            isrc,
+            usages,
+            revenue,
+            count,
+        ) in cursor.fetchall():
+            if by == "totals":
+                totals = (usages, revenue, count)
+                continue
+            top_recordings[by].append(
+                [dsp_id, title, artists, isrc, str(usages), str(revenue)]
+            )
+    total_usages, total_revenue, distinct_recordings = totals
+    return {
+        "total_usages": total_usages,
+        "total_revenue": total_revenue,
+        "distinct_recordings": distinct_recordings,
+        "top_recordings_limit": limit,
+        "top_recordings_by_revenue": top_recordings["revenue"],
+        "top_recordings_by_usages": top_recordings["usages"],
+    }
+
+
+class DSRStatsAccumulator:
+    """
+    Compute DSR summary statistics on the fly, while resources are streamed
+    for ingestion. Distinct and top recordings are found from the stored
+    resources once they are all in place, rather than kept in memory.
+    """
+
+    def __init__(self) -> None:
+        self.row_count = 0
+        self.failed_row_count = 0
+        self.total_usages = 0
+        self.total_revenue = Decimal(0)
+
+    def add(self, resource: Optional[Resource]) -> None:
+        self.row_count += 1
+        if resource is None:
+            self.failed_row_count += 1
+            return
+        self.total_usages += resource.usages
+        self.total_revenue = REVENUE_CONTEXT.add(self.total_revenue, resource.revenue)
+
+    def track(
+        self, resources: Iterable[Optional[Resource]]
+    ) -> Iterator[Optional[Resource]]:
+        for resource in resources:
+            self.add(resource)
+            yield resource
+
+    def get_stats(self, dsr: DSR) -> DSRStats:
+        return DSRStats(
+            **{
+                **get_stored_stats(dsr),
+                "dsr": dsr,
+                "row_count": self.row_count,
+                "failed_row_count": self.failed_row_count,
+                # Those of the DSR rows, even where resources were combined.
+                "total_usages": self.total_usages,
+                "total_revenue": self.total_revenue,
+            }
+        )
+
+
+class StoredDSRStatsCounter:
+    """
+    Count rows while resources are loaded in bulk, without going through
+    Python objects, and compute the other statistics from the stored
+    resources once they are all in place.
+    """
+
+    def __init__(self) -> None:
+        self.row_count = 0
+        self.failed_row_count = 0
+
+    def add(self, resource: Optional[Resource]) -> None:
+        self.add_rows(count=1, failed_count=int(resource is None))
+
+    def add_rows(self, count: int, failed_count: int = 0) -> None:
+        self.row_count += count
+        self.failed_row_count += failed_count
+
+    def get_stats(self, dsr: DSR) -> DSRStats:
+        return DSRStats(
+            dsr=dsr,
+            row_count=self.row_count,
+            failed_row_count=self.failed_row_count,
+            **get_stored_stats(dsr),
+        )
@@ -1,6 +1,9 @@
 from datetime import date
 from decimal import Decimal
-from typing import Literal, Optional, TypedDict
+from typing import TYPE_CHECKING, Literal, Optional, TypedDict
+
+if TYPE_CHECKING:
+    from dsrs.models import DSR  # pragma: no cover
 
 
 class DSRFilenameData(TypedDict):
@@ -19,6 +22,23 @@ class ResourceKwargs(TypedDict):
     revenue: Decimal
 
 
+class ImportDSRKwargs(TypedDict):
+    dry_run: bool
+
+
+class CreateUploadKwargs(TypedDict):
+    filename: str
+    size: int
+
+
+class WriteUploadChunkKwargs(TypedDict):
+    offset: int
+
+
+class CompleteUploadKwargs(TypedDict):
+    sha256: Optional[str]
+
+
 class GetTopResourcesByPercentileKwargs(TypedDict):
     percentile: float
     territory: Optional[str]
@@ -26,4 +46,82 @@ class GetTopResourcesByPercentileKwargs(TypedDict):
     period_end: Optional[date]
 
 
-DSRStatus = Literal["failed", "ingested"]
+class DSRRowError(TypedDict):
+    line_number: int
+    line: str
+    error: str
+
+
+class DSRValidation(TypedDict):
+    status: "DSRStatus"
+    row_count: int
+    failed_row_count: int
+    projected_size: int
+    errors: list[DSRRowError]
+
+
+TopResourcesOrder = Literal["revenue", "usages"]
+
+
+class GetTopResourcesKwargs(TypedDict):
+    n: int
+    by: TopResourcesOrder
+    territory_code: Optional[str]
+    period_start: Optional[date]
+    period_end: Optional[date]
+
+
+class GetDSRsKwargs(TypedDict):
+    status: Optional[str]
+    territory_code: Optional[str]
+    period_start: Optional[date]
+    period_end: Optional[date]
+
+
+class GetDSRStatsSummaryKwargs(TypedDict):
+    territory_code: Optional[str]
+    period_start: Optional[date]
+    period_end: Optional[date]
+
+
+class DSRStatsSummary(TypedDict):
+    dsr_count: int
+    row_count: int
+    failed_row_count: int
+    total_usages: int
+    total_revenue: Decimal
+
+
+class GetRecordingRevenueKwargs(TypedDict):
+    isrc: Optional[str]
+    dsp_id: Optional[str]
+
+
+class SearchResourcesKwargs(TypedDict):
+    q: Optional[str]
+    artist: Optional[str]
+    limit: Optional[int]
+
+
+class DSRRevenue(TypedDict):
+    dsr_id: int
+    usages: int
+    revenue: Decimal
+
+
+class RecordingRevenue(TypedDict):
+    usages: int
+    revenue: Decimal
+    dsrs: list[DSRRevenue]
+
+
+class DSRAmendment(TypedDict):
+    dsr: "DSR"
+    inserted: int
+    updated: int
+    deleted: int
+
+
+DSRStatus = Literal[
+    "failed", "ingested", "ingesting", "pending", "deleting", "archived"
+]
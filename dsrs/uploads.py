@@ -0,0 +1,323 @@
+"""
+Resumable uploads of DSR files, see `services.write_upload_chunk`.
+
+Chunks are received in order, each starting anywhere up to the number of
+bytes received so far, so that clients can resend from the last offset they
+know of after a dropped connection. Chunks are appended to a file in local
+storage as they arrive, hashed, and gunzipped into another one if the upload
+is gzipped. Once the upload is complete, the decompressed file becomes the
+DSR file as is.
+
+Chunks are spooled to a temporary file before the upload is locked, so
+that the lock is only held while appending them from local disk, and are
+refused past `DSR_UPLOAD_MAX_CHUNK_SIZE`.
+
+Decompressor and hash states can't be saved, they're kept in the memory of
+the process which received the previous chunk. Other processes rebuild them
+from the stored file, as do all of them after a restart. States unused for
+`DSR_UPLOAD_EXPIRE_AFTER_HOURS` are dropped, as are uploads by
+`delete_stale`.
+"""
+
+import hashlib
+import itertools
+import os
+import tempfile
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import IO, Iterator, Optional
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, get_storage_class
+from django.db import transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+
+from digital.uploadhandler import GzipStreamDecompressor, UploadTooLarge
+from dsrs.models import DSRUpload
+
+PIECE_SIZE: int = 64 * 1024
+
+GZIP_MAGIC: bytes = b"\037\213"
+
+
+class UploadOffsetMismatch(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Chunk starts past the bytes received so far."
+    default_code = "upload_offset_mismatch"
+
+
+class ChunkTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Chunk exceeds the maximum chunk size."
+    default_code = "upload_chunk_too_large"
+
+
+@dataclass
+class UploadState:
+    received_size: int
+    sha256: "hashlib._Hash"
+    decompressor: Optional[GzipStreamDecompressor]
+    used_at: float = field(default_factory=time.monotonic)
+
+
+_states: dict[uuid.UUID, UploadState] = {}
+
+
+def get_directory() -> str:
+    storage = get_storage_class()()
+    if isinstance(storage, FileSystemStorage):
+        # Next to stored DSR files, so that completed uploads can be moved.
+        return storage.path(settings.DSR_UPLOAD_DIR)
+    return os.path.join(tempfile.gettempdir(), settings.DSR_UPLOAD_DIR)
+
+
+def get_received_path(directory: str, upload: DSRUpload) -> str:
+    suffix = ".gz" if upload.compressed else ".tsv"
+    return os.path.join(directory, f"{upload.id}{suffix}")
+
+
+def get_decompressed_path(directory: str, upload: DSRUpload) -> str:
+    return os.path.join(directory, f"{upload.id}.tsv")
+
+
+def _iter_pieces(fp: IO[bytes], size: Optional[int] = None) -> Iterator[bytes]:
+    while size is None or size > 0:
+        piece = fp.read(PIECE_SIZE if size is None else min(PIECE_SIZE, size))
+        if not piece:
+            return
+        if size is not None:
+            size -= len(piece)
+        yield piece
+
+
+def _rebuild_state(directory: str, upload: DSRUpload) -> UploadState:
+    state = UploadState(
+        received_size=0,
+        sha256=hashlib.sha256(),
+        decompressor=GzipStreamDecompressor() if upload.compressed else None,
+    )
+    if not upload.received_size:
+        return state
+    with open(get_received_path(directory, upload), mode="rb") as fp:
+        for piece in _iter_pieces(fp, upload.received_size):
+            state.received_size += len(piece)
+            state.sha256.update(piece)
+            if state.decompressor:
+                # Already stored, only the decompressor state is needed.
+                state.decompressor.decompress(piece)
+    if state.received_size != upload.received_size:
+        raise OSError(f"Upload {upload.id} is missing received bytes")
+    return state
+
+
+def _expire_states() -> None:
+    expired_at = time.monotonic() - settings.DSR_UPLOAD_EXPIRE_AFTER_HOURS * 3600
+    for upload_id, state in list(_states.items()):
+        if state.used_at < expired_at:
+            _states.pop(upload_id, None)
+
+
+def _get_state(directory: str, upload: DSRUpload) -> UploadState:
+    _expire_states()
+    state = _states.get(upload.id)
+    if (
+        state is None
+        or state.received_size != upload.received_size
+        or state.sha256.hexdigest() != upload.sha256
+    ):
+        state = _states[upload.id] = _rebuild_state(directory, upload)
+    state.used_at = time.monotonic()
+    # Drop whatever an interrupted chunk left past the received bytes.
+    for path, size in (
+        (get_received_path(directory, upload), upload.received_size),
+        (get_decompressed_path(directory, upload), upload.decompressed_size),
+    ):
+        if os.path.exists(path):
+            os.truncate(path, size)
+    return state
+
+
+def _skip(fp: IO[bytes], size: int) -> None:
+    for _ in _iter_pieces(fp, size):
+        pass
+
+
+def _detect_compression(upload: DSRUpload, pieces: Iterator[bytes]) -> bytes:
+    """
+    Read enough of the first chunk to tell whether the upload is gzipped.
+    Return what was read.
+    """
+    head = b""
+    for piece in pieces:
+        head += piece
+        if len(head) >= len(GZIP_MAGIC):
+            break
+    if head:
+        if len(head) < min(len(GZIP_MAGIC), upload.size):
+            raise ParseError("First chunk is too short.")
+        upload.compressed = head.startswith(GZIP_MAGIC)
+        # Stored as is.
+        if (
+            not upload.compressed
+            and upload.size > settings.DSR_UPLOAD_MAX_DECOMPRESSED_SIZE
+        ):
+            raise UploadTooLarge()
+    return head
+
+
+@contextmanager
+def spool_chunk(directory: str, stream: IO[bytes]) -> Iterator[IO[bytes]]:
+    """
+    Receive a chunk into a temporary file of the upload directory, raising
+    `ChunkTooLarge` as soon as it exceeds `DSR_UPLOAD_MAX_CHUNK_SIZE`.
+    """
+    max_size = settings.DSR_UPLOAD_MAX_CHUNK_SIZE
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.TemporaryFile(dir=directory) as fp:
+        for piece in _iter_pieces(stream, max_size + 1):
+            fp.write(piece)
+        if fp.tell() > max_size:
+            raise ChunkTooLarge()
+        fp.seek(0)
+        yield fp
+
+
+def write_chunk(
+    directory: str, upload: DSRUpload, offset: int, stream: IO[bytes]
+) -> None:
+    """
+    Append a chunk starting at `offset` to the upload, skipping the bytes
+    which were already received, and update the upload's sizes and digest.
+    """
+    if not 0 <= offset <= upload.received_size:
+        raise UploadOffsetMismatch(
+            f"Chunk must start at or before offset {upload.received_size}."
+        )
+    os.makedirs(directory, exist_ok=True)
+    _skip(stream, upload.received_size - offset)
+    pieces = _iter_pieces(stream)
+    if upload.compressed is None:
+        head = _detect_compression(upload, pieces)
+        if not head:
+            return
+        pieces = itertools.chain([head], pieces)
+    state = _get_state(directory, upload)
+    try:
+        with open(get_received_path(directory, upload), mode="ab") as fp, open(
+            get_decompressed_path(directory, upload), mode="ab"
+        ) as decompressed_fp:
+            for piece in pieces:
+                if state.received_size + len(piece) > upload.size:
+                    raise ParseError("Chunk exceeds the upload size.")
+                fp.write(piece)
+                state.received_size += len(piece)
+                state.sha256.update(piece)
+                if state.decompressor:
+                    try:
+                        decompressed_fp.write(state.decompressor.decompress(piece))
+                    except zlib.error as exc:
+                        raise ParseError(f"Gzip decompression error: {exc}")
+    except Exception:
+        # Out of step with the stored upload from now on.
+        del _states[upload.id]
+        raise
+    upload.received_size = state.received_size
+    upload.sha256 = state.sha256.hexdigest()
+    upload.decompressed_size = (
+        state.decompressor.decompressed_size
+        if state.decompressor
+        else state.received_size
+    )
+
+
+def finish(directory: str, upload: DSRUpload) -> str:
+    """
+    Check that a complete upload is a whole gzip file, if gzipped, and drop
+    the compressed file. Return the path of the decompressed file.
+    """
+    state = _get_state(directory, upload)
+    if state.decompressor:
+        try:
+            state.decompressor.finish()
+        except EOFError as exc:
+            raise ParseError(f"Gzip decompression error: {exc}")
+    discard(directory, upload, keep_decompressed=True)
+    path = get_decompressed_path(directory, upload)
+    # Empty plain uploads have no file yet.
+    open(path, mode="ab").close()
+    return path
+
+
+def discard(directory: str, upload: DSRUpload, keep_decompressed: bool = False) -> None:
+    """
+    Forget the upload's state and delete its files, all of them or only
+    the compressed one.
+    """
+    _states.pop(upload.id, None)
+    paths = {
+        get_received_path(directory, upload),
+        get_decompressed_path(directory, upload),
+    }
+    if keep_decompressed:
+        paths.discard(get_decompressed_path(directory, upload))
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@contextmanager
+def lock(upload_id: uuid.UUID, **kwargs) -> Iterator[Optional[DSRUpload]]:
+    """
+    Lock the upload for the duration of a transaction, see
+    `QuerySet.select_for_update` for `kwargs`. Yield None if it's gone,
+    or locked when skipping locked rows.
+    """
+    with transaction.atomic():
+        yield DSRUpload.objects.select_for_update(**kwargs).filter(pk=upload_id).first()
+
+
+def append_chunk(
+    upload: DSRUpload, offset: int, stream: IO[bytes]
+) -> Optional[DSRUpload]:
+    """
+    Receive a chunk, then lock the upload to write it, see `write_chunk`,
+    so that the lock isn't held for as long as the client takes to send it.
+    Return None if the upload is gone.
+    """
+    directory = get_directory()
+    with spool_chunk(directory, stream) as chunk, lock(upload.pk) as upload:
+        if not upload:
+            return None
+        write_chunk(directory, upload, offset, chunk)
+        upload.save()
+    return upload
+
+
+def delete(upload: DSRUpload) -> None:
+    with lock(upload.pk) as upload:
+        if upload:
+            discard(get_directory(), upload)
+            upload.delete()
+
+
+def delete_stale(updated_before: datetime) -> int:
+    """
+    Delete uploads which haven't received a chunk since `updated_before`,
+    skipping those being written to. Return how many were deleted.
+    """
+    count = 0
+    for upload_id in DSRUpload.objects.filter(
+        updated_at__lt=updated_before
+    ).values_list("id", flat=True):
+        with lock(upload_id, skip_locked=True) as upload:
+            # Written to since, or deleted.
+            if upload and upload.updated_at < updated_before:
+                discard(get_directory(), upload)
+                upload.delete()
+                count += 1
+    return count
@@ -0,0 +1,227 @@
+"""
+Validation of DSR files without ingesting them, see `services.validate_dsr_file`.
+
+The file is memory-mapped and split into ranges of whole lines, which are
+validated in parallel across processes with the same checks as ingestion,
+see `readers.validate_line`. Nothing is written to the database.
+
+Files containing quotes are left to the `csv` module, in process.
+"""
+
+import csv
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import TextIOWrapper
+from itertools import repeat
+from typing import NamedTuple
+
+import django
+from rest_framework.exceptions import ValidationError
+
+from dsrs import types
+from dsrs.batching import estimate_resource_size
+from dsrs.mappers import map_dsr_row_to_resource_fields
+from dsrs.models import Resource
+from dsrs.readers import FIELDNAMES, check_row_encoding, validate_line
+
+
+class RangeValidation(NamedTuple):
+    # Number of lines in the range, valid and invalid rows in it.
+    line_count: int
+    row_count: int
+    failed_row_count: int
+    # Estimated size of the valid rows once ingested, in bytes.
+    projected_size: int
+    # First invalid rows, numbered from 0 within the range.
+    errors: list[types.DSRRowError]
+
+
+def _format_errors(exc: ValidationError) -> str:
+    if not isinstance(exc.detail, dict):
+        return " ".join(map(str, exc.detail))
+    return "; ".join(
+        f"{name}: {' '.join(map(str, messages))}"
+        for name, messages in exc.detail.items()
+    )
+
+
+def validate_range(
+    path: str, start: int, end: int, skip_rows: int, sample_size: int
+) -> RangeValidation:
+    """
+    Validate rows of lines from position `start` to `end` (excluded),
+    translating newlines the way `readers.iter_lines` does.
+    """
+    line_count = row_count = failed_row_count = projected_size = 0
+    errors: list[types.DSRRowError] = []
+    with open(path, mode="rb") as fp, mmap.mmap(
+        fp.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mm:
+        mm.seek(start)
+        while mm.tell() < end and (line := mm.readline()):
+            line = line.rstrip(b"\n")
+            if line.endswith(b"\r"):
+                line = line[:-1]
+            for row in filter(None, line.split(b"\r")):
+                if skip_rows:
+                    skip_rows -= 1
+                    continue
+                row_count += 1
+                try:
+                    resource = validate_line(row)
+                except ValidationError as exc:
+                    failed_row_count += 1
+                    if len(errors) < sample_size:
+                        errors.append(
+                            {
+                                "line_number": line_count,
+                                "line": row.decode(errors="replace"),
+                                "error": _format_errors(exc),
+                            }
+                        )
+                else:
+                    projected_size += estimate_resource_size(resource)
+            line_count += 1
+    return RangeValidation(
+        line_count, row_count, failed_row_count, projected_size, errors
+    )
+
+
+def _get_header_end(mm: mmap.mmap) -> int:
+    """
+    Get the position after the first line holding a row, the header.
+    """
+    mm.seek(0)
+    while line := mm.readline():
+        if line.strip(b"\r\n"):
+            break
+    return mm.tell()
+
+
+def _split_ranges(mm: mmap.mmap, start: int, count: int) -> list[tuple[int, int]]:
+    """
+    Split the file from `start` into up to `count` ranges of whole lines.
+    """
+    size = len(mm)
+    step = max((size - start) // count, 1)
+    bounds = [start]
+    while (position := bounds[-1] + step) < size:
+        end = mm.find(b"\n", position)
+        if end == -1:
+            break
+        bounds.append(end + 1)
+    if bounds[-1] < size:
+        bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _validate_mmap(
+    path: str, mm: mmap.mmap, workers: int, min_range_size: int, sample_size: int
+) -> list[RangeValidation]:
+    header_end = _get_header_end(mm)
+    count = max(min(workers, (len(mm) - header_end) // min_range_size), 1)
+    ranges = [(0, header_end)] + _split_ranges(mm, header_end, count)
+    starts, ends = zip(*ranges)
+    skip_rows = [1] + [0] * (len(ranges) - 1)
+    if len(ranges) <= 2:
+        return list(
+            map(
+                validate_range,
+                repeat(path),
+                starts,
+                ends,
+                skip_rows,
+                repeat(sample_size),
+            )
+        )
+    # Workers need Django set up to validate rows against the models.
+    with ProcessPoolExecutor(workers, initializer=django.setup) as executor:
+        return list(
+            executor.map(
+                validate_range,
+                repeat(path),
+                starts,
+                ends,
+                skip_rows,
+                repeat(sample_size),
+            )
+        )
+
+
+def _validate_csv(path: str, sample_size: int) -> RangeValidation:
+    """
+    Same as `validate_range`, for a whole file read by `csv.DictReader`
+    the way `services.iter_resources` does.
+    """
+    row_count = failed_row_count = projected_size = 0
+    errors: list[types.DSRRowError] = []
+    with TextIOWrapper(open(path, mode="rb"), errors="surrogateescape") as fp:
+        reader = csv.DictReader(fp, fieldnames=list(FIELDNAMES), dialect="excel-tab")
+        # Skip header row
+        next(reader, None)
+        for row in reader:
+            row_count += 1
+            line = "\t".join(row[name] or "" for name in FIELDNAMES)
+            try:
+                check_row_encoding(row)
+                resource = Resource(**map_dsr_row_to_resource_fields(dsr_row=row))
+            except ValidationError as exc:
+                failed_row_count += 1
+                if len(errors) < sample_size:
+                    errors.append(
+                        {
+                            # Numbered from 0, as by `validate_range`.
+                            "line_number": reader.line_num - 1,
+                            "line": line.encode(errors="surrogateescape").decode(
+                                errors="replace"
+                            ),
+                            "error": _format_errors(exc),
+                        }
+                    )
+            else:
+                projected_size += estimate_resource_size(resource)
+    return RangeValidation(
+        reader.line_num, row_count, failed_row_count, projected_size, errors
+    )
+
+
+def validate_file(
+    path: str, workers: int, min_range_size: int, sample_size: int
+) -> types.DSRValidation:
+    """
+    Validate the rows of a DSR file, across `workers` processes for files
+    of at least `min_range_size` bytes per worker.
+    """
+    results: list[RangeValidation] = []
+    if os.path.getsize(path):
+        with open(path, mode="rb") as fp, mmap.mmap(
+            fp.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            if mm.find(b'"') == -1:
+                results = _validate_mmap(
+                    path,
+                    mm,
+                    workers=workers,
+                    min_range_size=min_range_size,
+                    sample_size=sample_size,
+                )
+            else:
+                results = [_validate_csv(path, sample_size=sample_size)]
+
+    errors: list[types.DSRRowError] = []
+    first_line = 1
+    for result in results:
+        errors.extend(
+            {**error, "line_number": first_line + error["line_number"]}
+            for error in result.errors
+        )
+        first_line += result.line_count
+    failed_row_count = sum(result.failed_row_count for result in results)
+    return {
+        "status": "failed" if failed_row_count else "ingested",
+        "row_count": sum(result.row_count for result in results),
+        "failed_row_count": failed_row_count,
+        "projected_size": sum(result.projected_size for result in results),
+        "errors": errors[:sample_size],
+    }
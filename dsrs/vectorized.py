@@ -0,0 +1,268 @@
+"""
+Vectorized ingestion of memory-mapped DSR files, see `services.ingest_dsr`.
+
+Lines are read in batches and split into column offsets with NumPy. Field
+counts, text lengths and the `usages` and `revenue` formats are checked for
+the whole batch at once, producing a rejection mask. Accepted lines are
+loaded with COPY straight from the file bytes, without building a Python
+object per row. Rejected lines, which may still be valid in a form the
+vectorized checks are too strict for, go through `readers.read_line`.
+
+Requires NumPy.
+"""
+
+import io
+import mmap
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from django.core.exceptions import ImproperlyConfigured
+
+from dsrs import sharding
+from dsrs.models import DSR, Resource
+from dsrs.readers import FIELDNAMES, TEXT_FIELD_MAX_LENGTHS, USAGES_MAX, iter_lines
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+FIELD_COUNT: int = len(FIELDNAMES)
+USAGES_INDEX: int = FIELDNAMES.index("usages")
+REVENUE_INDEX: int = FIELDNAMES.index("revenue")
+USAGES_MAX_DIGITS: int = len(str(USAGES_MAX))
+REVENUE_MAX_DECIMAL_PLACES: int = Resource._meta.get_field("revenue").decimal_places
+REVENUE_MAX_WHOLE_DIGITS: int = (
+    Resource._meta.get_field("revenue").max_digits - REVENUE_MAX_DECIMAL_PLACES
+)
+
+# Revenue digits, plus a decimal point.
+REVENUE_MAX_LENGTH: int = REVENUE_MAX_WHOLE_DIGITS + REVENUE_MAX_DECIMAL_PLACES + 1
+
+TAB, LF, CR = ord("\t"), ord("\n"), ord("\r")
+
+# Byte classes, as bit flags.
+DIGIT, DOT, CONTINUATION, COPY_SPECIAL, EDGE_UNSAFE = 1, 2, 4, 8, 16
+
+
+def _get_byte_classes():
+    classes = np.zeros(256, dtype=np.uint8)
+    classes[np.frombuffer(b"0123456789", dtype=np.uint8)] |= DIGIT
+    classes[ord(".")] |= DOT
+    # UTF-8 continuation bytes, which don't count towards lengths in characters.
+    classes[0x80:0xC0] |= CONTINUATION
+    # Bytes COPY would interpret.
+    classes[np.frombuffer(b"\\\x00\r", dtype=np.uint8)] |= COPY_SPECIAL
+    # Bytes `str.strip` may remove at field edges, erring on the safe side
+    # with anything that isn't ASCII.
+    classes[
+        np.frombuffer(b"\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f ", dtype=np.uint8)
+    ] |= EDGE_UNSAFE
+    classes[0x80:] |= EDGE_UNSAFE
+    return classes
+
+
+BYTE_CLASSES = _get_byte_classes() if np is not None else None
+
+COPY_RESOURCES_SQL: str = """
+    COPY dsrs_resource (dsp_id, title, artists, isrc, usages, revenue, dsr_id)
+    FROM STDIN
+"""
+
+
+@dataclass
+class ParsedBatch:
+    # Accepted lines in COPY text format.
+    copy_data: bytes = b""
+    accepted_count: int = 0
+    # Rejected lines, without line feeds.
+    rejected_lines: list[bytes] = field(default_factory=list)
+
+
+def check_numpy() -> None:
+    if np is None:
+        raise ImproperlyConfigured(
+            "NumPy is required by the 'numpy' DSR ingestion engine."
+        )
+
+
+def iter_line_batches(
+    mm: mmap.mmap, sizes: Iterator[int], max_bytes: int
+) -> Iterator[bytes]:
+    """
+    Skip the header row, then read batches of whole lines, each of at most
+    the next number of lines from `sizes` and at most `max_bytes` bytes, unless
+    a single line is longer. Every line in a batch ends with a line feed.
+    """
+    # Skip header row
+    next(iter_lines(mm), None)
+    size = len(mm)
+    while (start := mm.tell()) < size:
+        line_count = next(sizes)
+        chunk = mm[start : start + max_bytes]
+        ends = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == LF)
+        if len(ends) >= line_count:
+            end = int(ends[line_count - 1]) + 1
+        elif start + len(chunk) == size:
+            end = len(chunk)
+        elif len(ends):
+            end = int(ends[-1]) + 1
+        else:
+            # A single line longer than `max_bytes`.
+            chunk = mm.readline()
+            end = len(chunk)
+        mm.seek(start + end)
+        batch = chunk[:end]
+        yield batch if batch.endswith(b"\n") else batch + b"\n"
+
+
+def _count_in_ranges(positions, starts, ends):
+    # Number of positions within each range, for sparse positions.
+    return np.searchsorted(positions, ends) - np.searchsorted(positions, starts)
+
+
+def _get_windows(values, starts, ends, width: int):
+    """
+    Get values of fields right-aligned in a (fields, width) matrix,
+    with zeros on the left of fields shorter than the width.
+    """
+    positions = ends[:, None] - width + np.arange(width)
+    in_field = positions >= starts[:, None]
+    return np.where(in_field, values[np.where(in_field, positions, 0)], 0), in_field
+
+
+def _validate_text_fields(classes, starts, ends):
+    lengths = ends - starts
+    continuations = np.flatnonzero(classes & CONTINUATION)
+    valid = np.ones(len(starts), dtype=bool)
+    for index, max_length in TEXT_FIELD_MAX_LENGTHS:
+        field_starts, field_ends = starts[:, index], ends[:, index]
+        non_empty = lengths[:, index] > 0
+        chars = lengths[:, index] - _count_in_ranges(
+            continuations, field_starts, field_ends
+        )
+        valid &= non_empty & (chars <= max_length)
+        first = classes[np.where(non_empty, field_starts, 0)]
+        last = classes[np.where(non_empty, field_ends - 1, 0)]
+        valid &= ((first | last) & EDGE_UNSAFE) == 0
+    return valid
+
+
+def _validate_usages(buf, starts, ends):
+    # Plain digits within the integer column range, empty defaults to 0.
+    lengths = ends - starts
+    valid = lengths <= USAGES_MAX_DIGITS
+    windows, in_field = _get_windows(buf, starts, ends, width=USAGES_MAX_DIGITS)
+    digits = (windows >= ord("0")) & (windows <= ord("9"))
+    valid &= (digits | ~in_field).all(axis=1)
+    values = np.where(digits, windows.astype(np.int64) - ord("0"), 0)
+    usages = values @ 10 ** np.arange(USAGES_MAX_DIGITS - 1, -1, -1, dtype=np.int64)
+    return valid & (usages <= USAGES_MAX)
+
+
+def _validate_revenue(classes, starts, ends):
+    # Plain digits with an optional decimal point, within precision,
+    # empty defaults to 0. Leading zeros count towards whole digits, erring
+    # on the safe side.
+    lengths = ends - starts
+    valid = lengths <= REVENUE_MAX_LENGTH
+    windows, in_field = _get_windows(classes, starts, ends, width=REVENUE_MAX_LENGTH)
+    valid &= ((windows & (DIGIT | DOT)) > 0).sum(axis=1) == lengths
+    dots = (windows & DOT) > 0
+    dot_counts = dots.sum(axis=1)
+    valid &= (dot_counts <= 1) & ((lengths == 0) | (lengths > dot_counts))
+    # Characters after the decimal point, if any.
+    decimal_places = np.where(
+        dot_counts == 1, REVENUE_MAX_LENGTH - 1 - dots.argmax(axis=1), 0
+    )
+    valid &= decimal_places <= REVENUE_MAX_DECIMAL_PLACES
+    valid &= lengths - dot_counts - decimal_places <= REVENUE_MAX_WHOLE_DIGITS
+    return valid
+
+
+def _get_copy_data(buf, line_starts, line_ends, empty_fields, dsr: DSR) -> bytes:
+    """
+    Keep the content of accepted lines, fill empty numeric fields with zeros
+    and append the DSR id to each line.
+    """
+    # Dropped bytes are the gaps between accepted lines: line terminators
+    # and rejected lines, which are few. Get their positions without
+    # going through the whole buffer.
+    gap_starts = np.concatenate(([0], line_ends))
+    gap_lengths = np.concatenate((line_starts, [len(buf)])) - gap_starts
+    gap_offsets = np.concatenate(([0], np.cumsum(gap_lengths)[:-1]))
+    dropped = np.repeat(gap_starts - gap_offsets, gap_lengths) + np.arange(
+        gap_lengths.sum()
+    )
+    kept = np.ones(len(buf), dtype=bool)
+    kept[dropped] = False
+
+    suffix = np.frombuffer(f"\t{dsr.id}\n".encode(), dtype=np.uint8)
+    # Positions in the kept content. Zeros go first, so that they end up
+    # before the suffix at the same position.
+    positions = np.concatenate((empty_fields, np.repeat(line_ends, len(suffix))))
+    positions -= np.searchsorted(dropped, positions)
+    values = np.concatenate(
+        (
+            np.full(len(empty_fields), ord("0"), dtype=np.uint8),
+            np.tile(suffix, len(line_starts)),
+        )
+    )
+    return np.insert(buf[kept], positions, values).tobytes()
+
+
+def parse_batch(batch: bytes, dsr: DSR) -> ParsedBatch:
+    """
+    Validate a batch of lines and convert the accepted ones for COPY.
+    """
+    buf = np.frombuffer(batch, dtype=np.uint8)
+    classes = BYTE_CLASSES[buf]
+    line_ends = np.flatnonzero(buf == LF)
+    line_starts = np.concatenate(([0], line_ends[:-1] + 1))
+    has_cr = (line_ends > line_starts) & (buf[line_ends - 1] == CR)
+    content_ends = line_ends - has_cr
+    # Empty lines are skipped altogether, like `csv.DictReader` does.
+    non_empty = content_ends > line_starts
+    line_starts = line_starts[non_empty]
+    line_ends = line_ends[non_empty]
+    content_ends = content_ends[non_empty]
+
+    specials = np.flatnonzero(classes & COPY_SPECIAL)
+    accepted = _count_in_ranges(specials, line_starts, content_ends) == 0
+    tabs = np.flatnonzero(buf == TAB)
+    first_tabs = np.searchsorted(tabs, line_starts)
+    accepted &= np.searchsorted(tabs, content_ends) - first_tabs == FIELD_COUNT - 1
+
+    # Field offsets of lines with the right number of fields,
+    # shape (lines, fields).
+    shaped = np.flatnonzero(accepted)
+    field_tabs = tabs[first_tabs[shaped, None] + np.arange(FIELD_COUNT - 1)]
+    starts = np.column_stack((line_starts[shaped], field_tabs + 1))
+    ends = np.column_stack((field_tabs, content_ends[shaped]))
+
+    valid = _validate_text_fields(classes, starts, ends)
+    valid &= _validate_usages(buf, starts[:, USAGES_INDEX], ends[:, USAGES_INDEX])
+    valid &= _validate_revenue(
+        classes, starts[:, REVENUE_INDEX], ends[:, REVENUE_INDEX]
+    )
+    accepted[shaped] = valid
+
+    numeric_starts = starts[valid][:, [USAGES_INDEX, REVENUE_INDEX]]
+    numeric_ends = ends[valid][:, [USAGES_INDEX, REVENUE_INDEX]]
+    empty_fields = np.sort(numeric_starts[numeric_starts == numeric_ends])
+
+    return ParsedBatch(
+        copy_data=_get_copy_data(
+            buf, line_starts[accepted], content_ends[accepted], empty_fields, dsr=dsr
+        ),
+        accepted_count=int(accepted.sum()),
+        rejected_lines=[
+            batch[start:end]
+            for start, end in zip(line_starts[~accepted], line_ends[~accepted])
+        ],
+    )
+
+
+def copy_resources(copy_data: bytes) -> None:
+    with sharding.get_connection().cursor() as cursor:
+        cursor.copy_expert(COPY_RESOURCES_SQL, io.BytesIO(copy_data))
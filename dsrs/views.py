@@ -1,12 +1,14 @@
+import io
 from typing import TYPE_CHECKING
 
-from rest_framework import generics, mixins, viewsets
+from rest_framework import generics, mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import ParseError
+from rest_framework.exceptions import NotFound, ParseError
 from rest_framework.response import Response
 
 from digital.parsers import GzipFileUploadParser
 from dsrs import mappers, models, serializers, services
+from dsrs.pagination import DSRPagination
 
 if TYPE_CHECKING:
     from rest_framework.request import Request  # pragma: no cover
@@ -17,20 +19,159 @@ class DSRViewSet(
 ):
     queryset = models.DSR.objects.all()
     serializer_class = serializers.DSRSerializer
+    pagination_class = DSRPagination
+
+    def get_queryset(self):
+        if self.action == "list":
+            kwargs = mappers.map_view_data_to_dsrs(
+                query_params=self.request.query_params
+            )
+            return services.get_dsrs(**kwargs)
+        return services.get_dsrs()
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="stats",
+        pagination_class=None,
+    )
+    def stats(self, request: "Request") -> Response:
+        kwargs = mappers.map_view_data_to_dsr_stats_summary(
+            query_params=request.query_params
+        )
+        summary = services.get_dsr_stats_summary(**kwargs)
+        serializer = serializers.DSRStatsSummarySerializer(summary)
+        return Response(serializer.data)
 
     @action(
         methods=["POST"],
         detail=False,
         url_path="import",
+        url_name="import",
         parser_classes=[GzipFileUploadParser],
     )
     def import_(self, request: "Request") -> Response:
+        kwargs = mappers.map_view_data_to_import(query_params=request.query_params)
         if dsr_file := request.data.get("file"):
-            if instance := services.import_dsr(dsr_file):
+            if kwargs["dry_run"]:
+                try:
+                    result = services.validate_dsr(dsr_file)
+                finally:
+                    dsr_file.close()
+                if result:
+                    serializer = serializers.DSRValidationSerializer(result)
+                    return Response(serializer.data)
+                raise ParseError()
+            try:
+                instance = services.import_dsr(dsr_file)
+            finally:
+                dsr_file.close()
+            if instance:
                 serializer = self.get_serializer(instance)
                 return Response(serializer.data)
         raise ParseError()
 
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="amend",
+        url_name="amend",
+        parser_classes=[GzipFileUploadParser],
+    )
+    def amend(self, request: "Request", pk: str) -> Response:
+        dsr = self.get_object()
+        if dsr_file := request.data.get("file"):
+            try:
+                amendment = services.amend_dsr(dsr, dsr_file)
+            finally:
+                dsr_file.close()
+            if amendment:
+                serializer = serializers.DSRAmendmentSerializer(amendment)
+                return Response(serializer.data)
+        raise ParseError()
+
+
+class DSRUploadViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable uploads of DSR files: create an upload, PUT chunks of the file
+    as the request body with their `offset`, check the received bytes,
+    and complete the upload to queue the DSR for ingestion.
+    """
+
+    queryset = models.DSRUpload.objects.all()
+    serializer_class = serializers.DSRUploadSerializer
+
+    def create(self, request: "Request") -> Response:
+        kwargs = mappers.map_view_data_to_upload(data=request.data)
+        upload = services.create_upload(**kwargs)
+        if not upload:
+            raise ParseError()
+        serializer = self.get_serializer(upload)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def update(self, request: "Request", pk: str) -> Response:
+        kwargs = mappers.map_view_data_to_upload_chunk(
+            query_params=request.query_params
+        )
+        # Empty bodies come with no stream.
+        stream = request.stream or io.BytesIO()
+        upload = services.write_upload_chunk(self.get_object(), stream=stream, **kwargs)
+        if not upload:
+            raise NotFound()
+        serializer = self.get_serializer(upload)
+        return Response(serializer.data)
+
+    def destroy(self, request: "Request", pk: str) -> Response:
+        services.abort_upload(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="complete",
+        url_name="complete",
+    )
+    def complete(self, request: "Request", pk: str) -> Response:
+        kwargs = mappers.map_view_data_to_upload_completion(data=request.data)
+        dsr = services.complete_upload(self.get_object(), **kwargs)
+        if not dsr:
+            raise ParseError()
+        serializer = serializers.DSRSerializer(dsr)
+        return Response(serializer.data)
+
+
+class RecordingRevenueByISRCView(generics.GenericAPIView):
+    serializer_class = serializers.RecordingRevenueSerializer
+
+    def get(self, request: "Request") -> Response:
+        kwargs = mappers.map_view_data_to_recording_revenue(
+            query_params=request.query_params
+        )
+        revenue = services.get_recording_revenue(**kwargs)
+        serializer = self.get_serializer(revenue)
+        return Response(serializer.data)
+
+
+class RecordingRevenueByDSPIdView(generics.GenericAPIView):
+    serializer_class = serializers.RecordingRevenueSerializer
+
+    def get(self, request: "Request", dsp_id: str) -> Response:
+        revenue = services.get_recording_revenue(dsp_id=dsp_id)
+        if not revenue["dsrs"]:
+            raise NotFound()
+        serializer = self.get_serializer(revenue)
+        return Response(serializer.data)
+
+
+class ResourceSearchView(generics.ListAPIView):
+    serializer_class = serializers.ResourceSerializer
+
+    def get_queryset(self):
+        kwargs = mappers.map_view_data_to_search_resources(
+            query_params=self.request.query_params
+        )
+        return services.search_resources(**kwargs)
+
 
 class ResourcePercentileView(generics.ListAPIView):
     serializer_class = serializers.ResourcePercentileSerializer
@@ -40,3 +181,25 @@ class ResourcePercentileView(generics.ListAPIView):
             query_params=self.request.query_params, kwargs=self.kwargs
         )
         return services.get_top_resources_by_percentile(**kwargs)
+
+
+class ResourceMonthlyPercentileView(generics.ListAPIView):
+    serializer_class = serializers.ResourcePercentileSerializer
+
+    def get_queryset(self):
+        kwargs = mappers.map_view_data_to_top_resources(
+            query_params=self.request.query_params, kwargs=self.kwargs
+        )
+        return services.get_top_resources_by_percentile_from_monthly_aggregates(
+            **kwargs
+        )
+
+
+class ResourceTopView(generics.ListAPIView):
+    serializer_class = serializers.ResourcePercentileSerializer
+
+    def get_queryset(self):
+        kwargs = mappers.map_view_data_to_top_n_resources(
+            query_params=self.request.query_params, kwargs=self.kwargs
+        )
+        return services.get_top_resources(**kwargs)
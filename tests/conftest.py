@@ -1,6 +1,7 @@
 import pytest
 from pytest_factoryboy import register
 
+from dsrs.models import DSR, DSRStats
 from tests import factories
 
 
@@ -12,6 +13,13 @@ def media_root(settings, tmp_path):
     return path
 
 
+@pytest.fixture(autouse=True)
+def slow_query_log_path(settings, tmp_path):
+    path = tmp_path / "slow_queries.jsonl"
+    settings.SLOW_QUERY_LOG_PATH = path
+    return path
+
+
 @pytest.fixture
 def dsr_files(settings):
     data_dir = settings.BASE_DIR / "data"
@@ -31,6 +39,49 @@ def dsr_files(settings):
     }
 
 
+@pytest.fixture
+def import_dsr(client):
+    def _import(
+        content, filename="Spotify_SpotifyDuo_SGAE_NO_NOK_20200101-20200531.tsv"
+    ):
+        response = client.post(
+            "/dsrs/import/",
+            content,
+            content_type="*/*",
+            HTTP_CONTENT_DISPOSITION=f"attachment; filename={filename}",
+        )
+        return DSR.objects.get(id=response.json()["id"])
+
+    return _import
+
+
+@pytest.fixture
+def get_rows():
+    def _get_rows(dsr):
+        return sorted(
+            dsr.resources.values_list(
+                "dsp_id", "title", "artists", "isrc", "usages", "revenue"
+            )
+        )
+
+    return _get_rows
+
+
+@pytest.fixture
+def get_stats():
+    def _get_stats(dsr):
+        stats = DSRStats.objects.get(dsr=dsr)
+        return (
+            stats.row_count,
+            stats.failed_row_count,
+            stats.total_usages,
+            stats.total_revenue,
+            stats.distinct_recordings,
+        )
+
+    return _get_stats
+
+
 register(factories.TerritoryFactory, "territory")
 register(factories.CurrencyFactory, "currency")
 register(factories.DSRFactory, "dsr")
@@ -1,15 +1,27 @@
 from datetime import date
+from string import ascii_uppercase
 
 import factory
 from factory import fuzzy
 
 
+def _code(n: int, length: int) -> str:
+    code = ""
+    for _ in range(length):
+        n, i = divmod(n, len(ascii_uppercase))
+        code = ascii_uppercase[i] + code
+    return code
+
+
 class CurrencyFactory(factory.django.DjangoModelFactory):
+    code = factory.Sequence(lambda n: _code(n, 3))
+
     class Meta:
         model = "dsrs.Currency"
 
 
 class TerritoryFactory(factory.django.DjangoModelFactory):
+    code_2 = factory.Sequence(lambda n: _code(n, 2))
     local_currency = factory.SubFactory(CurrencyFactory)
 
     class Meta:
@@ -0,0 +1,170 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from dsrs.admin import ResourceAdmin
+from dsrs.models import DSR, Resource
+
+pytestmark = pytest.mark.django_db
+
+CHANGELIST_URL = "/admin/dsrs/resource/"
+
+
+@pytest.fixture
+def resources(dsr_factory):
+    dsrs = dsr_factory.create_batch(2)
+    return Resource.objects.bulk_create(
+        Resource(
+            dsr=dsrs[i % 2],
+            dsp_id=f"dsp{i}",
+            title=f"title{i}",
+            artists=f"artists{i}",
+            isrc=f"ISRC{i:08d}",
+            usages=i,
+            revenue=i,
+        )
+        for i in range(5)
+    )
+
+
+def _get_resource_ids(content: str) -> list:
+    return [
+        int(pk) for pk in re.findall(r'name="_selected_action" value="(\d+)"', content)
+    ]
+
+
+def test_resource_changelist__estimated_count__no_count_query(
+    admin_client, resources, settings
+):
+    # arrange
+    settings.ADMIN_EXACT_COUNT_THRESHOLD = 0
+
+    # act
+    with CaptureQueriesContext(connection) as context:
+        response = admin_client.get(CHANGELIST_URL)
+
+    # assert
+    assert response.status_code == 200
+    assert not [
+        query
+        for query in context.captured_queries
+        if "COUNT(*)" in query["sql"] and "dsrs_resource" in query["sql"]
+    ]
+
+
+def test_resource_changelist__keyset__return_expected(
+    admin_client, resources, monkeypatch
+):
+    # arrange
+    monkeypatch.setattr(ResourceAdmin, "list_per_page", 2)
+    expected_ids = [resource.id for resource in resources]
+
+    # act
+    ids = []
+    response = admin_client.get(CHANGELIST_URL)
+    ids += _get_resource_ids(response.content.decode())
+    while response.context["cl"].next_page_url:
+        response = admin_client.get(
+            CHANGELIST_URL + response.context["cl"].next_page_url
+        )
+        ids += _get_resource_ids(response.content.decode())
+
+    # assert
+    assert ids == expected_ids
+    assert response.context["cl"].first_page_url == "?"
+
+
+def test_resource_changelist__dsr_filter__return_expected(admin_client, resources):
+    # arrange
+    dsr = resources[0].dsr
+    expected_ids = [resource.id for resource in resources if resource.dsr == dsr]
+
+    # act
+    with CaptureQueriesContext(connection) as context:
+        response = admin_client.get(CHANGELIST_URL, {"dsr__id__exact": dsr.id})
+
+    # assert
+    assert response.status_code == 200
+    assert _get_resource_ids(response.content.decode()) == expected_ids
+    assert f'value="{dsr.id}"' in response.content.decode()
+    # DSRs aren't listed in the sidebar.
+    assert not [
+        query for query in context.captured_queries if 'FROM "dsr"' in query["sql"]
+    ]
+
+
+def test_resource_changelist__dsr_filter__invalid__redirect(admin_client, resources):
+    # act
+    response = admin_client.get(CHANGELIST_URL, {"dsr__id__exact": "abc"})
+
+    # assert
+    assert response.status_code == 302
+    assert response.url.endswith("?e=1")
+
+
+def test_resource_changelist__after__invalid__redirect(admin_client, resources):
+    # act
+    response = admin_client.get(CHANGELIST_URL, {"after": "abc"})
+
+    # assert
+    assert response.status_code == 302
+    assert response.url.endswith("?e=1")
+
+
+def test_dsr_changelist__return_expected(admin_client, resources):
+    # act
+    response = admin_client.get("/admin/dsrs/dsr/")
+
+    # assert
+    assert response.status_code == 200
+    assert len(response.context["cl"].result_list) == 2
+
+
+def test_dsr_delete_action__mark_for_deletion(admin_client, resources):
+    # arrange
+    dsr = resources[0].dsr
+
+    # act
+    response = admin_client.post(
+        "/admin/dsrs/dsr/",
+        {"action": "delete_selected", "_selected_action": [dsr.id], "post": "yes"},
+    )
+
+    # assert
+    dsr.refresh_from_db()
+    assert response.status_code == 302
+    assert dsr.status == "deleting"
+    assert dsr.resources.exists()
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", "shard"])
+def test_dsr_changelist__shard__return_expected(admin_client, dsr_files, settings):
+    # arrange
+    settings.DSR_SHARDS = {"shard": ["GB"]}
+    for filename, path in dsr_files.items():
+        admin_client.post(
+            "/dsrs/import/",
+            open(path, mode="rb").read(),
+            content_type="*/*",
+            HTTP_CONTENT_DISPOSITION=f"attachment; filename={filename}",
+        )
+    dsr_ids = list(
+        DSR.objects.using("shard").order_by("id").values_list("id", flat=True)
+    )
+
+    # act
+    response = admin_client.get("/admin/dsrs/dsr/", {"shard": "shard"})
+    change_response = admin_client.get(
+        f"/admin/dsrs/dsr/{dsr_ids[0]}/change/",
+        {"_changelist_filters": "shard=shard"},
+    )
+    invalid_response = admin_client.get("/admin/dsrs/dsr/", {"shard": "invalid"})
+
+    # assert
+    assert response.status_code == 200
+    assert [dsr.id for dsr in response.context["cl"].result_list] == dsr_ids
+    assert change_response.status_code == 200
+    assert invalid_response.status_code == 302
+    assert invalid_response.url.endswith("?e=1")
@@ -0,0 +1,183 @@
+from decimal import Decimal
+
+import pytest
+from django.core.files.storage import default_storage
+from django.db import DatabaseError
+
+from dsrs import amendments, blocked_gzip, services
+from dsrs.models import DSR, DSRStats, MonthlyResourceRevenue
+
+pytestmark = pytest.mark.django_db
+
+FILENAME = "Spotify_SpotifyDuo_SGAE_NO_NOK_20200101-20200531.tsv"
+
+HEADER = b"dsp_id\ttitle\tartists\tisrc\tusages\trevenue\n"
+
+CONTENT = HEADER + (
+    b"id1\ttitle1\tartist1\tISRC00000001\t1\t0.5\n"
+    + b"id2\ttitle2\tartist2\tISRC00000002\t2\t1\n"
+    + b"id3\ttitle3\tartist3\tISRC00000003\t3\t1.5\n"
+    + b"id3\ttitle3\tartist3\tISRC00000003\t4\t2\n"
+    + b"id4\ttitle4\tartist4\tISRC00000004\t5\t2.5\n"
+)
+
+AMENDED_CONTENT = HEADER + (
+    # Unchanged, in another order.
+    b"id3\ttitle3\tartist3\tISRC00000003\t4\t2.000\n"
+    + b"id1\ttitle1\tartist1\tISRC00000001\t1\t0.5\n"
+    # Updated.
+    + b"id2\ttitle2\tartist2\tISRC00000002\t7\t1.25\n"
+    + b"id3\ttitle3\tartist3\tISRC00000003\t6\t1.5\n"
+    # Inserted.
+    + b"id5\ttitle5\tartist5\tISRC00000005\t9\t4.5\n"
+    + b"id5\ttitle5\tartist5\tISRC00000005\t1\t0.5\n"
+    # Failed.
+    + b"id6\ttitle6\tartist6\tISRC00000006\tx\t1\n"
+)
+
+
+def _get_monthly_aggregates():
+    return sorted(
+        (month, dsp_id, usages, revenue, sorted(dsr_ids))
+        for month, dsp_id, usages, revenue, dsr_ids in (
+            MonthlyResourceRevenue.objects.values_list(
+                "month", "dsp_id", "usages", "revenue", "dsr_ids"
+            )
+        )
+    )
+
+
+@pytest.fixture
+def post_dsr_file(client):
+    def _post(url, content, filename=FILENAME):
+        return client.post(
+            url,
+            content,
+            content_type="*/*",
+            HTTP_CONTENT_DISPOSITION=f"attachment; filename={filename}",
+        )
+
+    return _post
+
+
+@pytest.fixture
+def imported_dsr(post_dsr_file):
+    response = post_dsr_file("/dsrs/import/", CONTENT)
+    return DSR.objects.get(id=response.json()["id"])
+
+
+def test_dsrs_amend__changes__return_expected(
+    imported_dsr, post_dsr_file, get_rows, get_stats
+):
+    # arrange
+    other_dsr = DSR.objects.get(
+        id=post_dsr_file("/dsrs/import/", AMENDED_CONTENT).json()["id"]
+    )
+    expected_rows = get_rows(other_dsr)
+    expected_stats = get_stats(other_dsr)
+
+    # act
+    response = post_dsr_file(f"/dsrs/{imported_dsr.id}/amend/", AMENDED_CONTENT)
+
+    # assert
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["inserted"], data["updated"], data["deleted"]) == (2, 2, 1)
+    assert data["dsr"]["status"] == "failed"
+    assert data["dsr"]["stats"]["row_count"] == 7
+    assert get_rows(imported_dsr) == expected_rows
+    assert get_stats(imported_dsr) == expected_stats
+    amended_aggregates = _get_monthly_aggregates()
+    # Same as a full re-ingestion of the amended file.
+    services.ingest_dsr(DSR.objects.get(id=imported_dsr.id))
+    assert _get_monthly_aggregates() == amended_aggregates
+
+
+def test_dsrs_amend__unchanged__return_expected(imported_dsr, post_dsr_file, get_rows):
+    # arrange
+    expected_rows = get_rows(imported_dsr)
+    expected_aggregates = _get_monthly_aggregates()
+
+    # act
+    response = post_dsr_file(f"/dsrs/{imported_dsr.id}/amend/", CONTENT)
+
+    # assert
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["inserted"], data["updated"], data["deleted"]) == (0, 0, 0)
+    assert data["dsr"]["status"] == "ingested"
+    assert get_rows(imported_dsr) == expected_rows
+    assert _get_monthly_aggregates() == expected_aggregates
+
+
+@pytest.mark.parametrize(
+    "filename",
+    [
+        "Spotify_SpotifyDuo_SGAE_SE_NOK_20200101-20200531.tsv",
+        "Spotify_SpotifyDuo_SGAE_NO_NOK_20200101-20200430.tsv",
+        "invalid.tsv",
+    ],
+)
+def test_dsrs_amend__other_metadata__return_expected(
+    imported_dsr, post_dsr_file, filename
+):
+    # act
+    response = post_dsr_file(
+        f"/dsrs/{imported_dsr.id}/amend/", AMENDED_CONTENT, filename=filename
+    )
+
+    # assert
+    assert response.status_code == 400
+    assert DSRStats.objects.get(dsr=imported_dsr).row_count == 5
+
+
+def test_dsrs_amend__not_ingested__return_expected(post_dsr_file, get_rows):
+    # arrange
+    response = post_dsr_file("/dsrs/import/", CONTENT)
+    dsr = DSR.objects.get(id=response.json()["id"])
+    services.mark_dsr_for_deletion(dsr)
+
+    # act
+    response = post_dsr_file(f"/dsrs/{dsr.id}/amend/", AMENDED_CONTENT)
+
+    # assert
+    assert response.status_code == 400
+    assert get_rows(dsr)[0][-1] == Decimal("0.5")
+
+
+@pytest.mark.parametrize("storage_format", ["plain", "blocked_gzip"])
+def test_dsrs_amend__replaced_file__deleted(
+    post_dsr_file, settings, storage_format, django_capture_on_commit_callbacks
+):
+    # arrange
+    settings.DSR_STORAGE_FORMAT = storage_format
+    dsr = DSR.objects.get(id=post_dsr_file("/dsrs/import/", CONTENT).json()["id"])
+
+    # act
+    with django_capture_on_commit_callbacks(execute=True):
+        response = post_dsr_file(f"/dsrs/{dsr.id}/amend/", AMENDED_CONTENT)
+
+    # assert
+    assert response.status_code == 200
+    amended_dsr = DSR.objects.get(id=dsr.id)
+    assert default_storage.exists(amended_dsr.path)
+    assert not default_storage.exists(dsr.path)
+    assert not default_storage.exists(blocked_gzip.get_index_name(dsr.path))
+
+
+def test_dsrs_amend__database_error__return_expected(
+    imported_dsr, post_dsr_file, media_root, mocker, get_rows
+):
+    # arrange
+    mocker.patch.object(amendments, "apply_resource_changes", side_effect=DatabaseError)
+    expected_files = sorted(media_root.rglob("*"))
+    expected_rows = get_rows(imported_dsr)
+
+    # act
+    response = post_dsr_file(f"/dsrs/{imported_dsr.id}/amend/", AMENDED_CONTENT)
+
+    # assert
+    assert response.status_code == 400
+    assert sorted(media_root.rglob("*")) == expected_files
+    assert DSR.objects.get(id=imported_dsr.id).path == imported_dsr.path
+    assert get_rows(imported_dsr) == expected_rows
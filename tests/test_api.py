@@ -1,6 +1,13 @@
+import gzip
+from datetime import date
+
 import pytest
 
-from dsrs.models import DSR, Resource
+from django.db import connection
+from django.db.models import Sum
+
+from dsrs import services
+from dsrs.models import DSR, MonthlyResourceRevenue, Resource
 
 pytestmark = pytest.mark.django_db
 
@@ -11,17 +18,91 @@ def test_get_dsrs__return_expected(dsr, client):
 
     # assert
     assert response.status_code == 200
-    assert response.json() == [
-        {
-            "id": dsr.id,
-            "path": dsr.path,
-            "period_start": str(dsr.period_start),
-            "period_end": str(dsr.period_end),
-            "status": dsr.status,
-            "territory": {"code_2": dsr.territory.code_2, "name": dsr.territory.name},
-            "currency": {"code": dsr.currency.code, "name": dsr.currency.name},
-        }
-    ]
+    assert response.json() == {
+        "count": 1,
+        "next": None,
+        "previous": None,
+        "results": [
+            {
+                "id": dsr.id,
+                "path": dsr.path,
+                "period_start": str(dsr.period_start),
+                "period_end": str(dsr.period_end),
+                "status": dsr.status,
+                "territory": {
+                    "code_2": dsr.territory.code_2,
+                    "name": dsr.territory.name,
+                },
+                "currency": {"code": dsr.currency.code, "name": dsr.currency.name},
+                "stats": None,
+            }
+        ],
+    }
+
+
+def test_get_dsrs__constant_query_count(dsr_factory, client, django_assert_num_queries):
+    # arrange
+    dsr_factory.create_batch(10)
+
+    # act
+    with django_assert_num_queries(2):
+        response = client.get(f"/dsrs/")
+
+    # assert
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == 10
+
+
+def test_get_dsrs__limit__return_expected(dsr_factory, client):
+    # arrange
+    dsrs = dsr_factory.create_batch(3)
+
+    # act
+    response = client.get(f"/dsrs/?limit=2&offset=1")
+
+    # assert
+    assert response.status_code == 200
+    response_json = response.json()
+    assert response_json["count"] == 3
+    assert [item["id"] for item in response_json["results"]] == [dsrs[1].id, dsrs[2].id]
+
+
+@pytest.mark.parametrize(
+    "query_params",
+    [
+        "status=ingested",
+        "territory=ZZ",
+        "period_start=2020-01-01&period_end=2020-01-31",
+    ],
+)
+def test_get_dsrs__filter__return_expected(dsr_factory, client, query_params):
+    # arrange
+    expected_dsr = dsr_factory(
+        status="ingested",
+        territory__code_2="ZZ",
+        period_start=date(2020, 1, 1),
+        period_end=date(2020, 1, 31),
+    )
+    dsr_factory(
+        status="failed",
+        period_start=date(2020, 1, 1),
+        period_end=date(2020, 2, 29),
+    )
+
+    # act
+    response = client.get(f"/dsrs/?{query_params}")
+
+    # assert
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["results"]] == [expected_dsr.id]
+
+
+def test_get_dsrs__invalid_filter__return_expected(client):
+    # act
+    response = client.get(f"/dsrs/?status=foobar")
+
+    # assert
+    assert response.status_code == 400
 
 
 def test_get_dsrs_detail__return_expected(dsr, client):
@@ -38,6 +119,7 @@ def test_get_dsrs_detail__return_expected(dsr, client):
         "status": dsr.status,
         "territory": {"code_2": dsr.territory.code_2, "name": dsr.territory.name},
         "currency": {"code": dsr.currency.code, "name": dsr.currency.name},
+        "stats": None,
     }
 
 
@@ -68,6 +150,39 @@ def test_dsrs_import__gzip__incorrect_content__return_expected(client, content):
     assert response.status_code == 400
 
 
+def test_dsrs_import__gzip__too_compressible__return_expected(client):
+    # arrange
+    content = gzip.compress(b"\t" * 10 * 1024 * 1024)
+
+    # act
+    response = client.post(
+        "/dsrs/import/",
+        content,
+        content_type="*/*",
+        HTTP_CONTENT_DISPOSITION=(
+            "attachment; filename=Spotify_SpotifyDuo_SGAE_NO_NOK_20200101-20200531.tsv"
+        ),
+    )
+
+    # assert
+    assert response.status_code == 413
+    assert not DSR.objects.exists()
+
+
+def test_dsrs_import__gzip__too_large__return_expected(dsr_files, client, settings):
+    # arrange
+    settings.DSR_UPLOAD_MAX_DECOMPRESSED_SIZE = 1024
+    source_path = dsr_files["Spotify_SpotifyDuo_SGAE_NO_NOK_20200101-20200531.tsv"]
+    content = open(source_path, mode="rb").read()
+
+    # act
+    response = client.post("/dsrs/import/", content, content_type="*/*")
+
+    # assert
+    assert response.status_code == 413
+    assert not DSR.objects.exists()
+
+
 def test_dsrs_import__gzip__empty_dsr__return_expected(client, mocker):
     # arrange
     content = b"\x1f\x8b\x08\x08\xb5\xe3$`\x02\xffSpotify_SpotifyDuo_SGAE_NO_NOK_20200101-20200531.tsv"
@@ -87,6 +202,13 @@ def test_dsrs_import__gzip__empty_dsr__return_expected(client, mocker):
         "status": "ingested",
         "territory": {"code_2": "NO", "name": ""},
         "currency": {"code": "NOK", "name": ""},
+        "stats": {
+            "row_count": 0,
+            "failed_row_count": 0,
+            "total_usages": 0,
+            "total_revenue": "0.00000000000000000000",
+            "distinct_recordings": 0,
+        },
     }
 
     dsr_id = response_json["id"]
@@ -110,7 +232,7 @@ def test_dsrs_import__gzip__empty_dsr__return_expected(client, mocker):
             {},
             "Spotify_SpotifyStudent_SGAE_GB_GBP_20200101-20200430.tsv",
             "failed",
-            81,
+            873,
             "2020-01-01",
             "2020-04-30",
             "GB",
@@ -120,7 +242,7 @@ def test_dsrs_import__gzip__empty_dsr__return_expected(client, mocker):
             {},
             "Spotify_SpotifyFree_SACEM_CH_CHF_20200201-20200228.tsv",
             "failed",
-            80,
+            873,
             "2020-02-01",
             "2020-02-28",
             "CH",
@@ -130,7 +252,7 @@ def test_dsrs_import__gzip__empty_dsr__return_expected(client, mocker):
             {},
             "Spotify_SpotifyFamilyPlan_SGAE_ES_EUR_20200101-20200331.tsv",
             "failed",
-            83,
+            872,
             "2020-01-01",
             "2020-03-31",
             "ES",
@@ -140,7 +262,7 @@ def test_dsrs_import__gzip__empty_dsr__return_expected(client, mocker):
             {},
             "Spotify_SpotifyDuo_SGAE_NO_NOK_20200101-20200531.tsv",
             "failed",
-            86,
+            873,
             "2020-01-01",
             "2020-05-31",
             "NO",
@@ -192,6 +314,7 @@ def test_dsrs_import__populated_dsr__return_expected(
         "status": expected_status,
         "territory": {"code_2": expected_territory_code, "name": ""},
         "currency": {"code": expected_currency_code, "name": ""},
+        "stats": mocker.ANY,
     }
 
     dsr_id = response_json["id"]
@@ -200,6 +323,30 @@ def test_dsrs_import__populated_dsr__return_expected(
     assert (media_root / tsv_filename).exists()
 
 
+def test_dsrs_import__stats__return_expected(dsr_files, client):
+    # arrange
+    tsv_filename = "Spotify_SpotifyStudent_SGAE_GB_GBP_20210901-20210930.tsv"
+    content = open(dsr_files[tsv_filename], mode="rb").read()
+
+    # act
+    response = client.post(
+        "/dsrs/import/",
+        content,
+        content_type="*/*",
+        HTTP_CONTENT_DISPOSITION=f"attachment; filename={tsv_filename}",
+    )
+
+    # assert
+    assert response.status_code == 200
+    assert response.json()["stats"] == {
+        "row_count": 13,
+        "failed_row_count": 0,
+        "total_usages": 6797849,
+        "total_revenue": "18436481480372.66222847973300000000",
+        "distinct_recordings": 13,
+    }
+
+
 @pytest.fixture
 def ingested_dsrs(
     dsr_files,
@@ -227,6 +374,33 @@ def test_resources_percentile__return_expected(
     # assert
     assert response.status_code == 200
     assert response.json() == [
+        {
+            "artists": "Jessica Malone",
+            "dsp_id": "XMqgheNVQGXzjDaiIuZQDCfXOSQsKb",
+            "dsr_ids": [1, 2, 3, 4],
+            "isrc": "USVDU0215539",
+            "revenue": "2844720518422816.00000000000000000000",
+            "title": "firm far where",
+            "usages": 3511824,
+        },
+        {
+            "artists": "Steven Thompson|Shannon Taylor|Kathryn Wagner",
+            "dsp_id": "qUVcsiypYCXTeTUFvYhXXJIokgCOKR",
+            "dsr_ids": [1, 2, 3, 4],
+            "isrc": "TMEOA5529222",
+            "revenue": "2170693470872628.00000000000000000000",
+            "title": "thus but",
+            "usages": 3011332,
+        },
+        {
+            "artists": "Mark Craig",
+            "dsp_id": "ONWfEUkSNgVCxWvhqTeoucRPxzXWoL",
+            "dsr_ids": [1],
+            "isrc": "SYEIP9157862",
+            "revenue": "998143311411132.00000000000000000000",
+            "title": "nature allow director",
+            "usages": 78953,
+        },
         {
             "artists": "Mary Owens|Kyle Woods|Jessica Martin|Misty Reed",
             "dsp_id": "fzzUnrtVboqZVfWZjtvIDkgnUwtUqH",
@@ -245,6 +419,87 @@ def test_resources_percentile__return_expected(
             "title": "so business",
             "usages": 56883,
         },
+        {
+            "artists": "Andrew Galvan",
+            "dsp_id": "xQHldkXMEqdgIETjhUgEOWKGoQahUa",
+            "dsr_ids": [4],
+            "isrc": "JODBJ6028682",
+            "revenue": "983837269863568.00000000000000000000",
+            "title": "happen become",
+            "usages": 105967,
+        },
+        {
+            "artists": "Misty Jackson|April Davis|Brittany Garcia DDS|Tracy Haas|Brittany Powell",
+            "dsp_id": "VDrJsvtvMAsRAsxIycJTgmUnTxXCik",
+            "dsr_ids": [2],
+            "isrc": "LIDPH1061306",
+            "revenue": "982420650132787.00000000000000000000",
+            "title": "image social trip",
+            "usages": 701919,
+        },
+        {
+            "artists": "Bradley Tran|Kevin Watkins|Kathryn Rush|Heather Wallace",
+            "dsp_id": "XrgOXFWPwlrfDkMnxXUUiduqVoJSsc",
+            "dsr_ids": [2],
+            "isrc": "PKMWG4737615",
+            "revenue": "975472101309157.00000000000000000000",
+            "title": "nor appear production who",
+            "usages": 664733,
+        },
+        {
+            "artists": "Hannah Morgan|Heather Graves|Laura Holmes|Mrs. Michelle Hernandez|Mrs. Gabriella Shaffer",
+            "dsp_id": "prorxtsgazpbGRuHsDmIYVGcKrzTvR",
+            "dsr_ids": [2],
+            "isrc": "CMRKT5848838",
+            "revenue": "972413250283110.00000000000000000000",
+            "title": "suggest force",
+            "usages": 193423,
+        },
+        {
+            "artists": "Ashley Thomas",
+            "dsp_id": "nYMzgMbniQbvzQDOPrQPWclGCjBvcm",
+            "dsr_ids": [1],
+            "isrc": "TMQCE8388199",
+            "revenue": "969829681336987.00000000000000000000",
+            "title": "far article street",
+            "usages": 579276,
+        },
+        {
+            "artists": "Keith Bruce|Molly King|Charles Lyons",
+            "dsp_id": "qCbiWEljpCCJFBYzBWPZNyZlipFXUV",
+            "dsr_ids": [4],
+            "isrc": "MLIKC2241658",
+            "revenue": "967814922413846.00000000000000000000",
+            "title": "hand news which behavior",
+            "usages": 981867,
+        },
+        {
+            "artists": "Deborah Diaz|Antonio Young|Paul Barker",
+            "dsp_id": "kacWsObEhwMZfHRVnwenrjeClyzWVg",
+            "dsr_ids": [2],
+            "isrc": "CMWCO3945010",
+            "revenue": "961111752577442.00000000000000000000",
+            "title": "work certain",
+            "usages": 488286,
+        },
+        {
+            "artists": "Mrs. Diana Obrien MD|Dylan Mueller|Janice Walker|Keith Ross|Lawrence Liu",
+            "dsp_id": "anDgTgptgQJXsnHwGJEPsFuPtmjnJx",
+            "dsr_ids": [4],
+            "isrc": "BJDZU9857187",
+            "revenue": "959167931598168.00000000000000000000",
+            "title": "choice skill many",
+            "usages": 135815,
+        },
+        {
+            "artists": "Steven Kline|Diana Martinez|Allison Hill|Joseph Richmond|Ashley Hernandez",
+            "dsp_id": "WBbyzUWqxtolmZWJjBGjbPIpjvbAbl",
+            "dsr_ids": [3],
+            "isrc": "MLTKN5758879",
+            "revenue": "955155383806710.00000000000000000000",
+            "title": "director Congress",
+            "usages": 474766,
+        },
         {
             "artists": "Walter Ramos",
             "dsp_id": "XBNthVJOlzOiXkaTyfYMFclYwpxQMT",
@@ -255,8 +510,52 @@ def test_resources_percentile__return_expected(
             "usages": 887471,
         },
         {
-            "artists": "Steven Thompson|Alvin Mcgee|Matthew Villanueva|Nathan "
-            "Spencer|Denise Henderson MD",
+            "artists": "Andrew Gonzalez|Omar Short|Lori Dalton|Michael Heath",
+            "dsp_id": "XUBLZYlzYdcluVTAMriaIvCNgSjakp",
+            "dsr_ids": [1],
+            "isrc": "ITNLP7669375",
+            "revenue": "943488737907197.00000000000000000000",
+            "title": "federal hundred stage surface",
+            "usages": 310471,
+        },
+        {
+            "artists": "Alex Taylor",
+            "dsp_id": "tRRHIenWxYutTifpjZiyRcFEfxLfRc",
+            "dsr_ids": [2],
+            "isrc": "GWNEJ7338079",
+            "revenue": "943129616081384.00000000000000000000",
+            "title": "century common physical",
+            "usages": 885768,
+        },
+        {
+            "artists": "Chad Mitchell|Joshua Stevens|Mrs. Shari Jones MD",
+            "dsp_id": "kKTZcpuaWborKUVngrYPichIqSDfQA",
+            "dsr_ids": [4],
+            "isrc": "ERPEJ9606109",
+            "revenue": "941228047720282.00000000000000000000",
+            "title": "become can approach",
+            "usages": 183907,
+        },
+        {
+            "artists": "Leslie Dyer|Rebecca Farmer|Lacey Brown",
+            "dsp_id": "NjwfCWhEJqfPNbKGKzjDFeMijIRLrx",
+            "dsr_ids": [3],
+            "isrc": "SZKEF9889228",
+            "revenue": "926522638313345.00000000000000000000",
+            "title": "choice study world assume",
+            "usages": 367473,
+        },
+        {
+            "artists": "Aaron Wilcox|Denise Lambert|Joseph Davis|Haley Boyd|Adam Saunders",
+            "dsp_id": "XPlcDPCXONzGijCQBuvlzoBzXbQvRx",
+            "dsr_ids": [4],
+            "isrc": "VCYKJ7914204",
+            "revenue": "923123414012051.00000000000000000000",
+            "title": "hard include",
+            "usages": 677783,
+        },
+        {
+            "artists": "Steven Thompson|Alvin Mcgee|Matthew Villanueva|Nathan Spencer|Denise Henderson MD",
             "dsp_id": "VHwVKwmLwnznBgmqlhNWXDwzvukIQE",
             "dsr_ids": [2],
             "isrc": "CRUNY3209492",
@@ -264,6 +563,114 @@ def test_resources_percentile__return_expected(
             "title": "conference customer plant few",
             "usages": 948437,
         },
+        {
+            "artists": "Daniel Davis|Jordan Lopez|Adrienne Harding|Margaret Roberts|William Watts",
+            "dsp_id": "GyvvlwPrDOkvEMMthNQUwLBflAIPqj",
+            "dsr_ids": [2],
+            "isrc": "TVKQC9508377",
+            "revenue": "921256493006798.00000000000000000000",
+            "title": "quite smile",
+            "usages": 436936,
+        },
+        {
+            "artists": "Charles Hardin|Amanda Harmon|Katherine Chandler",
+            "dsp_id": "iALpSuLGZVblGDLNZYOaXRnHNpikXk",
+            "dsr_ids": [4],
+            "isrc": "SMCBB4772361",
+            "revenue": "919236110678423.00000000000000000000",
+            "title": "public water",
+            "usages": 361799,
+        },
+        {
+            "artists": "Matthew Walker|John Park|Kerry Wall|Erin Burns|Annette Gonzalez",
+            "dsp_id": "rjWrrDrUmKKAnwkCwrjaWgiZPHGkQL",
+            "dsr_ids": [4],
+            "isrc": "ADZZQ1817465",
+            "revenue": "912986193829172.00000000000000000000",
+            "title": "phone sometimes",
+            "usages": 349472,
+        },
+        {
+            "artists": "Erik Roberts|Michelle Lopez",
+            "dsp_id": "tdiFLMYVuvSnpFXOtZCKwjMWYcrpns",
+            "dsr_ids": [2],
+            "isrc": "WSJHT9585129",
+            "revenue": "911717121778276.00000000000000000000",
+            "title": "study well",
+            "usages": 895392,
+        },
+        {
+            "artists": "Anita Henderson|Melissa Lara|Steve Kaiser|Erin Weiss",
+            "dsp_id": "qsCyEEldOESVguGBWETYsaCEnKJedX",
+            "dsr_ids": [3],
+            "isrc": "TTHUN5073243",
+            "revenue": "911686855997339.00000000000000000000",
+            "title": "expert enjoy something main",
+            "usages": 529970,
+        },
+        {
+            "artists": "Angela Allen|Amanda Davis|Julie King|Jennifer Cooper",
+            "dsp_id": "TDqdXrgfQXdQXLZTBoUjIniyUJvMqr",
+            "dsr_ids": [1],
+            "isrc": "SOXKB5666128",
+            "revenue": "910595688558955.00000000000000000000",
+            "title": "since another during",
+            "usages": 318580,
+        },
+        {
+            "artists": "Charles Bond",
+            "dsp_id": "QRfIpiyHAjKBShzjjIkgITMneiccok",
+            "dsr_ids": [2],
+            "isrc": "GAKQC8960451",
+            "revenue": "904016758795164.00000000000000000000",
+            "title": "free both",
+            "usages": 5130,
+        },
+        {
+            "artists": "Dr. Joseph Gill|Denise Moore|Amy Richardson|Pamela Herrera",
+            "dsp_id": "RUSmfkaYVfYCwBPOIgpfilrWzqWSUM",
+            "dsr_ids": [3],
+            "isrc": "BWDNE4519027",
+            "revenue": "899085059321741.00000000000000000000",
+            "title": "drive usually responsibility",
+            "usages": 979139,
+        },
+        {
+            "artists": "Nathan Campbell",
+            "dsp_id": "wPDLFeqoDpCFCuMvuOKJGICtQBavGm",
+            "dsr_ids": [2],
+            "isrc": "MGUAS8524209",
+            "revenue": "894503385352777.00000000000000000000",
+            "title": "fish realize",
+            "usages": 778769,
+        },
+        {
+            "artists": "Stephanie Vasquez|Kurt Ross|Richard Hart|Andrew Martinez",
+            "dsp_id": "egtWynXPaemuCvzleyHWJjhARSVGva",
+            "dsr_ids": [3],
+            "isrc": "TMQEB3005375",
+            "revenue": "893859652088694.00000000000000000000",
+            "title": "show institution collection concern",
+            "usages": 799969,
+        },
+        {
+            "artists": "Dustin Johnson|Amber Miller",
+            "dsp_id": "TwxqzFILZFQbfbnwddKEPAAfxJnRha",
+            "dsr_ids": [3],
+            "isrc": "ETCUD2294709",
+            "revenue": "893535537806935.00000000000000000000",
+            "title": "actually start",
+            "usages": 346512,
+        },
+        {
+            "artists": "Marissa Bennett|Nancy Bates",
+            "dsp_id": "xRGMFkybJZOwvknMvitblAICaBshcy",
+            "dsr_ids": [1, 2, 3, 4],
+            "isrc": "CADKG6211220",
+            "revenue": "890973722126257.00000000000000000000",
+            "title": "religious growth",
+            "usages": 1510580,
+        },
     ]
 
 
@@ -318,3 +725,219 @@ def test_resources_percentile__params__return_expected(
             "usages": 935064,
         },
     ]
+
+
+def test_dsrs_stats__return_expected(ingested_dsrs, client, django_assert_num_queries):
+    # act
+    with django_assert_num_queries(1):
+        response = client.get(f"/dsrs/stats/?territory=GB")
+
+    # assert
+    assert response.status_code == 200
+    assert response.json() == {
+        "dsr_count": 2,
+        "row_count": 1013,
+        "failed_row_count": 127,
+        "total_usages": 424495190,
+        "total_revenue": "29004352360228017.91220021073146000000",
+    }
+
+
+def test_dsrs_stats__no_dsrs__return_expected(client):
+    # act
+    response = client.get(f"/dsrs/stats/")
+
+    # assert
+    assert response.status_code == 200
+    assert response.json() == {
+        "dsr_count": 0,
+        "row_count": 0,
+        "failed_row_count": 0,
+        "total_usages": 0,
+        "total_revenue": "0.00000000000000000000",
+    }
+
+
+@pytest.mark.django_db(reset_sequences=True)
+def test_resources_percentile_monthly__params__return_expected(
+    ingested_dsrs,
+    client,
+):
+    # act
+    response = client.get(
+        f"/resources/percentile/100/monthly/"
+        "?territory=NO&period_start=2020-02-15&period_end=2020-03-31"
+    )
+
+    # assert
+    assert response.status_code == 200
+    response_json = response.json()
+    assert len(response_json) == 873
+    assert {tuple(item["dsr_ids"]) for item in response_json} == {(4,)}
+    assert response_json[0] == {
+        "artists": "Steven Vincent|Christian Campbell",
+        "dsp_id": "DcIQWUwJjFtNVJqgCJkXKRtKLrYzgb",
+        "dsr_ids": [4],
+        "isrc": "SBEJQ8975570",
+        # 60 of 152 days of the DSR fall into February and March
+        "revenue": "392107938861601.18421052631578947368",
+        "title": "so business",
+        "usages": 22453,
+    }
+
+
+def test_monthly_aggregates__ingest_and_delete__consistent_totals(
+    ingested_dsrs,
+):
+    def get_totals(model):
+        return model.objects.aggregate(usages=Sum("usages"), revenue=Sum("revenue"))
+
+    # assert
+    assert get_totals(MonthlyResourceRevenue) == get_totals(Resource)
+
+    # act
+    services.mark_dsrs_for_deletion(ingested_dsrs.filter(territory__code_2="GB"))
+    services.delete_marked_dsrs()
+
+    # assert
+    assert get_totals(MonthlyResourceRevenue) == get_totals(Resource)
+    assert not MonthlyResourceRevenue.objects.filter(territory__code_2="GB")
+
+
+@pytest.mark.django_db(reset_sequences=True)
+def test_resources_by_isrc__return_expected(ingested_dsrs, client):
+    # act
+    response = client.get("/resources/", {"isrc": "USVDU0215539"})
+
+    # assert
+    assert response.status_code == 200
+    data = response.json()
+    assert data["usages"] == 3511824
+    assert data["revenue"] == "2844720518422816.00000000000000000000"
+    assert [dsr["dsr_id"] for dsr in data["dsrs"]] == [1, 2, 3, 4]
+    assert sum(dsr["usages"] for dsr in data["dsrs"]) == data["usages"]
+
+
+def test_resources_by_isrc__no_isrc__return_expected(client):
+    # act
+    response = client.get("/resources/")
+
+    # assert
+    assert response.status_code == 400
+
+
+def test_resources_by_dsp_id__return_expected(ingested_dsrs, client):
+    # act
+    response = client.get("/resources/XMqgheNVQGXzjDaiIuZQDCfXOSQsKb/")
+
+    # assert
+    assert response.status_code == 200
+    assert response.json() == client.get("/resources/", {"isrc": "USVDU0215539"}).json()
+
+
+def test_resources_by_dsp_id__not_found__return_expected(client):
+    # act
+    response = client.get("/resources/foobar/")
+
+    # assert
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db(reset_sequences=True)
+def test_resources_search__return_expected(ingested_dsrs, client):
+    # act
+    response = client.get("/resources/search/", {"q": "Firm jess"})
+
+    # assert
+    assert response.status_code == 200
+    data = response.json()
+    assert sorted(resource["dsr"] for resource in data) == [1, 2, 3, 4]
+    assert {resource["dsp_id"] for resource in data} == {
+        "XMqgheNVQGXzjDaiIuZQDCfXOSQsKb"
+    }
+
+
+def test_resources_search__artist__return_expected(ingested_dsrs, client):
+    # act
+    response = client.get("/resources/search/", {"q": "early", "artist": "henry estes"})
+
+    # assert
+    assert response.status_code == 200
+    data = response.json()
+    assert data
+    for resource in data:
+        assert "Henry Estes" in resource["artists"].split("|")
+        assert "early" in resource["title"].split()
+
+
+def test_resources_search__limit__return_expected(ingested_dsrs, client):
+    # act
+    response = client.get("/resources/search/", {"q": "a", "limit": 3})
+
+    # assert
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+
+def test_resources_search__limit_settings__return_expected(
+    ingested_dsrs, client, settings
+):
+    # arrange
+    settings.RESOURCE_SEARCH_DEFAULT_LIMIT = 2
+    settings.RESOURCE_SEARCH_MAX_LIMIT = 4
+
+    # act
+    response = client.get("/resources/search/", {"q": "a"})
+    invalid_response = client.get("/resources/search/", {"q": "a", "limit": 5})
+
+    # assert
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert invalid_response.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "kwargs, index",
+    [
+        ({"q": "firm jess"}, "resource_search_vector_idx"),
+        ({"artist": "henry estes"}, "resource_artist_names_idx"),
+    ],
+)
+def test_search_resources__index_scan(ingested_dsrs, kwargs, index):
+    # arrange
+    sql, params = services._get_search_query(**kwargs)
+
+    # act
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"EXPLAIN {sql}", [*params, 50])
+        plan = "\n".join(row for row, in cursor.fetchall())
+
+    # assert
+    assert index in plan
+
+
+def test_resources_search__excludes_deleting_dsrs__return_expected(
+    ingested_dsrs, client
+):
+    # arrange
+    ingested_dsrs.update(status="deleting")
+
+    # act
+    response = client.get("/resources/search/", {"q": "firm far where"})
+
+    # assert
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+@pytest.mark.parametrize(
+    "query_params",
+    [{}, {"q": "!?"}, {"q": "firm", "limit": 0}],
+)
+def test_resources_search__invalid__return_expected(client, query_params):
+    # act
+    response = client.get("/resources/search/", query_params)
+
+    # assert
+    assert response.status_code == 400
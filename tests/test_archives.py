@@ -0,0 +1,211 @@
+import io
+from decimal import Decimal
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+
+from dsrs import archives, services
+from dsrs.models import DSR, MonthlyResourceRevenue, Resource
+
+pytestmark = pytest.mark.django_db
+
+URLS = [
+    "/resources/percentile/10/",
+    "/resources/percentile/50/?territory=GB",
+    "/resources/percentile/100/?period_start=2020-01-01&period_end=2020-05-31",
+    "/resources/top/10/",
+    "/resources/top/100/?by=usages",
+    "/resources/top/1000/",
+    "/dsrs/stats/",
+]
+
+
+def _get_monthly_aggregates():
+    return sorted(
+        (territory_id, month, dsp_id, usages, revenue, sorted(dsr_ids))
+        for territory_id, month, dsp_id, usages, revenue, dsr_ids in (
+            MonthlyResourceRevenue.objects.values_list(
+                "territory_id", "month", "dsp_id", "usages", "revenue", "dsr_ids"
+            )
+        )
+    )
+
+
+def _get_responses(client):
+    responses = {}
+    for url in URLS:
+        data = client.get(url).json()
+        # Percentiles come in no particular order.
+        if isinstance(data, list) and "percentile" in url:
+            data = sorted(data, key=lambda item: sorted(item.items()))
+        responses[url] = data
+    return responses
+
+
+@pytest.fixture
+def ingested_dsrs(dsr_files, client):
+    for filename, path in dsr_files.items():
+        client.post(
+            "/dsrs/import/",
+            open(path, mode="rb").read(),
+            content_type="*/*",
+            HTTP_CONTENT_DISPOSITION=f"attachment; filename={filename}",
+        )
+    return list(DSR.objects.order_by("id"))
+
+
+def test_write_archive__return_expected():
+    # arrange
+    resources = [
+        ("id2", "title", "artist", "ISRC", 1, Decimal("1.5")),
+        ("id1", "title", "artist", "ISRC", 2, Decimal("-0.00000000000000000001")),
+        (
+            "id2",
+            "title",
+            "artist",
+            "ISRC",
+            3,
+            Decimal("12345678901234567890.12345678901234567890"),
+        ),
+        ("id1", "title", "artist", "ISRC", -2, Decimal("0.5")),
+        ("id1", "other", "artist", "ISRC", 4, Decimal("0")),
+    ]
+    fp = io.BytesIO()
+    archives.write_archive(fp, iter(resources))
+    default_storage.save("archive.npz", fp)
+
+    # act
+    recordings = list(archives.iter_recordings(default_storage, "archive.npz"))
+
+    # assert
+    assert recordings == [
+        ("id1", "other", "artist", "ISRC", 4, Decimal("0"), 1),
+        ("id1", "title", "artist", "ISRC", 0, Decimal("0.49999999999999999999"), 2),
+        (
+            "id2",
+            "title",
+            "artist",
+            "ISRC",
+            4,
+            Decimal("12345678901234567891.62345678901234567890"),
+            2,
+        ),
+    ]
+
+
+def test_iter_recordings__dsp_ids__by_row_group():
+    # arrange
+    resources = [
+        ("id2", "title", "artist", "ISRC", 1, Decimal("1.5")),
+        ("id1", "title", "artist", "ISRC", 2, Decimal("2")),
+        ("id2", "title", "artist", "ISRC", 3, Decimal("3.5")),
+    ]
+    fp = io.BytesIO()
+    archives.write_archive(fp, iter(resources), row_group_size=2)
+    default_storage.save("archive.npz", fp)
+
+    # act
+    recordings = list(
+        archives.iter_recordings(default_storage, "archive.npz", dsp_ids={"id2"})
+    )
+
+    # assert
+    assert recordings == [
+        ("id2", "title", "artist", "ISRC", 1, Decimal("1.5"), 1),
+        ("id2", "title", "artist", "ISRC", 3, Decimal("3.5"), 1),
+    ]
+
+
+@pytest.mark.parametrize("row_group_size", [100000, 7])
+def test_archive_dsr__queries__same_as_before(
+    ingested_dsrs, client, settings, row_group_size
+):
+    # arrange
+    settings.DSR_ARCHIVE_ROW_GROUP_SIZE = row_group_size
+    expected_responses = _get_responses(client)
+    expected_aggregates = _get_monthly_aggregates()
+
+    # act
+    for dsr in ingested_dsrs[:3]:
+        assert services.archive_dsr(dsr)
+
+    # assert
+    for dsr in ingested_dsrs[:3]:
+        dsr.refresh_from_db()
+        assert dsr.status == "archived"
+        assert default_storage.exists(dsr.archive_path)
+        assert not Resource.objects.filter(dsr=dsr).exists()
+    assert _get_responses(client) == expected_responses
+    assert _get_monthly_aggregates() == expected_aggregates
+
+
+def test_archive_dsr__interrupted__resumed(ingested_dsrs, client):
+    # arrange
+    expected_responses = _get_responses(client)
+    dsr = ingested_dsrs[0]
+    count = dsr.resources.count()
+    services.archive_dsr(dsr)
+    # Leftovers of an interrupted archival, ignored by queries.
+    Resource.objects.bulk_create(
+        Resource(dsr=dsr, **resource)
+        for resource in Resource.objects.filter(dsr=ingested_dsrs[1]).values(
+            "dsp_id", "title", "artists", "isrc", "usages", "revenue"
+        )
+    )
+    assert _get_responses(client) == expected_responses
+
+    # act
+    call_command("archive_dsrs", "--days", "0")
+
+    # assert
+    assert not Resource.objects.filter(dsr__status="archived").exists()
+    assert set(DSR.objects.values_list("status", flat=True)) == {"archived"}
+    assert DSR.objects.get(id=dsr.id).deleted_resource_count > count
+    assert _get_responses(client) == expected_responses
+
+
+def test_delete_dsr__archived__same_as_live(ingested_dsrs, dsr_files, client):
+    # arrange
+    dsr = ingested_dsrs[0]
+    services.mark_dsr_for_deletion(dsr)
+    services.delete_marked_dsrs()
+    expected_aggregates = _get_monthly_aggregates()
+    filename = next(iter(dsr_files))
+    response = client.post(
+        "/dsrs/import/",
+        open(dsr_files[filename], mode="rb").read(),
+        content_type="*/*",
+        HTTP_CONTENT_DISPOSITION=f"attachment; filename={filename}",
+    )
+    dsr = DSR.objects.get(id=response.json()["id"])
+    services.archive_dsr(dsr)
+
+    # act
+    services.mark_dsr_for_deletion(dsr)
+    services.delete_marked_dsrs()
+
+    # assert
+    assert not DSR.objects.filter(id=dsr.id).exists()
+    assert not default_storage.exists(dsr.archive_path)
+    assert _get_monthly_aggregates() == expected_aggregates
+
+
+def test_ingest_dsr__archived__return_expected(ingested_dsrs, client):
+    # arrange
+    expected_responses = _get_responses(client)
+    expected_aggregates = _get_monthly_aggregates()
+    dsr = ingested_dsrs[0]
+    services.archive_dsr(dsr)
+    archive_path = dsr.archive_path
+
+    # act
+    services.ingest_dsr(dsr)
+
+    # assert
+    dsr.refresh_from_db()
+    assert (dsr.status, dsr.archive_path) == ("failed", "")
+    assert dsr.resources.exists()
+    assert not default_storage.exists(archive_path)
+    assert _get_responses(client) == expected_responses
+    assert _get_monthly_aggregates() == expected_aggregates
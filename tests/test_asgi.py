@@ -0,0 +1,149 @@
+import gzip
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+
+from digital.asgi import application
+from dsrs.models import DSR
+
+# Streaming imports manage database connections on their own,
+# like any request served by Django.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+TSV_FILENAME = "Spotify_SpotifyStudent_SGAE_GB_GBP_20210901-20210930.tsv"
+
+
+def get_sent_messages(chunks, method="POST", headers=()):
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": "/dsrs/import/stream/",
+        "query_string": b"",
+        "headers": list(headers),
+    }
+    async_to_sync(application)(scope, receive, send)
+    return sent
+
+
+def call_application(chunks, method="POST", headers=()):
+    sent = get_sent_messages(chunks, method=method, headers=headers)
+    status = sent[0]["status"]
+    return status, json.loads(b"".join(message.get("body", b"") for message in sent))
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_dsrs_import_stream__return_expected(dsr_files, compress, mocker):
+    # arrange
+    content = open(dsr_files[TSV_FILENAME], mode="rb").read()
+    if compress:
+        content = gzip.compress(content)
+    chunks = [content[i : i + 100] for i in range(0, len(content), 100)]
+
+    # act
+    status, response_json = call_application(
+        chunks,
+        headers=[
+            (b"content-disposition", f"attachment; filename={TSV_FILENAME}".encode())
+        ],
+    )
+
+    # assert
+    assert status == 202, response_json
+    assert response_json == {
+        "id": mocker.ANY,
+        "path": TSV_FILENAME,
+        "period_start": "2021-09-01",
+        "period_end": "2021-09-30",
+        "status": "pending",
+        "territory": {"code_2": "GB", "name": ""},
+        "currency": {"code": "GBP", "name": ""},
+        "stats": None,
+    }
+
+    # act
+    call_command("ingest_dsrs", "--once")
+
+    # assert
+    dsr = DSR.objects.get(id=response_json["id"])
+    assert dsr.status == "ingested"
+    assert dsr.resources.count() == 13
+
+
+def test_dsrs_import_stream__replicas__read_primary_cookie(dsr_files, settings):
+    # arrange
+    settings.DATABASE_REPLICAS = {"default": ["replica"]}
+    content = open(dsr_files[TSV_FILENAME], mode="rb").read()
+
+    # act
+    sent = get_sent_messages(
+        [content],
+        headers=[
+            (b"content-disposition", f"attachment; filename={TSV_FILENAME}".encode())
+        ],
+    )
+
+    # assert
+    assert sent[0]["status"] == 202
+    cookies = [value for name, value in sent[0]["headers"] if name == b"set-cookie"]
+    assert cookies == [b"read_primary=1; HttpOnly; Max-Age=30; Path=/; SameSite=Lax"]
+
+
+@pytest.mark.parametrize(
+    "chunks",
+    [
+        [b"foobar"],
+        [b"\037\213", b"\037\213" * 10],
+        # Truncated
+        [gzip.compress(b"dsp_id\ttitle")[:-10]],
+    ],
+)
+def test_dsrs_import_stream__incorrect_content__return_expected(chunks):
+    # act
+    status, _ = call_application(
+        chunks,
+        headers=[(b"content-disposition", b"attachment; filename=foo.tsv.gz")],
+    )
+
+    # assert
+    assert status == 400
+    assert not DSR.objects.exists()
+
+
+def test_dsrs_import_stream__method_not_allowed__return_expected():
+    # act
+    status, _ = call_application([b""], method="GET")
+
+    # assert
+    assert status == 405
+
+
+def test_dsrs_import_stream__too_compressible__return_expected():
+    # arrange
+    content = gzip.compress(b"\t" * 10 * 1024 * 1024)
+    chunks = [content[i : i + 1024] for i in range(0, len(content), 1024)]
+
+    # act
+    status, _ = call_application(
+        chunks,
+        headers=[
+            (b"content-disposition", f"attachment; filename={TSV_FILENAME}".encode())
+        ],
+    )
+
+    # assert
+    assert status == 413
+    assert not DSR.objects.exists()
@@ -0,0 +1,145 @@
+import threading
+import time
+
+import pytest
+from django.core.management import call_command
+from django.db import OperationalError, connection
+
+from digital.backends.postgresql.base import DatabaseWrapper
+from digital.backends.postgresql.pool import close_pools
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def get_pooled_connection(request):
+    alias = request.node.name
+    connections = []
+
+    def _get_pooled_connection(**pool_options) -> DatabaseWrapper:
+        pooled_connection = DatabaseWrapper(
+            {
+                **connection.settings_dict,
+                "CONN_HEALTH_CHECKS": True,
+                "OPTIONS": {"pool": pool_options},
+            },
+            alias=alias,
+        )
+        connections.append(pooled_connection)
+        return pooled_connection
+
+    yield _get_pooled_connection
+    for pooled_connection in connections:
+        pooled_connection.close()
+    close_pools(alias)
+
+
+def get_backend_pid(pooled_connection: DatabaseWrapper) -> int:
+    with pooled_connection.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        return cursor.fetchone()[0]
+
+
+def test_pool__reuse__return_expected(get_pooled_connection):
+    # arrange
+    pooled_connection = get_pooled_connection(max_size=2)
+    backend_pid = get_backend_pid(pooled_connection)
+    with pooled_connection.cursor() as cursor:
+        cursor.execute("SET statement_timeout = 1000")
+    pooled_connection.close()
+
+    # act
+    reused_backend_pid = get_backend_pid(pooled_connection)
+
+    # assert
+    assert reused_backend_pid == backend_pid
+    with pooled_connection.cursor() as cursor:
+        cursor.execute("SHOW statement_timeout")
+        assert cursor.fetchone()[0] == "0"
+    stats = pooled_connection.pool.get_stats()
+    assert stats["checkouts"] == 2
+    assert stats["size"] == stats["in_use"] == 1
+
+
+def test_pool__exhausted__raises_expected(get_pooled_connection):
+    # arrange
+    first_connection = get_pooled_connection(max_size=1, timeout=0.05)
+    second_connection = get_pooled_connection(max_size=1, timeout=0.05)
+    first_connection.ensure_connection()
+
+    # act
+    with pytest.raises(OperationalError):
+        second_connection.ensure_connection()
+
+    # assert
+    stats = first_connection.pool.get_stats()
+    assert stats["timeouts"] == 1
+    assert stats["waits"] == 1
+    assert stats["max_wait_time"] >= 0.05
+
+
+def test_pool__wait__return_expected(get_pooled_connection):
+    # arrange
+    first_connection = get_pooled_connection(max_size=1, timeout=5.0)
+    second_connection = get_pooled_connection(max_size=1, timeout=5.0)
+    backend_pid = get_backend_pid(first_connection)
+
+    def release():
+        time.sleep(0.1)
+        first_connection.close()
+
+    first_connection.inc_thread_sharing()
+    thread = threading.Thread(target=release)
+    thread.start()
+
+    # act
+    waiting_backend_pid = get_backend_pid(second_connection)
+    thread.join()
+    first_connection.dec_thread_sharing()
+
+    # assert
+    assert waiting_backend_pid == backend_pid
+    stats = second_connection.pool.get_stats()
+    assert stats["waits"] == 1
+    assert 0.1 <= stats["wait_time"] < 5.0
+
+
+def test_health_check__terminated__reconnects(get_pooled_connection):
+    # arrange
+    pooled_connection = get_pooled_connection(max_size=2)
+    backend_pid = get_backend_pid(pooled_connection)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_terminate_backend(%s)", [backend_pid])
+    # As done when a request starts.
+    pooled_connection.close_if_unusable_or_obsolete()
+
+    # act
+    new_backend_pid = get_backend_pid(pooled_connection)
+
+    # assert
+    assert new_backend_pid != backend_pid
+    assert pooled_connection.pool.get_stats()["discarded"] == 1
+
+
+def test_database_pools__return_expected(client):
+    # act
+    response = client.get("/metrics/db-pools/")
+
+    # assert
+    assert response.status_code == 200
+    pools = {pool["alias"]: pool for pool in response.json()}
+    assert pools["default"]["database"] == connection.settings_dict["NAME"]
+    assert pools["default"]["max_size"] == 10
+
+
+def test_ingest_dsrs__workers__return_expected():
+    # arrange
+    connection.ensure_connection()
+    in_use = connection.pool.get_stats()["in_use"]
+
+    # act
+    call_command("ingest_dsrs", "--once", "--workers", "3", verbosity=2)
+
+    # assert
+    # Workers gave their connections back, the main thread's one is closed.
+    assert connection.pool.get_stats()["in_use"] == in_use - 1
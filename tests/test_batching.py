@@ -0,0 +1,70 @@
+import pytest
+
+from dsrs.batching import RESOURCE_ROW_OVERHEAD, AdaptiveBatcher
+from dsrs.models import Resource
+
+
+@pytest.fixture
+def batcher():
+    return AdaptiveBatcher(
+        size=100,
+        min_size=10,
+        max_size=1000,
+        max_bytes=10 * 1024,
+        target_latency=1.0,
+    )
+
+
+def test_batches__row_limit__return_expected(batcher):
+    # arrange
+    resources = [None] * 250
+
+    # act
+    batches = list(batcher.batches(resources))
+
+    # assert
+    assert [len(batch) for batch in batches] == [100, 100, 50]
+
+
+def test_batches__byte_limit__return_expected(batcher):
+    # arrange
+    resource = Resource(dsp_id="", title="x" * (1024 - RESOURCE_ROW_OVERHEAD))
+    resource.artists = resource.isrc = ""
+
+    # act
+    batches = list(batcher.batches([resource] * 25))
+
+    # assert
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+
+
+@pytest.mark.parametrize(
+    ["latency", "expected_size"],
+    [
+        # Fast commits: grow, but at most twice
+        (0.01, 200),
+        # Slow commits: shrink, but at most by half
+        (100.0, 50),
+        # Close to target
+        (0.8, 125),
+    ],
+)
+def test_record__return_expected(batcher, latency, expected_size):
+    # act
+    batcher.record(rows=100, latency=latency)
+
+    # assert
+    assert batcher.size == expected_size
+
+
+def test_record__bounds__return_expected(batcher):
+    # act
+    for _ in range(20):
+        batcher.record(rows=batcher.size, latency=0.001)
+    max_size = batcher.size
+    for _ in range(20):
+        batcher.record(rows=batcher.size, latency=100.0)
+    min_size = batcher.size
+
+    # assert
+    assert (min_size, max_size) == (10, 1000)
@@ -0,0 +1,72 @@
+import gzip
+import io
+
+import pytest
+from django.core.files.storage import default_storage
+
+from dsrs import blocked_gzip
+
+CONTENT = b"".join(f"line {number}\tvalue\n".encode() for number in range(100))
+
+
+@pytest.mark.parametrize("content", [CONTENT, CONTENT + b"last line", b""])
+def test_write_blocks__return_expected(content):
+    # arrange
+    fp = io.BytesIO()
+
+    # act
+    blocks = blocked_gzip.write_blocks(io.BytesIO(content), fp, block_size=100)
+
+    # assert
+    assert gzip.decompress(fp.getvalue()) == content
+    assert blocked_gzip.load_index(blocked_gzip.dump_index(blocks)) == blocks
+    for block in blocks:
+        data = gzip.decompress(fp.getvalue()[block.offset : block.offset + block.size])
+        assert data.endswith(b"\n") or block is blocks[-1]
+        assert len(data.splitlines()) == block.line_count
+
+
+@pytest.mark.parametrize(
+    ["start", "stop"],
+    [(0, None), (0, 1), (17, 42), (42, 43), (99, None), (99, 100), (100, None)],
+)
+def test_read_lines__return_expected(start, stop):
+    # arrange
+    content = CONTENT + b"last line"
+    fp = io.BytesIO()
+    blocks = blocked_gzip.write_blocks(io.BytesIO(content), fp, block_size=100)
+
+    # act
+    lines = blocked_gzip.read_lines(fp, blocks, start=start, stop=stop)
+
+    # assert
+    assert lines == b"".join(io.BytesIO(content).readlines()[start:stop])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("workers", [0, 2])
+def test_dsrs_import__blocked_gzip__same_as_plain(
+    dsr_files, import_dsr, settings, workers, get_rows, get_stats
+):
+    # arrange
+    filename = "Spotify_SpotifyStudent_SGAE_GB_GBP_20200101-20200430.tsv"
+    content = open(dsr_files[filename], mode="rb").read()
+    plain_dsr = import_dsr(content, filename=filename)
+    settings.DSR_STORAGE_FORMAT = "blocked_gzip"
+    settings.DSR_STORAGE_BLOCK_SIZE = 4096
+    settings.DSR_STORAGE_DECOMPRESSION_WORKERS = workers
+
+    # act
+    dsr = import_dsr(content, filename=filename)
+
+    # assert
+    assert dsr.status == plain_dsr.status
+    assert get_rows(dsr) == get_rows(plain_dsr)
+    assert get_stats(dsr) == get_stats(plain_dsr)
+    with default_storage.open(plain_dsr.path) as fp:
+        plain_content = fp.read()
+    with default_storage.open(dsr.path) as fp:
+        assert gzip.decompress(fp.read()) == plain_content
+    assert blocked_gzip.read_stored_lines(
+        default_storage, dsr.path, start=10, stop=20
+    ) == b"".join(io.BytesIO(plain_content).readlines()[10:20])
@@ -0,0 +1,90 @@
+from decimal import Decimal
+
+import pytest
+
+from dsrs import services
+from dsrs.combining import ResourceCombiner
+from dsrs.models import DSRStats, Resource
+from dsrs.readers import USAGES_MAX
+
+pytestmark = pytest.mark.django_db
+
+CONTENT = (
+    b"dsp_id\ttitle\tartists\tisrc\tusages\trevenue\n"
+    + b"id1\ttitle1\tartist1\tISRC00000001\t1\t0.5\n"
+    + b"id2\ttitle2\tartist2\tISRC00000002\t2\t1\n"
+    + b"id1\ttitle1\tartist1\tISRC00000001\t3\t0.25\n"
+    + b"id3\ttitle3\tartist3\tISRC00000003\tx\t1\n"
+    + b"id1\ttitle1\tartist1\tISRC00000002\t4\t2\n"
+    + b"id2\ttitle2\tartist2\tISRC00000002\t5\t0.125\n"
+    + b"id1\ttitle1\tartist1\tISRC00000001\t6\t4\n"
+)
+
+
+@pytest.mark.parametrize("max_size", [1, 2, 100])
+def test_ingest_dsr__combine_duplicates__return_expected(
+    import_dsr, settings, max_size, get_rows
+):
+    # arrange
+    settings.DSR_RESOURCE_IMPORT_MIN_BATCH_SIZE = 1
+    settings.DSR_RESOURCE_IMPORT_BATCH_SIZE = 2
+    dsr = import_dsr(CONTENT)
+    expected_stats = DSRStats.objects.get(dsr=dsr)
+    settings.DSR_COMBINE_DUPLICATE_RESOURCES = True
+    settings.DSR_RESOURCE_COMBINER_MAX_SIZE = max_size
+
+    # act
+    services.ingest_dsr(dsr)
+
+    # assert
+    assert dsr.status == "failed"
+    assert get_rows(dsr) == [
+        ("id1", "title1", "artist1", "ISRC00000001", 10, Decimal("4.75")),
+        ("id1", "title1", "artist1", "ISRC00000002", 4, Decimal("2")),
+        ("id2", "title2", "artist2", "ISRC00000002", 7, Decimal("1.125")),
+    ]
+    stats = DSRStats.objects.get(dsr=dsr)
+    assert (
+        stats.row_count,
+        stats.failed_row_count,
+        stats.total_usages,
+        stats.total_revenue,
+        stats.distinct_recordings,
+    ) == (
+        expected_stats.row_count,
+        expected_stats.failed_row_count,
+        expected_stats.total_usages,
+        expected_stats.total_revenue,
+        expected_stats.distinct_recordings,
+    )
+
+
+@pytest.mark.parametrize("spill", [False, True])
+def test_combiner__usages_overflow__return_expected(dsr, spill):
+    # arrange
+    combiner = ResourceCombiner(dsr, max_size=10)
+    resources = [
+        Resource(
+            dsr=dsr,
+            dsp_id="id1",
+            title="title1",
+            artists="artist1",
+            isrc="ISRC00000001",
+            usages=usages,
+            revenue=Decimal(1),
+        )
+        for usages in (USAGES_MAX - 1, 1, 1, 2)
+    ]
+
+    # act
+    for resource in resources:
+        combiner.add(resource)
+        if spill:
+            combiner.spill()
+    combiner.spill()
+
+    # assert
+    assert sorted(dsr.resources.values_list("usages", "revenue")) == [
+        (3, Decimal(2)),
+        (USAGES_MAX, Decimal(2)),
+    ]
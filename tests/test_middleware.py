@@ -0,0 +1,136 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from digital.slowqueries import read_slow_queries
+from dsrs import recordings, services, sharding
+from dsrs.models import Resource
+
+
+def get_statement_timeout() -> str:
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW statement_timeout")
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_query_budget__applies_endpoint_budget__return_expected(
+    client, settings, monkeypatch
+):
+    # arrange
+    settings.API_STATEMENT_TIMEOUTS = {"resource-search": 1500}
+    default_timeout = get_statement_timeout()
+    request_timeouts = []
+
+    def search_resources(**_):
+        request_timeouts.append(get_statement_timeout())
+        return Resource.objects.none()
+
+    monkeypatch.setattr(services, "search_resources", search_resources)
+
+    # act
+    response = client.get("/resources/search/", {"q": "firm"})
+
+    # assert
+    assert response.status_code == 200
+    assert request_timeouts == ["1500ms"]
+    assert get_statement_timeout() == default_timeout
+
+
+@pytest.mark.django_db(transaction=True)
+def test_query_budget__timeout__return_expected(client, settings, monkeypatch):
+    # arrange
+    settings.API_STATEMENT_TIMEOUTS = {"resource-search": 50}
+    default_timeout = get_statement_timeout()
+
+    def search_resources(**_):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_sleep(1)")
+        return Resource.objects.none()
+
+    monkeypatch.setattr(services, "search_resources", search_resources)
+
+    # act
+    response = client.get("/resources/search/", {"q": "firm"})
+
+    # assert
+    assert response.status_code == 503
+    assert response["Retry-After"] == str(settings.API_RETRY_AFTER)
+    assert get_statement_timeout() == default_timeout
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", "shard"])
+def test_query_budget__shard_workers__return_expected(
+    client, settings, monkeypatch, slow_query_log_path
+):
+    # arrange
+    settings.DSR_SHARDS = {"shard": ["GB"]}
+    settings.SLOW_QUERY_THRESHOLD = 0.2
+    settings.API_STATEMENT_TIMEOUTS = {"resource-percentile": 1500}
+    shard_timeouts = {}
+
+    def get_recording_revenues(*_):
+        with sharding.get_connection().cursor() as cursor:
+            cursor.execute("SHOW statement_timeout")
+            shard_timeouts[sharding.get_current_alias()] = cursor.fetchone()[0]
+            cursor.execute("SELECT 1 FROM (SELECT pg_sleep(%s)) AS sleep", [0.3])
+        return []
+
+    monkeypatch.setattr(recordings, "get_recording_revenues", get_recording_revenues)
+
+    # act
+    response = client.get("/resources/percentile/10/")
+
+    # assert
+    assert response.status_code == 200
+    assert shard_timeouts == {"default": "1500ms", "shard": "1500ms"}
+    assert (
+        sorted(record["path"] for record in read_slow_queries(slow_query_log_path))
+        == ["/resources/percentile/10/"] * 2
+    )
+
+
+def test_query_budget__no_queries__return_expected(client):
+    # act
+    response = client.get("/resources/search/")
+
+    # assert
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_slow_queries__recorded__return_expected(
+    client, settings, monkeypatch, slow_query_log_path
+):
+    # arrange
+    settings.SLOW_QUERY_THRESHOLD = 0.2
+    settings.API_STATEMENT_TIMEOUTS = {"resource-search": 500}
+
+    def search_resources(**_):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM (SELECT pg_sleep(%s)) AS sleep", [0.3])
+            cursor.execute("SELECT pg_sleep(1)")
+        return Resource.objects.none()
+
+    monkeypatch.setattr(services, "search_resources", search_resources)
+    stdout = io.StringIO()
+
+    # act
+    response = client.get("/resources/search/", {"q": "firm"})
+    call_command("slow_query_report", "--plans", stdout=stdout)
+
+    # assert
+    assert response.status_code == 503
+    slow, timed_out = read_slow_queries(slow_query_log_path)
+    assert slow["path"] == "/resources/search/"
+    assert slow["duration"] >= 0.2
+    assert slow["params"] == [0.3]
+    assert slow["plan"][0]["Plan"]["Node Type"]
+    assert slow["error"] is None
+    assert timed_out["sql"] == "SELECT pg_sleep(1)"
+    assert "statement timeout" in timed_out["error"]
+    report = stdout.getvalue()
+    assert "1 run(s), 1 failed" in report
+    assert "SELECT 1 FROM (SELECT pg_sleep(%s)) AS sleep" in report
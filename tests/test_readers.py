@@ -0,0 +1,95 @@
+import gzip
+
+import pytest
+
+from dsrs import services
+from dsrs.readers import iter_resources_mmap, open_dsr_file_mmap
+
+pytestmark = pytest.mark.django_db
+
+HEADER = b"dsp_id\ttitle\tartists\tisrc\tusages\trevenue\r\n"
+
+
+def _get_rows(resources):
+    return [
+        resource
+        and (
+            resource.dsr_id,
+            resource.dsp_id,
+            resource.title,
+            resource.artists,
+            resource.isrc,
+            resource.usages,
+            resource.revenue,
+        )
+        for resource in resources
+    ]
+
+
+@pytest.fixture
+def dsr_file_path(tmp_path):
+    def _write(content: bytes):
+        path = tmp_path / "dsr.tsv"
+        path.write_bytes(content)
+        return path
+
+    return _write
+
+
+@pytest.mark.parametrize(
+    "filename",
+    [
+        "Spotify_SpotifyStudent_GB_GBP_20200301-20200331.tsv.gz",
+        "Spotify_SpotifyStudent_SGAE_GB_GBP_20210901-20210930.tsv",
+    ],
+)
+def test_iter_resources_mmap__data__same_as_csv(filename, dsr, dsr_file_path, settings):
+    # arrange
+    source_path = settings.BASE_DIR / "data" / filename
+    content = source_path.read_bytes()
+    if filename.endswith(".gz"):
+        content = gzip.decompress(content)
+    path = dsr_file_path(content)
+    expected = _get_rows(services.iter_resources(open(path, mode="rb"), dsr=dsr))
+
+    # act
+    rows = _get_rows(iter_resources_mmap(open_dsr_file_mmap(path), dsr=dsr))
+
+    # assert
+    assert rows == expected
+
+
+def test_iter_resources_mmap__edge_cases__same_as_csv(dsr, dsr_file_path):
+    # arrange
+    path = dsr_file_path(
+        b"\n"
+        + HEADER
+        + b"id1\t title \tartist\tISRC00000001\t\t\r\n"
+        + b"\r\n"
+        + b"id2\ttitle\tartist\tISRC00000002\t 12 \t1.5\textra\n"
+        + b"id3\ttitle\tartist\tISRC00000003\t12.0\t1e3\r"
+        + b"id4\ttitle\tartist\tISRC00000004\t \t \r\n"
+        + b"id5\ttitle\tartist\tISRC00000005\t99999999999\t1\r\n"
+        + b"id6\ttitle\tartist\tTOO_LONG_ISRC\t1\t1\r\n"
+        + b"id7\ttitle\tartist\r\n"
+        + b"id8\t\tartist\tISRC00000008\t1\tnan\r\n"
+        + "id9\ttítulo\tartista\tISRC00000009\t1\t0.000000000000000000001\r\n".encode()
+    )
+    expected = _get_rows(services.iter_resources(open(path, mode="rb"), dsr=dsr))
+
+    # act
+    rows = _get_rows(iter_resources_mmap(open_dsr_file_mmap(path), dsr=dsr))
+
+    # assert
+    assert rows == expected
+    assert len(rows) == 9
+    assert rows.count(None) == 6
+
+
+@pytest.mark.parametrize("content", [b"", HEADER + b'"id1"\ttitle\r\n'])
+def test_open_dsr_file_mmap__unsupported__return_none(content, dsr_file_path):
+    # act
+    mm = open_dsr_file_mmap(dsr_file_path(content))
+
+    # assert
+    assert mm is None
@@ -0,0 +1,116 @@
+import pytest
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from digital import replicas
+from digital.middleware import REPLICA_STICKY_COOKIE
+
+pytestmark = pytest.mark.django_db(transaction=True, databases=["default", "replica"])
+
+URLS = [
+    "/dsrs/",
+    "/resources/percentile/10/",
+    "/resources/percentile/50/?territory=GB",
+]
+
+
+@pytest.fixture(autouse=True)
+def replica_settings(settings):
+    settings.DATABASE_REPLICAS = {"default": ["replica"]}
+    replicas._lags.clear()
+    yield
+    replicas._lags.clear()
+
+
+@pytest.fixture
+def imported_dsrs(dsr_files, client):
+    for filename, path in dsr_files.items():
+        response = client.post(
+            "/dsrs/import/",
+            open(path, mode="rb").read(),
+            content_type="*/*",
+            HTTP_CONTENT_DISPOSITION=f"attachment; filename={filename}",
+        )
+    return response
+
+
+def _get(client, url):
+    with CaptureQueriesContext(connections["default"]) as primary_queries:
+        with CaptureQueriesContext(connections["replica"]) as replica_queries:
+            response = client.get(url)
+    assert response.status_code == 200
+    return response.json(), len(primary_queries), len(replica_queries)
+
+
+def test_replica_reads__return_expected(imported_dsrs, client):
+    # arrange
+    client.cookies.clear()
+
+    for url in URLS:
+        # act
+        data, primary_count, replica_count = _get(client, url)
+
+        # assert
+        assert data
+        assert (primary_count, replica_count > 0) == (0, True)
+
+
+def test_replica_reads__after_write__read_primary(imported_dsrs, client):
+    # arrange
+    dsr_id = imported_dsrs.json()["id"]
+
+    # act
+    data, primary_count, replica_count = _get(client, f"/dsrs/{dsr_id}/")
+
+    # assert
+    assert imported_dsrs.cookies[REPLICA_STICKY_COOKIE]["max-age"] == 30
+    assert data["id"] == dsr_id
+    assert (primary_count > 0, replica_count) == (True, 0)
+
+
+def test_replica_reads__read_primary_header__read_primary(imported_dsrs, client):
+    # arrange
+    client.cookies.clear()
+
+    for url in URLS:
+        # act
+        with CaptureQueriesContext(connections["replica"]) as replica_queries:
+            response = client.get(url, HTTP_X_READ_PRIMARY="1")
+
+        # assert
+        assert response.status_code == 200
+        assert response.json()
+        assert not replica_queries
+
+
+@pytest.mark.parametrize("lag", [None, 60.0])
+def test_replica_reads__lagging__read_primary(imported_dsrs, client, monkeypatch, lag):
+    # arrange
+    client.cookies.clear()
+    monkeypatch.setattr(replicas, "_check_lag", lambda alias: lag)
+
+    for url in URLS:
+        # act
+        data, primary_count, replica_count = _get(client, url)
+
+        # assert
+        assert data
+        assert (primary_count > 0, replica_count) == (True, 0)
+
+
+def test_replica_reads__writes__not_routed(client, dsr_files):
+    # arrange
+    filename, path = next(iter(dsr_files.items()))
+
+    # act
+    with CaptureQueriesContext(connections["replica"]) as replica_queries:
+        response = client.post(
+            "/dsrs/import/",
+            open(path, mode="rb").read(),
+            content_type="*/*",
+            HTTP_CONTENT_DISPOSITION=f"attachment; filename={filename}",
+        )
+
+    # assert
+    assert response.status_code == 200
+    assert not replica_queries
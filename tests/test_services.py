@@ -0,0 +1,249 @@
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+
+from dsrs import services
+from dsrs.models import DSR, DSRStats, MonthlyResourceRevenue, Resource
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def imported_dsr(dsr_files, client):
+    tsv_filename = "Spotify_SpotifyFree_SACEM_CH_CHF_20200201-20200228.tsv"
+    content = open(dsr_files[tsv_filename], mode="rb").read()
+    response = client.post(
+        "/dsrs/import/",
+        content,
+        content_type="*/*",
+        HTTP_CONTENT_DISPOSITION=f"attachment; filename={tsv_filename}",
+    )
+    return DSR.objects.get(id=response.json()["id"])
+
+
+def test_ingest_dsr__reingest__no_duplicates(imported_dsr):
+    # arrange
+    expected_resources_len = imported_dsr.resources.count()
+    expected_row_count = DSRStats.objects.get(dsr=imported_dsr).row_count
+    expected_revenue = MonthlyResourceRevenue.objects.aggregate(Sum("revenue"))
+
+    # act
+    services.ingest_dsr(imported_dsr)
+
+    # assert
+    assert imported_dsr.status == "failed"
+    assert DSR.objects.get(id=imported_dsr.id).status == "failed"
+    assert imported_dsr.resources.count() == expected_resources_len
+    assert DSRStats.objects.get(dsr=imported_dsr).row_count == expected_row_count
+    assert MonthlyResourceRevenue.objects.aggregate(Sum("revenue")) == expected_revenue
+
+
+def test_ingest_dsr__reingest__batched_deletion(imported_dsr, settings, mocker):
+    # arrange
+    settings.DSR_DELETION_BATCH_SIZE = 5
+    settings.DSR_DELETION_BATCH_DELAY = 0
+    expected_resources_len = imported_dsr.resources.count()
+    delete_resource_batch = mocker.spy(services, "_delete_resource_batch")
+
+    # act
+    services.ingest_dsr(imported_dsr)
+
+    # assert
+    assert delete_resource_batch.call_count == expected_resources_len // 5 + 1
+    assert imported_dsr.resources.count() == expected_resources_len
+    assert DSR.objects.get(id=imported_dsr.id).deleted_resource_count == 0
+
+
+def test_ingest_dsr__locked__skip(imported_dsr):
+    # arrange
+    other_connection = connection.get_new_connection(connection.get_connection_params())
+    with other_connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", [imported_dsr.id])
+    Resource.objects.filter(dsr=imported_dsr).delete()
+
+    # act
+    try:
+        services.ingest_dsr(imported_dsr)
+    finally:
+        other_connection.close()
+
+    # assert
+    assert not imported_dsr.resources.exists()
+
+
+@pytest.fixture
+def queued_dsr(dsr_files):
+    tsv_filename = "Spotify_SpotifyStudent_SGAE_GB_GBP_20210901-20210930.tsv"
+    content = open(dsr_files[tsv_filename], mode="rb").read()
+    return services.queue_dsr(ContentFile(content, name=tsv_filename))
+
+
+def test_ingest_pending_dsrs__left_ingesting__claimed_again(queued_dsr):
+    # arrange
+    DSR.objects.filter(id=queued_dsr.id).update(
+        status="ingesting", ingestion_attempts=1
+    )
+
+    # act
+    count = services.ingest_pending_dsrs()
+
+    # assert
+    assert count == 1
+    dsr = DSR.objects.get(id=queued_dsr.id)
+    assert dsr.status == "ingested"
+    assert dsr.ingestion_attempts == 2
+
+
+def test_ingest_pending_dsrs__left_ingesting_too_often__failed(queued_dsr, settings):
+    # arrange
+    DSR.objects.filter(id=queued_dsr.id).update(
+        status="ingesting", ingestion_attempts=settings.DSR_INGESTION_MAX_ATTEMPTS
+    )
+
+    # act
+    count = services.ingest_pending_dsrs()
+
+    # assert
+    assert count == 0
+    assert DSR.objects.get(id=queued_dsr.id).status == "failed"
+    assert not queued_dsr.resources.exists()
+
+
+def test_ingest_pending_dsrs__unexpected_error__failed(queued_dsr, mocker):
+    # arrange
+    mocker.patch.object(services, "_ingest_dsr", side_effect=RuntimeError)
+
+    # act
+    count = services.ingest_pending_dsrs()
+
+    # assert
+    assert count == 1
+    assert DSR.objects.get(id=queued_dsr.id).status == "failed"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_ingest_dsrs__undecodable_row__failed(dsr_files):
+    # arrange
+    tsv_filename = "Spotify_SpotifyStudent_SGAE_GB_GBP_20210901-20210930.tsv"
+    content = open(dsr_files[tsv_filename], mode="rb").read()
+    content += b"id1\tCaf\xe9\tArtist\tISRC00000001\t1\t0.1\n"
+    dsr = services.queue_dsr(ContentFile(content, name=tsv_filename))
+
+    # act
+    call_command("ingest_dsrs", "--once")
+
+    # assert
+    assert DSR.objects.get(id=dsr.id).status == "failed"
+
+
+def test_ingest_pending_dsrs__ingesting_locked__skip(queued_dsr):
+    # arrange
+    DSR.objects.filter(id=queued_dsr.id).update(status="ingesting")
+    other_connection = connection.get_new_connection(connection.get_connection_params())
+    with other_connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", [queued_dsr.id])
+
+    # act
+    try:
+        count = services.ingest_pending_dsrs()
+    finally:
+        other_connection.close()
+
+    # assert
+    assert count == 0
+    assert DSR.objects.get(id=queued_dsr.id).status == "ingesting"
+    assert not queued_dsr.resources.exists()
+
+
+def test_mark_dsr_for_deletion__return_expected(imported_dsr):
+    # arrange
+    expected_resources_len = imported_dsr.resources.count()
+
+    # act
+    services.mark_dsr_for_deletion(imported_dsr)
+
+    # assert
+    dsr = DSR.objects.get(id=imported_dsr.id)
+    assert dsr.status == "deleting"
+    assert dsr.deleted_resource_count == 0
+    assert dsr.resources.count() == expected_resources_len
+    assert not DSRStats.objects.filter(dsr=dsr).exists()
+    assert not MonthlyResourceRevenue.objects.exists()
+
+
+def test_delete_marked_dsrs__batches__return_expected(imported_dsr, settings):
+    # arrange
+    settings.DSR_DELETION_BATCH_SIZE = 5
+    settings.DSR_DELETION_BATCH_DELAY = 0
+    services.mark_dsr_for_deletion(imported_dsr)
+
+    # act
+    count = services.delete_marked_dsrs()
+
+    # assert
+    assert count == 1
+    assert not DSR.objects.exists()
+    assert not Resource.objects.exists()
+
+
+def test_delete_marked_dsrs__locked__progress_kept(imported_dsr, settings):
+    # arrange
+    settings.DSR_DELETION_BATCH_SIZE = 5
+    expected_resources_len = imported_dsr.resources.count()
+    services.mark_dsr_for_deletion(imported_dsr)
+    services._delete_resource_batch(imported_dsr, size=5)
+    other_connection = connection.get_new_connection(connection.get_connection_params())
+    with other_connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", [imported_dsr.id])
+
+    # act
+    try:
+        count = services.delete_marked_dsrs()
+    finally:
+        other_connection.close()
+
+    # assert
+    dsr = DSR.objects.get(id=imported_dsr.id)
+    assert count == 0
+    assert dsr.deleted_resource_count == 5
+    assert dsr.resources.count() == expected_resources_len - 5
+
+
+def test_ingest_dsr__deleting__skip(imported_dsr):
+    # arrange
+    services.mark_dsr_for_deletion(imported_dsr)
+    expected_resources_len = imported_dsr.resources.count()
+
+    # act
+    services.ingest_dsr(imported_dsr)
+
+    # assert
+    assert DSR.objects.get(id=imported_dsr.id).status == "deleting"
+    assert imported_dsr.resources.count() == expected_resources_len
+    assert not MonthlyResourceRevenue.objects.exists()
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"isrc": "USVDU0215539"}, {"dsp_id": "XMqgheNVQGXzjDaiIuZQDCfXOSQsKb"}]
+)
+def test_get_recording_revenue__index_only_scan(imported_dsr, kwargs):
+    # arrange
+    with connection.cursor() as cursor:
+        # Don't depend on statistics left behind by other tests.
+        cursor.execute("ANALYZE dsrs_resource")
+    queryset = (
+        Resource.objects.filter(**kwargs)
+        .values("dsr_id")
+        .annotate(usages=Sum("usages"), revenue=Sum("revenue"))
+    )
+
+    # act
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("SET LOCAL enable_bitmapscan = off")
+        plan = queryset.explain()
+
+    # assert
+    assert "Index Only Scan" in plan
@@ -0,0 +1,185 @@
+import gzip
+
+import pytest
+from django.core.files.base import ContentFile
+
+from dsrs import services
+from dsrs.models import DSR, MonthlyResourceRevenue, Resource, Territory
+
+pytestmark = pytest.mark.django_db(transaction=True, databases=["default", "shard"])
+
+URLS = [
+    "/resources/percentile/10/",
+    "/resources/percentile/50/?period_start=2020-01-01&period_end=2020-05-31",
+    "/resources/percentile/100/",
+    "/resources/percentile/50/?territory=GB",
+    "/resources/percentile/50/?territory=NO",
+]
+
+
+def _import_dsrs(client, dsr_files):
+    for filename, path in dsr_files.items():
+        client.post(
+            "/dsrs/import/",
+            open(path, mode="rb").read(),
+            content_type="*/*",
+            HTTP_CONTENT_DISPOSITION=f"attachment; filename={filename}",
+        )
+
+
+def _get_responses(client):
+    # DSR ids differ between imports, identify DSRs by their metadata.
+    dsr_keys = {
+        dsr.id: (dsr.territory.code_2, dsr.period_start)
+        for alias in ("default", "shard")
+        for dsr in DSR.objects.using(alias)
+    }
+    return {
+        url: sorted(
+            (
+                {
+                    **resource,
+                    "dsr_ids": sorted(
+                        dsr_keys[dsr_id] for dsr_id in resource["dsr_ids"]
+                    ),
+                }
+                for resource in client.get(url).json()
+            ),
+            key=lambda resource: sorted(resource.items()),
+        )
+        for url in URLS
+    }
+
+
+def _get_read_responses(client, isrc):
+    dsr_keys = {
+        dsr.id: (dsr.territory.code_2, dsr.period_start.isoformat())
+        for alias in ("default", "shard")
+        for dsr in DSR.objects.using(alias)
+    }
+    dsrs = client.get("/dsrs/", {"limit": 3, "offset": 1}).json()
+    return {
+        "dsrs": (
+            dsrs["count"],
+            [dsr_keys[dsr["id"]] for dsr in dsrs["results"]],
+        ),
+        "details": sorted(
+            client.get(f"/dsrs/{dsr_id}/").json()["period_start"] for dsr_id in dsr_keys
+        ),
+        "stats": client.get("/dsrs/stats/").json(),
+        "top": [
+            {**resource, "dsr_ids": sorted(map(dsr_keys.get, resource["dsr_ids"]))}
+            for resource in client.get("/resources/top/10/").json()
+        ],
+        "monthly": sorted(
+            (
+                {**resource, "dsr_ids": sorted(map(dsr_keys.get, resource["dsr_ids"]))}
+                for resource in client.get("/resources/percentile/50/monthly/").json()
+            ),
+            key=lambda resource: sorted(resource.items()),
+        ),
+        "search": sorted(
+            (resource["dsp_id"], dsr_keys[resource["dsr"]])
+            for resource in client.get(
+                "/resources/search/", {"q": "firm", "limit": 500}
+            ).json()
+        ),
+        "recording": [
+            (dsr_keys[dsr["dsr_id"]], dsr["usages"], dsr["revenue"])
+            for dsr in client.get("/resources/", {"isrc": isrc}).json()["dsrs"]
+        ],
+    }
+
+
+def test_reads__shards__same_as_unsharded(settings, dsr_files, client):
+    # arrange
+    _import_dsrs(client, dsr_files)
+    isrc = Resource.objects.filter(dsr__territory__code_2="GB").first().isrc
+    expected_responses = _get_read_responses(client, isrc)
+    assert all(expected_responses.values())
+    services.mark_dsrs_for_deletion(DSR.objects.all())
+    services.delete_marked_dsrs()
+    settings.DSR_SHARDS = {"shard": ["GB", "ES"]}
+    _import_dsrs(client, dsr_files)
+
+    # act
+    responses = _get_read_responses(client, isrc)
+
+    # assert
+    assert responses == expected_responses
+
+
+def test_import_dsr__shards__return_expected(settings, dsr_files, client):
+    # arrange
+    _import_dsrs(client, dsr_files)
+    expected_responses = _get_responses(client)
+    assert all(expected_responses.values())
+    services.mark_dsrs_for_deletion(DSR.objects.all())
+    services.delete_marked_dsrs()
+    settings.DSR_SHARDS = {"shard": ["GB", "ES"]}
+
+    # act
+    _import_dsrs(client, dsr_files)
+
+    # assert
+    assert sorted(
+        DSR.objects.using("shard").values_list("territory__code_2", "status")
+    ) == [("ES", "failed"), ("GB", "failed"), ("GB", "ingested")]
+    assert sorted(DSR.objects.values_list("territory__code_2", flat=True)) == [
+        "CH",
+        "NO",
+    ]
+    assert set(
+        Resource.objects.using("shard").values_list("dsr__territory__code_2", flat=True)
+    ) == {"ES", "GB"}
+    assert not Resource.objects.filter(dsr__territory__code_2__in=["ES", "GB"]).exists()
+    assert MonthlyResourceRevenue.objects.using("shard").exists()
+    assert set(Territory.objects.using("shard").values_list("code_2", flat=True)) == {
+        "ES",
+        "GB",
+    }
+    assert _get_responses(client) == expected_responses
+
+
+def test_ingest_pending_dsrs__shards__return_expected(settings, dsr_files):
+    # arrange
+    settings.DSR_SHARDS = {"shard": ["GB"]}
+    dsrs = [
+        services.queue_dsr(
+            ContentFile(
+                gzip.decompress(open(dsr_files[filename], mode="rb").read()),
+                name=filename,
+            )
+        )
+        for filename in (
+            "Spotify_SpotifyStudent_SGAE_GB_GBP_20200101-20200430.tsv",
+            "Spotify_SpotifyDuo_SGAE_NO_NOK_20200101-20200531.tsv",
+        )
+    ]
+
+    # act
+    count = services.ingest_pending_dsrs()
+
+    # assert
+    assert count == 2
+    assert [dsr._state.db for dsr in dsrs] == ["shard", "default"]
+    assert DSR.objects.using("shard").get(id=dsrs[0].id).status == "failed"
+    assert DSR.objects.get(id=dsrs[1].id).status == "failed"
+    assert Resource.objects.using("shard").filter(dsr_id=dsrs[0].id).exists()
+
+
+def test_delete_marked_dsrs__shards__return_expected(settings, dsr_files, client):
+    # arrange
+    settings.DSR_SHARDS = {"shard": ["GB"]}
+    _import_dsrs(client, dsr_files)
+    dsr = DSR.objects.using("shard").order_by("id").first()
+    services.mark_dsr_for_deletion(dsr)
+
+    # act
+    count = services.delete_marked_dsrs()
+
+    # assert
+    assert count == 1
+    assert not DSR.objects.using("shard").filter(id=dsr.id).exists()
+    assert not Resource.objects.using("shard").filter(dsr_id=dsr.id).exists()
+    assert DSR.objects.using("shard").exists()
@@ -0,0 +1,121 @@
+import sys
+
+import pytest
+from django.db import connection
+
+from dsrs import services, staging
+from dsrs.models import DSR, ResourceError
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def small_batches(settings):
+    settings.DSR_RESOURCE_IMPORT_MIN_BATCH_SIZE = 1
+    settings.DSR_RESOURCE_IMPORT_BATCH_SIZE = 7
+    settings.DSR_RESOURCE_IMPORT_MAX_BATCH_BYTES = 500
+
+
+def test_whitespace__return_expected():
+    # assert
+    assert staging.WHITESPACE == "".join(
+        char for char in map(chr, range(sys.maxunicode + 1)) if char.isspace()
+    )
+
+
+@pytest.mark.parametrize(
+    "filename",
+    [
+        "Spotify_SpotifyStudent_SGAE_GB_GBP_20200101-20200430.tsv",
+        "Spotify_SpotifyStudent_SGAE_GB_GBP_20210901-20210930.tsv",
+    ],
+)
+def test_ingest_dsr__sql_engine__same_as_python(
+    filename, dsr_files, import_dsr, settings, small_batches, get_rows, get_stats
+):
+    # arrange
+    dsr = import_dsr(open(dsr_files[filename], mode="rb").read(), filename=filename)
+    expected_status = dsr.status
+    expected_rows = get_rows(dsr)
+    expected_stats = get_stats(dsr)
+    settings.DSR_INGESTION_ENGINE = "sql"
+
+    # act
+    services.ingest_dsr(dsr)
+
+    # assert
+    assert DSR.objects.get(id=dsr.id).status == expected_status
+    assert get_rows(dsr) == expected_rows
+    assert get_stats(dsr) == expected_stats
+    assert dsr.resource_errors.count() == expected_stats[1]
+
+
+def test_ingest_dsr__sql_engine__edge_cases__same_as_python(
+    import_dsr, settings, small_batches, get_rows, get_stats
+):
+    # arrange
+    content = (
+        b"\n"
+        + b"dsp_id\ttitle\tartists\tisrc\tusages\trevenue\r\n"
+        + b"id1\t title \tartist\tISRC00000001\t\t\r\n"
+        + b"\r\n"
+        + b"id2\ttitle\tartist\tISRC00000002\t 12 \t1.5\textra\n"
+        + b"id3\ttitle\tartist\tISRC00000003\t12.0\t1e3\r"
+        + b"id4\ttitle\tartist\tISRC00000004\t \t \r\n"
+        + b"id5\ttitle\tartist\tISRC00000005\t99999999999\t1\r\n"
+        + b"id6\ttitle\tartist\tTOO_LONG_ISRC\t1\t1\r\n"
+        + b"id7\ttitle\tartist\r\n"
+        + b"id8\t\tartist\tISRC00000008\t1\tnan\r\n"
+        + "id9\ttítulo\tartista\tISRC00000009\t1\t0.000000000000000000001\r\n".encode()
+        + "id10\ttítulo　\tartista\tISRC00000010\t2147483647\t.5\r\n".encode()
+        + b"id11\ttitle\\\tartist\tISRC00000011\t0007\t00012.50\r\n"
+        + b"id12\ttitle\tartist\tISRC00000012\t1_000\t-1.\r\n"
+        + b"id13\ttitle\tartist\tISRC00000013\t3\t4."
+    )
+    dsr = import_dsr(content)
+    expected_rows = get_rows(dsr)
+    expected_stats = get_stats(dsr)
+    settings.DSR_INGESTION_ENGINE = "sql"
+
+    # act
+    services.ingest_dsr(dsr)
+
+    # assert
+    assert get_rows(dsr) == expected_rows
+    assert get_stats(dsr) == expected_stats
+    assert expected_stats[:2] == (13, 6)
+    assert list(dsr.resource_errors.values_list("line", "error")) == [
+        ("id4\ttitle\tartist\tISRC00000004\t \t ", "Invalid usages."),
+        ("id5\ttitle\tartist\tISRC00000005\t99999999999\t1", "Invalid usages."),
+        ("id6\ttitle\tartist\tTOO_LONG_ISRC\t1\t1", "Invalid ISRC."),
+        ("id7\ttitle\tartist", "Missing fields."),
+        ("id8\t\tartist\tISRC00000008\t1\tnan", "Invalid title."),
+        (
+            "id9\ttítulo\tartista\tISRC00000009\t1\t0.000000000000000000001",
+            "Invalid revenue.",
+        ),
+    ]
+
+
+def test_ingest_dsr__sql_engine__reingest__return_expected(
+    import_dsr, dsr_files, settings
+):
+    # arrange
+    filename = "Spotify_SpotifyStudent_SGAE_GB_GBP_20200101-20200430.tsv"
+    settings.DSR_INGESTION_ENGINE = "sql"
+    dsr = import_dsr(open(dsr_files[filename], mode="rb").read(), filename=filename)
+    expected_errors = list(dsr.resource_errors.values_list("line_number", "error"))
+
+    # act
+    services.ingest_dsr(dsr)
+
+    # assert
+    assert list(dsr.resource_errors.values_list("line_number", "error")) == (
+        expected_errors
+    )
+    assert ResourceError.objects.count() == len(expected_errors)
+    assert not [
+        table
+        for table in connection.introspection.table_names()
+        if table.startswith("dsrs_resource_staging_")
+    ]
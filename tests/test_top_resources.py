@@ -0,0 +1,192 @@
+import pytest
+
+from dsrs import recordings, services
+from dsrs.models import DSR, DSRStats
+from dsrs.stats import get_stored_stats
+
+pytestmark = pytest.mark.django_db
+
+
+def _get_recordings(resources):
+    return [
+        (
+            resource.dsp_id,
+            resource.title,
+            resource.artists,
+            resource.isrc,
+            resource.usages,
+            resource.revenue,
+            resource.dsr_ids,
+        )
+        for resource in resources
+    ]
+
+
+@pytest.fixture
+def imported_dsrs(dsr_files, client, settings):
+    settings.DSR_TOP_RECORDINGS_LIMIT = 5
+    dsrs = []
+    for filename, path in dsr_files.items():
+        response = client.post(
+            "/dsrs/import/",
+            open(path, mode="rb").read(),
+            content_type="*/*",
+            HTTP_CONTENT_DISPOSITION=f"attachment; filename={filename}",
+        )
+        dsrs.append(DSR.objects.get(id=response.json()["id"]))
+    return dsrs
+
+
+def test_dsr_stats__top_recordings__return_expected(imported_dsrs):
+    # arrange
+    dsr = imported_dsrs[0]
+    expected = recordings.get_top_resources(
+        {"default": ([dsr.id], [])}, n=5, by="revenue"
+    )
+
+    # act
+    stats = DSRStats.objects.get(dsr=dsr)
+
+    # assert
+    assert stats.top_recordings_limit == 5
+    assert stats.top_recordings_by_revenue == [
+        [
+            resource.dsp_id,
+            resource.title,
+            resource.artists,
+            resource.isrc,
+            str(resource.usages),
+            str(resource.revenue),
+        ]
+        for resource in expected
+    ]
+    assert len(stats.top_recordings_by_usages) == 5
+
+
+def test_get_stored_stats__single_query__return_expected(
+    imported_dsrs, django_assert_num_queries
+):
+    # arrange
+    dsr = imported_dsrs[0]
+    expected = DSRStats.objects.get(dsr=dsr)
+
+    # act
+    with django_assert_num_queries(1):
+        stats = get_stored_stats(dsr)
+
+    # assert
+    assert stats == {
+        "total_usages": expected.total_usages,
+        "total_revenue": expected.total_revenue,
+        "distinct_recordings": expected.distinct_recordings,
+        "top_recordings_limit": 5,
+        "top_recordings_by_revenue": expected.top_recordings_by_revenue,
+        "top_recordings_by_usages": expected.top_recordings_by_usages,
+    }
+
+
+def test_get_stored_stats__no_resources__return_expected(dsr):
+    # act
+    stats = get_stored_stats(dsr)
+
+    # assert
+    assert (
+        stats["total_usages"],
+        stats["total_revenue"],
+        stats["distinct_recordings"],
+        stats["top_recordings_by_revenue"],
+    ) == (0, 0, 0, [])
+
+
+@pytest.mark.parametrize("by", ["revenue", "usages"])
+@pytest.mark.parametrize(
+    ["territory_code", "n", "expected_num_queries"],
+    [
+        # Kept recordings tell the top ones.
+        ("GB", 1, 2),
+        ("GB", 3, 2),
+        # Kept recordings of many DSRs don't, grouping all resources.
+        (None, 1, 3),
+        # More than kept, grouping all resources straight away.
+        ("GB", 6, 2),
+        (None, 50, 2),
+    ],
+)
+def test_get_top_resources__return_expected(
+    imported_dsrs,
+    django_assert_num_queries,
+    by,
+    territory_code,
+    n,
+    expected_num_queries,
+):
+    # arrange
+    dsr_ids = list(
+        DSR.objects.filter(
+            **({"territory__code_2": territory_code} if territory_code else {})
+        ).values_list("id", flat=True)
+    )
+    expected = recordings.get_top_resources({"default": (dsr_ids, [])}, n=n, by=by)
+
+    # act
+    with django_assert_num_queries(expected_num_queries):
+        resources = services.get_top_resources(
+            n=n, by=by, territory_code=territory_code
+        )
+
+    # assert
+    assert len(expected) == n
+    assert _get_recordings(resources) == _get_recordings(expected)
+
+
+def test_get_top_resources__not_ingested__return_expected(imported_dsrs, dsr):
+    # arrange
+    dsr_ids = [imported_dsr.id for imported_dsr in imported_dsrs] + [dsr.id]
+    expected = recordings.get_top_resources(
+        {"default": (dsr_ids, [])}, n=3, by="revenue"
+    )
+
+    # act
+    resources = services.get_top_resources(n=3)
+
+    # assert
+    assert _get_recordings(resources) == _get_recordings(expected)
+
+
+def test_resources_top__return_expected(imported_dsrs, client):
+    # act
+    response = client.get("/resources/top/3/?by=usages&territory=GB")
+
+    # assert
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 3
+    assert [item["usages"] for item in data] == sorted(
+        (item["usages"] for item in data), reverse=True
+    )
+    assert set(data[0]) == {
+        "dsp_id",
+        "title",
+        "artists",
+        "isrc",
+        "usages",
+        "revenue",
+        "dsr_ids",
+    }
+
+
+@pytest.mark.parametrize("url", ["/resources/top/0/", "/resources/top/1001/"])
+def test_resources_top__invalid_n__return_expected(client, url):
+    # act
+    response = client.get(url)
+
+    # assert
+    assert response.status_code == 404
+
+
+def test_resources_top__invalid_by__return_expected(client):
+    # act
+    response = client.get("/resources/top/3/?by=title")
+
+    # assert
+    assert response.status_code == 400
@@ -0,0 +1,298 @@
+import gzip
+import hashlib
+from datetime import timedelta
+
+import pytest
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from dsrs import services, uploads
+from dsrs.models import DSR, DSRStats, DSRUpload
+
+pytestmark = pytest.mark.django_db
+
+FILENAME = "Spotify_SpotifyDuo_SGAE_NO_NOK_20200101-20200531.tsv"
+
+
+@pytest.fixture
+def dsr_content(dsr_files):
+    return gzip.decompress(open(dsr_files[FILENAME], mode="rb").read())
+
+
+@pytest.fixture
+def create_upload(client):
+    def _create(content, filename=FILENAME):
+        response = client.post(
+            "/dsrs/uploads/",
+            {"filename": filename, "size": len(content)},
+            content_type="application/json",
+        )
+        assert response.status_code == 201
+        return response.json()["id"]
+
+    return _create
+
+
+@pytest.fixture
+def put_chunk(client):
+    def _put(upload_id, content, offset):
+        return client.put(
+            f"/dsrs/uploads/{upload_id}/?offset={offset}",
+            content,
+            content_type="application/octet-stream",
+        )
+
+    return _put
+
+
+@pytest.fixture
+def complete_upload(client):
+    def _complete(upload_id, **data):
+        return client.post(
+            f"/dsrs/uploads/{upload_id}/complete/",
+            data,
+            content_type="application/json",
+        )
+
+    return _complete
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_dsrs_uploads__chunks__return_expected(
+    dsr_content, create_upload, put_chunk, complete_upload, client, compress
+):
+    # arrange
+    content = gzip.compress(dsr_content) if compress else dsr_content
+    upload_id = create_upload(content)
+    size = len(content) // 3
+    put_chunk(upload_id, content[:size], offset=0)
+    # Resent with the next chunk, as after a lost response.
+    put_chunk(upload_id, content[size // 2 : size * 2], offset=size // 2)
+    # Another process, or a restart.
+    uploads._states.clear()
+    put_chunk(upload_id, content[size * 2 :], offset=size * 2)
+
+    # act
+    response = client.get(f"/dsrs/uploads/{upload_id}/")
+    completion = complete_upload(upload_id, sha256=hashlib.sha256(content).hexdigest())
+
+    # assert
+    assert response.json()["received_ranges"] == [[0, len(content)]]
+    assert completion.status_code == 200
+    dsr = DSR.objects.get(id=completion.json()["id"])
+    assert dsr.status == "pending"
+    assert default_storage.open(dsr.path).read() == dsr_content
+    assert not DSRUpload.objects.exists()
+    assert not default_storage.listdir("uploads")[1]
+
+
+def test_dsrs_uploads__complete__same_as_import(
+    dsr_files, dsr_content, create_upload, put_chunk, complete_upload, client
+):
+    # arrange
+    content = gzip.compress(dsr_content)
+    upload_id = create_upload(content)
+    put_chunk(upload_id, content, offset=0)
+    dsr = DSR.objects.get(id=complete_upload(upload_id).json()["id"])
+
+    # act
+    services.ingest_pending_dsrs()
+
+    # assert
+    dsr.refresh_from_db()
+    stats = DSRStats.objects.values_list(
+        "row_count", "failed_row_count", "total_usages", "total_revenue"
+    )
+    expected = client.post(
+        "/dsrs/import/",
+        open(dsr_files[FILENAME], mode="rb").read(),
+        content_type="*/*",
+        HTTP_CONTENT_DISPOSITION=f"attachment; filename={FILENAME}",
+    ).json()
+    assert dsr.status == expected["status"]
+    assert stats.get(dsr=dsr) == stats.get(dsr_id=expected["id"])
+
+
+def test_dsrs_uploads__offset_past_received__return_conflict(
+    dsr_content, create_upload, put_chunk
+):
+    # arrange
+    upload_id = create_upload(dsr_content)
+    put_chunk(upload_id, dsr_content[:10], offset=0)
+
+    # act
+    response = put_chunk(upload_id, dsr_content[11:20], offset=11)
+
+    # assert
+    assert response.status_code == 409
+    assert DSRUpload.objects.get(id=upload_id).received_size == 10
+
+
+def test_dsrs_uploads__chunk_too_large__return_expected(
+    dsr_content, create_upload, put_chunk, settings
+):
+    # arrange
+    settings.DSR_UPLOAD_MAX_CHUNK_SIZE = 10
+    upload_id = create_upload(dsr_content)
+    put_chunk(upload_id, dsr_content[:10], offset=0)
+
+    # act
+    response = put_chunk(upload_id, dsr_content[10:21], offset=10)
+
+    # assert
+    assert response.status_code == 413
+    assert DSRUpload.objects.get(id=upload_id).received_size == 10
+    assert not default_storage.listdir("uploads")[0]
+
+
+def test_dsrs_uploads__past_size__return_expected(
+    dsr_content, create_upload, put_chunk
+):
+    # arrange
+    upload_id = create_upload(dsr_content[:10])
+
+    # act
+    response = put_chunk(upload_id, dsr_content[:20], offset=0)
+
+    # assert
+    assert response.status_code == 400
+    assert DSRUpload.objects.get(id=upload_id).received_size == 0
+
+
+@pytest.mark.parametrize("sha256", ["0" * 64, "invalid"])
+def test_dsrs_uploads__complete__invalid_sha256__return_expected(
+    dsr_content, create_upload, put_chunk, complete_upload, sha256
+):
+    # arrange
+    upload_id = create_upload(dsr_content)
+    put_chunk(upload_id, dsr_content, offset=0)
+
+    # act
+    response = complete_upload(upload_id, sha256=sha256)
+
+    # assert
+    assert response.status_code == 400
+    assert DSRUpload.objects.filter(id=upload_id).exists()
+    assert not DSR.objects.exists()
+
+
+def test_dsrs_uploads__complete__incomplete__return_expected(
+    dsr_content, create_upload, put_chunk, complete_upload
+):
+    # arrange
+    upload_id = create_upload(dsr_content)
+    put_chunk(upload_id, dsr_content[:-1], offset=0)
+
+    # act
+    response = complete_upload(upload_id)
+
+    # assert
+    assert response.status_code == 400
+    assert not DSR.objects.exists()
+
+
+def test_dsrs_uploads__complete__truncated_gzip__return_expected(
+    dsr_content, create_upload, put_chunk, complete_upload
+):
+    # arrange
+    content = gzip.compress(dsr_content)[:-10]
+    upload_id = create_upload(content)
+    put_chunk(upload_id, content, offset=0)
+
+    # act
+    response = complete_upload(upload_id)
+
+    # assert
+    assert response.status_code == 400
+    assert not DSR.objects.exists()
+
+
+def test_dsrs_uploads__invalid_filename__return_expected(client):
+    # act
+    response = client.post(
+        "/dsrs/uploads/",
+        {"filename": "invalid.tsv", "size": 10},
+        content_type="application/json",
+    )
+
+    # assert
+    assert response.status_code == 400
+    assert not DSRUpload.objects.exists()
+
+
+def test_dsrs_uploads__too_large__return_expected(client, settings):
+    # arrange
+    settings.DSR_UPLOAD_MAX_SIZE = 10
+
+    # act
+    response = client.post(
+        "/dsrs/uploads/",
+        {"filename": FILENAME, "size": 11},
+        content_type="application/json",
+    )
+
+    # assert
+    assert response.status_code == 400
+    assert "size" in response.json()
+    assert not DSRUpload.objects.exists()
+
+
+def test_dsrs_uploads__plain__too_large__return_expected(
+    dsr_content, create_upload, put_chunk, settings
+):
+    # arrange
+    settings.DSR_UPLOAD_MAX_DECOMPRESSED_SIZE = len(dsr_content) - 1
+    upload_id = create_upload(dsr_content)
+
+    # act
+    response = put_chunk(upload_id, dsr_content[:100], offset=0)
+
+    # assert
+    assert response.status_code == 413
+    upload = DSRUpload.objects.get(id=upload_id)
+    assert (upload.received_size, upload.compressed) == (0, None)
+
+
+def test_dsrs_uploads__delete__return_expected(
+    dsr_content, create_upload, put_chunk, client
+):
+    # arrange
+    content = gzip.compress(dsr_content)
+    upload_id = create_upload(content)
+    put_chunk(upload_id, content[:100], offset=0)
+
+    # act
+    response = client.delete(f"/dsrs/uploads/{upload_id}/")
+
+    # assert
+    assert response.status_code == 204
+    assert not DSRUpload.objects.exists()
+    assert not default_storage.listdir("uploads")[1]
+
+
+def test_delete_stale_uploads__return_expected(
+    dsr_content, create_upload, put_chunk, settings
+):
+    # arrange
+    content = gzip.compress(dsr_content)
+    stale_id = create_upload(content)
+    put_chunk(stale_id, content[:100], offset=0)
+    fresh_id = create_upload(content)
+    put_chunk(fresh_id, content[:100], offset=0)
+    DSRUpload.objects.filter(id=stale_id).update(
+        updated_at=timezone.now() - timedelta(hours=2)
+    )
+
+    # act
+    count = services.delete_stale_uploads(
+        updated_before=timezone.now() - timedelta(hours=1)
+    )
+
+    # assert
+    assert count == 1
+    assert [str(upload.id) for upload in DSRUpload.objects.all()] == [fresh_id]
+    assert sorted(default_storage.listdir("uploads")[1]) == [
+        f"{fresh_id}.gz",
+        f"{fresh_id}.tsv",
+    ]
+    assert stale_id not in {str(upload_id) for upload_id in uploads._states}
@@ -0,0 +1,207 @@
+import gzip
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from dsrs import validation
+from dsrs.batching import estimate_resource_size
+from dsrs.models import DSR, DSRStats, Resource
+
+pytestmark = pytest.mark.django_db
+
+FILENAME = "Spotify_SpotifyDuo_SGAE_NO_NOK_20200101-20200531.tsv"
+
+CONTENT = (
+    b"\r\ndsp_id\ttitle\tartists\tisrc\tusages\trevenue\n"
+    + b"id1\ttitle1\tartist1\tISRC00000001\t1\t0.5\n"
+    + b"id2\ttitle2\tartist2\tISRC00000002\tx\t1\n"
+    + b"\n"
+    + b"id3\ttitle3\tartist3\tISRC00000003\t3\t1.5\r\n"
+    + b"id4\t\tartist4\tISRC00000004\t4\t2\r"
+    + b"id5\ttitle5\tartist5\tISRC00000005\t5\t2.5\n"
+    + b"id6\ttitle6\tartist6\tISRC00000006\t6"
+)
+
+
+@pytest.fixture
+def post_dsr_file(client):
+    def _post(content, filename=FILENAME, dry_run="true"):
+        return client.post(
+            f"/dsrs/import/?dry_run={dry_run}",
+            content,
+            content_type="*/*",
+            HTTP_CONTENT_DISPOSITION=f"attachment; filename={filename}",
+        )
+
+    return _post
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_validate_file__return_expected(tmp_path, workers):
+    # arrange
+    path = tmp_path / FILENAME
+    path.write_bytes(CONTENT)
+
+    # act
+    result = validation.validate_file(
+        str(path), workers=workers, min_range_size=1, sample_size=10
+    )
+
+    # assert
+    assert result == {
+        "status": "failed",
+        "row_count": 6,
+        "failed_row_count": 2,
+        "projected_size": sum(
+            estimate_resource_size(
+                Resource(dsp_id=dsp_id, title=title, artists=artist, isrc=isrc)
+            )
+            for dsp_id, title, artist, isrc in (
+                ("id1", "title1", "artist1", "ISRC00000001"),
+                ("id3", "title3", "artist3", "ISRC00000003"),
+                ("id5", "title5", "artist5", "ISRC00000005"),
+                ("id6", "title6", "artist6", "ISRC00000006"),
+            )
+        ),
+        "errors": [
+            {
+                "line_number": 4,
+                "line": "id2\ttitle2\tartist2\tISRC00000002\tx\t1",
+                "error": "usages: A valid integer is required.",
+            },
+            {
+                "line_number": 7,
+                "line": "id4\t\tartist4\tISRC00000004\t4\t2",
+                "error": "title: This field may not be blank.",
+            },
+        ],
+    }
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        CONTENT.replace(b"title3", b"Caf\xe9"),
+        # Read by the `csv` module.
+        CONTENT.replace(b"title3", b"Caf\xe9").replace(b"title1", b'"title1"'),
+    ],
+)
+def test_validate_file__not_utf8__return_expected(tmp_path, content):
+    # arrange
+    path = tmp_path / FILENAME
+    path.write_bytes(content)
+
+    # act
+    result = validation.validate_file(
+        str(path), workers=1, min_range_size=1, sample_size=10
+    )
+
+    # assert
+    assert (result["row_count"], result["failed_row_count"]) == (6, 3)
+    assert result["errors"][1] == {
+        "line_number": 6,
+        "line": "id3\tCaf\ufffd\tartist3\tISRC00000003\t3\t1.5",
+        "error": "title: Not valid UTF-8.",
+    }
+
+
+def test_dsrs_import__dry_run__not_utf8__same_as_import(post_dsr_file):
+    # arrange
+    content = CONTENT.replace(b"title3", b"Caf\xe9")
+
+    # act
+    response = post_dsr_file(content)
+
+    # assert
+    assert response.status_code == 200
+    assert response.json()["failed_row_count"] == 3
+    dsr = DSR.objects.get(id=post_dsr_file(content, dry_run="false").json()["id"])
+    assert dsr.status == "failed"
+    assert DSRStats.objects.get(dsr=dsr).failed_row_count == 3
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_dsrs_import__dry_run__same_as_import(
+    dsr_files, post_dsr_file, settings, workers
+):
+    # arrange
+    settings.DSR_VALIDATION_WORKERS = workers
+    settings.DSR_VALIDATION_MIN_RANGE_SIZE = 1024
+
+    for filename, path in dsr_files.items():
+        content = open(path, mode="rb").read()
+
+        # act
+        response = post_dsr_file(content, filename=filename)
+
+        # assert
+        assert response.status_code == 200
+        data = response.json()
+        assert not DSR.objects.exists()
+        dsr = DSR.objects.get(
+            id=post_dsr_file(content, filename=filename, dry_run="false").json()["id"]
+        )
+        stats = DSRStats.objects.get(dsr=dsr)
+        assert (data["status"], data["row_count"], data["failed_row_count"]) == (
+            dsr.status,
+            stats.row_count,
+            stats.failed_row_count,
+        )
+        assert len(data["errors"]) == min(stats.failed_row_count, 20)
+        DSR.objects.all().delete()
+
+
+def test_dsrs_import__dry_run__quotes__return_expected(post_dsr_file):
+    # arrange
+    content = CONTENT.replace(b"title3", b'"title\t3"')
+
+    # act
+    response = post_dsr_file(gzip.compress(content))
+
+    # assert
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["row_count"], data["failed_row_count"]) == (6, 2)
+    assert [error["line_number"] for error in data["errors"]] == [4, 7]
+    assert not Resource.objects.exists()
+
+
+@pytest.mark.parametrize(
+    "filename",
+    ["invalid.tsv", "Spotify_SpotifyDuo_SGAE_NO_NOK_20200101-20201331.tsv"],
+)
+def test_dsrs_import__dry_run__invalid_filename__return_expected(
+    post_dsr_file, filename
+):
+    # act
+    response = post_dsr_file(CONTENT, filename=filename)
+
+    # assert
+    assert response.status_code == 400
+    assert not DSR.objects.exists()
+
+
+def test_validate_dsr__return_expected(tmp_path, capsys):
+    # arrange
+    path = tmp_path / FILENAME
+    path.write_bytes(CONTENT)
+
+    # act
+    call_command("validate_dsr", str(path))
+
+    # assert
+    out = capsys.readouterr().out
+    assert "Line 4: usages: A valid integer is required." in out
+    assert "6 row(s), 2 invalid" in out
+    assert not DSR.objects.exists()
+
+
+def test_validate_dsr__invalid_filename__return_expected(tmp_path):
+    # arrange
+    path = tmp_path / "invalid.tsv"
+    path.write_bytes(CONTENT)
+
+    # act & assert
+    with pytest.raises(CommandError):
+        call_command("validate_dsr", str(path))